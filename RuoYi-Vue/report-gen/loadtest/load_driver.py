@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+端到端压测驱动
+通过 Orchestrator HTTP 接口并发跑 N 份完整报告（step1 → step5），
+统计每一步以及 Step3 各阶段（MCP/向量/处理/LLM）的 p50/p95/p99
+
+示例：
+  python load_driver.py --base-url http://localhost:9000 --reports 20 --concurrency 5
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import httpx
+
+STEPS = ["step1", "step2", "step3", "step4", "step5"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近秩法计算百分位"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """汇总一组耗时样本（秒）"""
+    return {
+        "count": len(values),
+        "mean": sum(values) / len(values) if values else 0.0,
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0
+    }
+
+
+class LoadDriver:
+    """并发报告生成压测器"""
+
+    def __init__(self, base_url: str, reports: int, concurrency: int, timeout: float):
+        self.base_url = base_url.rstrip('/')
+        self.reports = reports
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.step_samples: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.report_samples: List[float] = []
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+
+    async def _post(self, client: httpx.AsyncClient, step: str, payload: dict) -> Optional[dict]:
+        start = time.perf_counter()
+        try:
+            r = await client.post(f"{self.base_url}/{step}", json=payload)
+            r.raise_for_status()
+            self.step_samples[step].append(time.perf_counter() - start)
+            return r.json()
+        except Exception as e:
+            self.errors[step] += 1
+            print(f"❌ {step} 失败: {e}")
+            return None
+
+    async def run_report(self, client: httpx.AsyncClient, idx: int) -> bool:
+        """跑完一份报告的五个步骤"""
+        start = time.perf_counter()
+        created = await self._post(client, "step1", {
+            "project_name": f"压测项目-{idx}",
+            "company_name": "loadtest",
+            "research_content": "大语言模型在科研文献综述自动生成中的应用"
+        })
+        if not created or "task_id" not in created:
+            return False
+        task = {"task_id": created["task_id"]}
+        for step in STEPS[1:]:
+            if await self._post(client, step, task) is None:
+                return False
+        self.report_samples.append(time.perf_counter() - start)
+        return True
+
+    async def run(self) -> Dict[str, object]:
+        limits = httpx.Limits(max_connections=self.concurrency * 2, max_keepalive_connections=self.concurrency)
+        async with httpx.AsyncClient(timeout=self.timeout, limits=limits) as client:
+            try:
+                await client.post(f"{self.base_url}/api/metrics/phases/reset")
+            except Exception as e:
+                print(f"⚠️ 无法重置阶段指标: {e}")
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+
+            async def bounded(idx: int) -> bool:
+                async with semaphore:
+                    return await self.run_report(client, idx)
+
+            wall_start = time.perf_counter()
+            outcomes = await asyncio.gather(*[bounded(i) for i in range(self.reports)])
+            wall = time.perf_counter() - wall_start
+
+            phases: Dict[str, List[float]] = {}
+            try:
+                r = await client.get(f"{self.base_url}/api/metrics/phases")
+                r.raise_for_status()
+                phases = r.json().get("phases", {})
+            except Exception as e:
+                print(f"⚠️ 无法获取阶段指标: {e}")
+
+        succeeded = sum(1 for ok in outcomes if ok)
+        return {
+            "timestamp": datetime.now().isoformat(),
+            "reports": self.reports,
+            "concurrency": self.concurrency,
+            "succeeded": succeeded,
+            "failed": self.reports - succeeded,
+            "wall_seconds": wall,
+            "reports_per_minute": succeeded / wall * 60 if wall > 0 else 0.0,
+            "errors": self.errors,
+            "report": summarize(self.report_samples),
+            "steps": {step: summarize(values) for step, values in self.step_samples.items()},
+            "phases": {phase: summarize(values) for phase, values in phases.items()}
+        }
+
+
+def print_summary(result: Dict[str, object]):
+    """打印结果表格"""
+    print(f"\n报告: {result['succeeded']}/{result['reports']} 成功, 并发 {result['concurrency']}, "
+          f"总耗时 {result['wall_seconds']:.1f}s, 吞吐 {result['reports_per_minute']:.2f} 份/分钟")
+    header = f"{'名称':<12}{'n':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}"
+
+    def rows(title: str, table: Dict[str, Dict[str, float]]):
+        print(f"\n[{title}]\n{header}")
+        for name, s in table.items():
+            print(f"{name:<12}{s['count']:>6}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}{s['max']:>10.3f}")
+
+    rows("整份报告", {"report": result["report"]})
+    rows("步骤", result["steps"])
+    if result["phases"]:
+        rows("Step3 阶段(每章节)", result["phases"])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="报告生成端到端压测")
+    parser.add_argument("--base-url", default="http://localhost:9000", help="Orchestrator 地址")
+    parser.add_argument("--reports", type=int, default=10, help="报告总数")
+    parser.add_argument("--concurrency", type=int, default=3, help="同时进行的报告数")
+    parser.add_argument("--timeout", type=float, default=600.0, help="单个请求超时（秒）")
+    parser.add_argument("--output", help="结果 JSON 输出路径")
+    args = parser.parse_args()
+
+    driver = LoadDriver(args.base_url, args.reports, args.concurrency, args.timeout)
+    result = asyncio.run(driver.run())
+    print_summary(result)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已保存到: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
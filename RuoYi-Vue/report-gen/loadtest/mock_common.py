@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+压测用模拟服务的公共配置
+延迟分布、错误率和负载大小均从环境变量读取，前缀区分不同服务
+"""
+
+import os
+import random
+import asyncio
+from dataclasses import dataclass
+
+
+@dataclass
+class MockProfile:
+    """模拟服务行为配置"""
+    latency_dist: str = "fixed"   # fixed / uniform / normal / lognormal / exponential
+    latency_ms: float = 200.0     # 均值（fixed 时即为固定值）
+    latency_jitter_ms: float = 50.0  # uniform 半宽 / normal 标准差 / lognormal sigma*均值
+    error_rate: float = 0.0       # 返回 5xx 的概率
+    timeout_rate: float = 0.0     # 挂起至客户端超时的概率
+    payload_chars: int = 800      # 单条文本长度
+    items: int = 8                # 每次返回的条目数
+    seed: int = 0                 # 0 表示不固定随机种子
+
+    @classmethod
+    def from_env(cls, prefix: str) -> 'MockProfile':
+        """从环境变量创建配置，例如 MOCK_DS_LATENCY_MS"""
+        def env(name: str, default: str) -> str:
+            return os.getenv(f"{prefix}_{name}", default)
+
+        return cls(
+            latency_dist=env("LATENCY_DIST", "fixed").lower(),
+            latency_ms=float(env("LATENCY_MS", "200")),
+            latency_jitter_ms=float(env("LATENCY_JITTER_MS", "50")),
+            error_rate=float(env("ERROR_RATE", "0")),
+            timeout_rate=float(env("TIMEOUT_RATE", "0")),
+            payload_chars=int(env("PAYLOAD_CHARS", "800")),
+            items=int(env("ITEMS", "8")),
+            seed=int(env("SEED", "0")),
+        )
+
+    def sample_latency(self, rng: random.Random) -> float:
+        """按配置的分布采样一次延迟（秒）"""
+        mean = max(self.latency_ms, 0.0)
+        jitter = max(self.latency_jitter_ms, 0.0)
+        if self.latency_dist == "uniform":
+            ms = rng.uniform(mean - jitter, mean + jitter)
+        elif self.latency_dist == "normal":
+            ms = rng.gauss(mean, jitter)
+        elif self.latency_dist == "lognormal":
+            # 以 mean 为中位数，jitter/mean 为 sigma，长尾明显
+            sigma = jitter / mean if mean > 0 else 0.0
+            ms = mean * rng.lognormvariate(0.0, sigma)
+        elif self.latency_dist == "exponential":
+            ms = rng.expovariate(1.0 / mean) if mean > 0 else 0.0
+        else:
+            ms = mean
+        return max(ms, 0.0) / 1000.0
+
+
+class MockBehavior:
+    """按配置注入延迟、错误和超时"""
+
+    def __init__(self, profile: MockProfile):
+        self.profile = profile
+        self.rng = random.Random(profile.seed or None)
+        self.stats = {"requests": 0, "errors": 0, "timeouts": 0}
+
+    async def delay(self):
+        """模拟上游处理耗时"""
+        await asyncio.sleep(self.profile.sample_latency(self.rng))
+
+    async def maybe_fail(self) -> bool:
+        """按错误率决定本次是否失败；超时场景直接挂起较长时间"""
+        self.stats["requests"] += 1
+        if self.profile.timeout_rate and self.rng.random() < self.profile.timeout_rate:
+            self.stats["timeouts"] += 1
+            await asyncio.sleep(3600)
+        if self.profile.error_rate and self.rng.random() < self.profile.error_rate:
+            self.stats["errors"] += 1
+            return True
+        return False
+
+    def filler(self, seed_text: str, chars: int = None) -> str:
+        """生成指定长度的伪文本"""
+        chars = chars or self.profile.payload_chars
+        words = [w for w in seed_text.split() if w] or ["research"]
+        vocab = words + [
+            "model", "method", "results", "analysis", "performance", "framework",
+            "dataset", "evaluation", "learning", "system", "approach", "study",
+        ]
+        out, size = [], 0
+        while size < chars:
+            sentence = " ".join(self.rng.choice(vocab) for _ in range(12)).capitalize() + "."
+            out.append(sentence)
+            size += len(sentence) + 1
+        return " ".join(out)[:chars]
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+模拟 DeepSeek 服务
+实现 /v1/chat/completions，按 system 提示返回各步骤期望的 JSON 结构
+
+启动：uvicorn mock_deepseek:app --port 8100
+配置：MOCK_DS_LATENCY_DIST / MOCK_DS_LATENCY_MS / MOCK_DS_LATENCY_JITTER_MS /
+      MOCK_DS_ERROR_RATE / MOCK_DS_TIMEOUT_RATE / MOCK_DS_PAYLOAD_CHARS / MOCK_DS_SEED
+"""
+
+import json
+import time
+import uuid
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from mock_common import MockProfile, MockBehavior
+
+app = FastAPI(title="mock-deepseek")
+behavior = MockBehavior(MockProfile.from_env("MOCK_DS"))
+
+
+class ChatRequest(BaseModel):
+    model: str = "deepseek-chat"
+    messages: List[Dict[str, Any]] = []
+    max_tokens: int = 2000
+    temperature: float = 0.1
+
+
+def _build_content(system: str, user: str) -> str:
+    """根据 system 提示生成与真实步骤一致的返回内容"""
+    if "大纲" in system:
+        outline = {
+            "研究大纲": [
+                {"一级标题": f"第{i}章 研究背景与现状", "二级标题": [f"{i}.1 技术综述", f"{i}.2 关键问题"]}
+                for i in range(1, 4)
+            ]
+        }
+        return json.dumps(outline, ensure_ascii=False)
+    if "学术写作" in system:
+        return json.dumps({
+            "研究内容": behavior.filler(user),
+            "参考网址": ["https://arxiv.org/abs/0000.00001"]
+        }, ensure_ascii=False)
+    if "润色" in system:
+        return "# 模拟报告\n\n" + "\n\n".join(behavior.filler(user) for _ in range(3))
+    if "文摘" in system:
+        return json.dumps({
+            "摘要": behavior.filler(user, 200),
+            "关键词": ["模拟", "压测"],
+            "完整文章": behavior.filler(user)
+        }, ensure_ascii=False)
+    # 查询扩展、语义压缩等自由文本请求
+    return "1. " + behavior.filler(user, 60) + "\n2. " + behavior.filler(user, 60) + "\n3. " + behavior.filler(user, 60)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "stats": behavior.stats}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(req: ChatRequest):
+    if await behavior.maybe_fail():
+        raise HTTPException(503, "mock upstream error")
+    await behavior.delay()
+
+    system = next((m.get("content", "") for m in req.messages if m.get("role") == "system"), "")
+    user = next((m.get("content", "") for m in reversed(req.messages) if m.get("role") == "user"), "")
+    content = _build_content(system, user)
+
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": req.model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop"
+        }],
+        "usage": {
+            "prompt_tokens": len(user) // 2,
+            "completion_tokens": len(content) // 2,
+            "total_tokens": (len(user) + len(content)) // 2
+        }
+    }
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+模拟 MCP 工具服务
+实现 /health、/tools、/invoke、/invoke_batch，返回结构与 report-mcp 中真实工具一致
+
+启动：uvicorn mock_mcp:app --port 8200
+配置：MOCK_MCP_LATENCY_DIST / MOCK_MCP_LATENCY_MS / MOCK_MCP_LATENCY_JITTER_MS /
+      MOCK_MCP_ERROR_RATE / MOCK_MCP_TIMEOUT_RATE / MOCK_MCP_PAYLOAD_CHARS /
+      MOCK_MCP_ITEMS / MOCK_MCP_SEED
+"""
+
+import asyncio
+import hashlib
+from typing import Any, Dict, List
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from mock_common import MockProfile, MockBehavior
+
+app = FastAPI(title="mock-mcp")
+behavior = MockBehavior(MockProfile.from_env("MOCK_MCP"))
+
+TOOL_NAMES = ["arxiv_search", "local_search", "crossref_search", "web_search", "doi_lookup"]
+
+
+class Invoke(BaseModel):
+    tool: str
+    args: Dict[str, Any] = {}
+
+
+class InvokeBatch(BaseModel):
+    calls: List[Invoke]
+    timeout: float = 20.0
+
+
+def _arxiv(query: str, max_results: int) -> Dict[str, Any]:
+    items = []
+    for i in range(min(max_results, behavior.profile.items)):
+        pid = hashlib.md5(f"{query}:{i}".encode()).hexdigest()[:8]
+        items.append({
+            "id": f"http://arxiv.org/abs/{pid}",
+            "title": f"{query[:60]} - study {i + 1}",
+            "summary": behavior.filler(query),
+            "authors": ["A. Author", "B. Author"],
+            "published": "2024-01-01T00:00:00Z",
+            "url": f"http://arxiv.org/abs/{pid}"
+        })
+    return {"query": query, "count": len(items), "items": items}
+
+
+def _crossref(query: str, max_results: int) -> Dict[str, Any]:
+    results = []
+    for i in range(min(max_results, behavior.profile.items)):
+        doi = f"10.0000/{hashlib.md5(f'{query}:{i}'.encode()).hexdigest()[:8]}"
+        results.append({
+            "doi": doi,
+            "title": f"{query[:60]} - article {i + 1}",
+            "authors": ["C. Author"],
+            "journal": "Mock Journal",
+            "published_date": "2024-1-1",
+            "abstract": behavior.filler(query),
+            "url": f"https://doi.org/{doi}",
+            "type": "journal-article",
+            "publisher": "Mock",
+            "subjects": [],
+            "citation_count": i
+        })
+    return {"query": query, "count": len(results), "total_results": len(results), "results": results}
+
+
+def _web(query: str, max_results: int) -> Dict[str, Any]:
+    results = [{
+        "title": f"{query[:60]} - page {i + 1}",
+        "url": f"https://example.com/{i}",
+        "snippet": behavior.filler(query, 200),
+        "content": behavior.filler(query),
+        "status": "success"
+    } for i in range(min(max_results, behavior.profile.items))]
+    return {"query": query, "count": len(results), "results": results}
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "stats": behavior.stats}
+
+
+@app.get("/tools")
+async def tools():
+    return {"tools": [{"name": name, "description": "mock", "args": {}} for name in TOOL_NAMES]}
+
+
+@app.post("/invoke")
+async def invoke(req: Invoke):
+    if req.tool not in TOOL_NAMES:
+        raise HTTPException(404, f"tool {req.tool} not found")
+    failed = await behavior.maybe_fail()
+    await behavior.delay()
+    if failed:
+        # 与真实工具一致：上游失败时返回 200 + error 字段
+        return {"from_cache": False, "result": {"error": f"{req.tool} mock upstream failure"}}
+
+    query = str(req.args.get("query", ""))
+    max_results = int(req.args.get("max_results", 5))
+    if req.tool == "arxiv_search":
+        res = _arxiv(query, max_results)
+    elif req.tool == "local_search":
+        res = {**_arxiv(query, max_results), "source": "local"}
+    elif req.tool == "crossref_search":
+        res = _crossref(query, max_results)
+    elif req.tool == "web_search":
+        res = _web(query, max_results)
+    else:
+        res = {"doi": req.args.get("doi", ""), "found": False, "error": "DOI not found"}
+    return {"from_cache": False, "result": res}
+
+
+@app.post("/invoke_batch")
+async def invoke_batch(req: InvokeBatch):
+    async def run_one(call: Invoke) -> Dict[str, Any]:
+        try:
+            out = await asyncio.wait_for(invoke(call), timeout=req.timeout)
+            return {"tool": call.tool, **out}
+        except asyncio.TimeoutError:
+            return {"tool": call.tool, "status": 504, "error": f"{call.tool} timeout ({req.timeout:.0f}s)"}
+        except HTTPException as e:
+            return {"tool": call.tool, "status": e.status_code, "error": e.detail}
+
+    results = await asyncio.gather(*[run_one(call) for call in req.calls])
+    return {"count": len(results), "results": results}
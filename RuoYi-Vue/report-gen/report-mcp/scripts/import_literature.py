@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+本地文献索引导入脚本
+支持 arXiv 元数据快照（JSONL）、Crossref works（JSON / JSONL）以及 Redis 中已缓存的检索结果
+
+示例：
+    python scripts/import_literature.py arxiv-metadata-oai-snapshot.json --category cs.
+    python scripts/import_literature.py crossref-works.jsonl
+    python scripts/import_literature.py --from-redis
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from utils.cache import Cache
+from utils.local_index import get_local_index, normalize_record
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """逐条读取 JSONL；整体为 JSON 数组或 Crossref 响应（message.items）时一次性读取"""
+    with open(path, "r", encoding="utf-8") as f:
+        head = f.read(1)
+        f.seek(0)
+        if head == "[":
+            yield from json.load(f)
+            return
+        first = f.readline()
+        try:
+            obj = json.loads(first)
+        except json.JSONDecodeError:
+            f.seek(0)
+            obj = json.load(f)
+            yield from obj.get("message", {}).get("items", obj.get("items", []))
+            return
+        yield obj
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+def import_file(path: str, batch_size: int, category: Optional[str]) -> int:
+    index = get_local_index()
+    total = 0
+    batch = []
+    for record in iter_records(path):
+        if category and not str(record.get("categories", "")).startswith(category):
+            continue
+        batch.append(normalize_record(record))
+        if len(batch) >= batch_size:
+            total += index.upsert(batch)
+            batch = []
+            logger.info(f"Imported {total} records from {path}")
+    total += index.upsert(batch)
+    return total
+
+
+async def import_from_redis(batch_size: int) -> int:
+    """扫描 Redis 中 arxiv_search / crossref_search 的缓存结果"""
+    cache = Cache()
+    await cache.connect()
+    if cache.client is None:
+        logger.error("Redis is not available (check REDIS_URL)")
+        return 0
+    index = get_local_index()
+    total = 0
+    try:
+        for tool in ("arxiv_search", "crossref_search"):
+            async for key in cache.client.scan_iter(match=f"tool:{tool}:*", count=batch_size):
+                data = await cache.client.get(key)
+                if not data:
+                    continue
+                try:
+                    entry = cache._decode(data)
+                except Exception:
+                    continue
+                value = entry.get("_v", entry) if isinstance(entry, dict) else entry
+                if isinstance(value, dict) and "error" not in value:
+                    total += index.ingest_result(tool, value)
+    finally:
+        await cache.close()
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import literature metadata into the local index")
+    parser.add_argument("files", nargs="*", help="JSON / JSONL metadata files")
+    parser.add_argument("--from-redis", action="store_true", help="import cached arxiv/crossref results from Redis")
+    parser.add_argument("--category", help="only import arXiv records whose categories start with this prefix")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if not args.files and not args.from_redis:
+        parser.error("nothing to import")
+
+    total = 0
+    for path in args.files:
+        count = import_file(path, args.batch_size, args.category)
+        logger.info(f"{path}: {count} records")
+        total += count
+    if args.from_redis:
+        count = asyncio.run(import_from_redis(args.batch_size))
+        logger.info(f"redis: {count} records")
+        total += count
+
+    index = get_local_index()
+    index.optimize()
+    logger.info(f"Done: {total} records imported, {index.count()} papers in {index.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
+import asyncio
+import os
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import Any, Dict
-from utils.cache import Cache
+from typing import Any, Dict, List
+from utils.cache import Cache, make_key, classify_result, RESULT_OK
+from utils.http import get_http
+from utils.local_index import get_local_index
+from utils.pdf_extract import get_pdf_extractor
 from tools.arxiv_tool import ArxivTool
 from tools.web_search_tool import WebSearchTool, WebContentTool
 from tools.crossref_tool import CrossrefTool, DOITool, CitationTool
 from tools.pdf_tool import PDFTool, PDFSummaryTool
 from tools.dedup_tool import DedupTool, MergeTool, TextCleanTool
+from tools.local_search_tool import LocalSearchTool
 
 app = FastAPI(title="report-mcp")
 cache = Cache()
@@ -21,33 +27,131 @@ TOOLS = {
     PDFSummaryTool.name: PDFSummaryTool,
     DedupTool.name: DedupTool,
     MergeTool.name: MergeTool,
-    TextCleanTool.name: TextCleanTool
+    TextCleanTool.name: TextCleanTool,
+    LocalSearchTool.name: LocalSearchTool
 }
 
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "32"))
+# 在线检索的成功结果写入本地文献索引
+INDEXED_TOOLS = {ArxivTool.name, CrossrefTool.name}
+
 class Invoke(BaseModel):
     tool: str
     args: Dict[str, Any] = {}
 
+class InvokeBatch(BaseModel):
+    calls: List[Invoke]
+    timeout: float = 20.0  # 单项超时（秒）
+
+@app.on_event("startup")
+async def on_startup():
+    await cache.connect()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await get_http().close()
+    get_pdf_extractor().shutdown()
+    await cache.close()
+
 @app.get("/health")
 async def health():
     return {"status": "ok"}
 
+@app.get("/cache/stats")
+async def cache_stats():
+    return cache.stats()
+
+@app.get("/upstream/stats")
+async def upstream_stats():
+    return get_http().stats()
+
+@app.get("/local_index/stats")
+async def local_index_stats():
+    index = get_local_index()
+    return {"path": index.path, "papers": await asyncio.to_thread(index.count)}
+
 @app.get("/tools")
 async def tools():
     return {"tools": [t.metadata() for t in TOOLS.values()]}
 
-@app.post("/invoke")
-async def invoke(req: Invoke):
-    if req.tool not in TOOLS:
-        raise HTTPException(404, f"tool {req.tool} not found")
-    key = f"tool:{req.tool}:{str(req.args)}"
-    cached = cache.get(key)
-    if cached:
-        return {"from_cache": True, "result": cached}
+# 同一键的并发未命中只执行一次工具调用；过期旧值的后台刷新也按键去重
+_inflight: Dict[str, "asyncio.Future"] = {}
+_refreshing: Dict[str, "asyncio.Task"] = {}
+
+async def _execute(tool: str, args: Dict[str, Any], key: str) -> Dict[str, Any]:
     try:
-        res = await TOOLS[req.tool].run(**req.args)
+        res = await TOOLS[tool].run(**args)
     except TypeError as e:
         raise HTTPException(400, f"bad args: {e}")
-    cache.set(key, res)
+    await cache.set(key, res)
+    await _index_result(tool, res)
+    return res
+
+async def _index_result(tool: str, res: Any):
+    if tool not in INDEXED_TOOLS or classify_result(res) != RESULT_OK:
+        return
+    try:
+        await asyncio.to_thread(get_local_index().ingest_result, tool, res)
+    except Exception:
+        # 索引写入失败不影响本次调用
+        pass
+
+async def _refresh(tool: str, args: Dict[str, Any], key: str):
+    """后台刷新过期条目；刷新失败时保留旧值（不延长其截止时间），并在负缓存 TTL 内不再重试"""
+    try:
+        res = await TOOLS[tool].run(**args)
+    except Exception as e:
+        res = {"error": f"{tool} refresh failed: {e}"}
+    if classify_result(res) == RESULT_OK:
+        await cache.set(key, res)
+        await _index_result(tool, res)
+    else:
+        await cache.defer_refresh(key, cache.negative_ttl)
+
+async def _run_tool(tool: str, args: Dict[str, Any]) -> Dict[str, Any]:
+    if tool not in TOOLS:
+        raise HTTPException(404, f"tool {tool} not found")
+    key = make_key(tool, args)
+    cached, stale = await cache.lookup(key)
+    if cached is not None:
+        if stale and key not in _refreshing:
+            task = asyncio.create_task(_refresh(tool, args, key))
+            _refreshing[key] = task
+            task.add_done_callback(lambda _: _refreshing.pop(key, None))
+        out = {"from_cache": True, "result": cached}
+        if stale:
+            out["stale"] = True
+        return out
+
+    fut = _inflight.get(key)
+    if fut is None:
+        fut = asyncio.ensure_future(_execute(tool, args, key))
+        _inflight[key] = fut
+        fut.add_done_callback(lambda _: _inflight.pop(key, None))
+    # shield：批量接口的单项超时只放弃等待，不取消共享的调用
+    res = await asyncio.shield(fut)
     return {"from_cache": False, "result": res}
 
+@app.post("/invoke")
+async def invoke(req: Invoke):
+    return await _run_tool(req.tool, req.args)
+
+@app.post("/invoke_batch")
+async def invoke_batch(req: InvokeBatch):
+    """并发执行多个工具调用；单项失败或超时不影响其他项，结果按请求顺序返回"""
+    if len(req.calls) > MAX_BATCH_SIZE:
+        raise HTTPException(400, f"too many calls (max {MAX_BATCH_SIZE})")
+
+    async def run_one(call: Invoke) -> Dict[str, Any]:
+        try:
+            out = await asyncio.wait_for(_run_tool(call.tool, call.args), timeout=req.timeout)
+            return {"tool": call.tool, **out}
+        except asyncio.TimeoutError:
+            return {"tool": call.tool, "status": 504, "error": f"{call.tool} timeout ({req.timeout:.0f}s)"}
+        except HTTPException as e:
+            return {"tool": call.tool, "status": e.status_code, "error": e.detail}
+        except Exception as e:
+            return {"tool": call.tool, "status": 500, "error": f"{call.tool} failed: {e}"}
+
+    results = await asyncio.gather(*[run_one(call) for call in req.calls])
+    return {"count": len(results), "results": results}
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+content_dedup / content_merge 测试
+minhash 方法在各阈值下与逐一比较的 similarity / smart 方法结果完全一致
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from tools.dedup_tool import DedupTool, MergeTool
+
+WORDS = ("graph neural network retrieval transformer attention protein molecule dataset benchmark "
+         "training inference latency memory language model image segmentation diffusion policy reward").split()
+
+
+def corpus(n=160, seed=7):
+    """带随机改写的近重复句子：删词、换词、插词、调整空白"""
+    rng = random.Random(seed)
+    bases = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))) for _ in range(n // 4)]
+    texts = []
+    for _ in range(n):
+        words = rng.choice(bases).split()
+        for _ in range(rng.randint(0, 5)):
+            op = rng.random()
+            pos = rng.randrange(len(words))
+            if op < 0.3 and len(words) > 3:
+                del words[pos]
+            elif op < 0.6:
+                words[pos] = rng.choice(WORDS)
+            else:
+                words.insert(pos, rng.choice(WORDS))
+        text = " ".join(words)
+        texts.append(text.capitalize() if rng.random() < 0.3 else text)
+    return texts
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.6, 0.7, 0.8])
+def test_minhash_matches_similarity(threshold):
+    docs = corpus()
+    assert DedupTool._minhash_multi_dedup(docs, threshold) == DedupTool._similarity_based_multi_dedup(docs, threshold)
+    content = ". ".join(docs[:80])
+    assert DedupTool._minhash_dedup(content, threshold) == DedupTool._similarity_based_dedup(content, threshold)
+
+
+@pytest.mark.parametrize("threshold", [0.6])
+def test_minhash_merge_matches_smart(threshold):
+    docs = corpus(seed=11)
+    contents = [". ".join(docs[i:i + 12]) for i in range(0, len(docs), 12)]
+    minhash = MergeTool._minhash_merge(contents, threshold)
+    smart = MergeTool._smart_merge(contents, threshold)
+    assert minhash["merged_content"] == smart["merged_content"]
+
+
+if __name__ == "__main__":
+    cases = [(test_minhash_matches_similarity, t) for t in (0.5, 0.6, 0.7, 0.8)]
+    cases += [(test_minhash_merge_matches_smart, t) for t in (0.6,)]
+    failed = 0
+    for fn, arg in cases:
+        try:
+            fn(arg)
+            print(f"✅ {fn.__name__}[{arg}]")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}[{arg}]: {e}")
+    print(f"\n{len(cases) - failed}/{len(cases)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量调用接口测试
+覆盖 /invoke_batch 的单项超时、部分失败、结果顺序与批量上限
+"""
+
+import asyncio
+import os
+import sys
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.pop("REDIS_URL", None)
+
+from fastapi import HTTPException
+
+import server
+from utils.cache import Cache
+
+
+class EchoTool:
+    name = "echo"
+
+    async def run(self, i: int, delay: float = 0.0):
+        await asyncio.sleep(delay)
+        return {"i": i}
+
+
+class BrokenTool:
+    name = "broken"
+
+    async def run(self, **kwargs):
+        raise RuntimeError("boom")
+
+
+def _patched(fn):
+    """替换服务端的工具表与缓存，测试结束后恢复"""
+    def wrapper():
+        with mock.patch.object(server, "TOOLS", {EchoTool.name: EchoTool(), BrokenTool.name: BrokenTool()}), \
+                mock.patch.object(server, "cache", Cache()):
+            fn()
+    wrapper.__name__ = fn.__name__
+    return wrapper
+
+
+def _batch(calls, timeout=20.0):
+    req = server.InvokeBatch(calls=[server.Invoke(tool=t, args=a) for t, a in calls], timeout=timeout)
+    return server.invoke_batch(req)
+
+
+@_patched
+def test_order_and_partial_results():
+    async def run():
+        calls = [("echo", {"i": i, "delay": 0.05 * (5 - i)}) for i in range(5)]
+        calls[1] = ("broken", {})
+        calls[3] = ("missing", {})
+        out = await _batch(calls)
+        results = out["results"]
+        assert out["count"] == 5 and [r["tool"] for r in results] == ["echo", "broken", "echo", "missing", "echo"]
+        # 先完成的项不会打乱顺序
+        assert [results[i]["result"]["i"] for i in (0, 2, 4)] == [0, 2, 4]
+        assert results[1]["status"] == 500 and "boom" in results[1]["error"]
+        assert results[3]["status"] == 404
+        bad = (await _batch([("echo", {"unknown": 1})]))["results"][0]
+        assert bad["status"] == 400 and "bad args" in bad["error"]
+
+    asyncio.run(run())
+
+
+@_patched
+def test_item_timeout():
+    async def run():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        out = await _batch([("echo", {"i": 0}), ("echo", {"i": 1, "delay": 0.5})], timeout=0.1)
+        assert loop.time() - started < 0.4
+        fast, slow = out["results"]
+        assert fast["result"] == {"i": 0}
+        assert slow["status"] == 504 and "timeout" in slow["error"]
+        # 超时只放弃等待，共享调用继续执行并写入缓存
+        await asyncio.sleep(0.6)
+        again = (await _batch([("echo", {"i": 1, "delay": 0.5})], timeout=0.1))["results"][0]
+        assert again["from_cache"] is True and again["result"] == {"i": 1}
+
+    asyncio.run(run())
+
+
+@_patched
+def test_batch_size_limit():
+    async def run():
+        try:
+            await _batch([("echo", {"i": i}) for i in range(server.MAX_BATCH_SIZE + 1)])
+        except HTTPException as e:
+            assert e.status_code == 400
+        else:
+            raise AssertionError("超出批量上限应返回 400")
+        out = await _batch([("echo", {"i": i}) for i in range(server.MAX_BATCH_SIZE)])
+        assert [r["result"]["i"] for r in out["results"]] == list(range(server.MAX_BATCH_SIZE))
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
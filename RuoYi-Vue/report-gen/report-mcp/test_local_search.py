@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地文献索引测试
+覆盖 AND 优先 / OR 放宽的命中质量过滤、中文二元组检索、旧库迁移，
+以及只有不相关命中时 local_search 仍回退在线检索
+"""
+
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.local_index as local_index
+from tools.arxiv_tool import ArxivTool
+from tools.local_search_tool import LocalSearchTool
+from utils.local_index import LocalLiteratureIndex
+
+PAPERS = [
+    {"title": "Deep learning for cats", "summary": "We classify cat pictures with convolutional networks.",
+     "url": "http://arxiv.org/abs/1"},
+    {"title": "Learning to rank documents", "summary": "A study of ranking losses.", "url": "http://arxiv.org/abs/2"},
+    {"title": "Quantum error correction with surface codes",
+     "summary": "Learning decoders for quantum error correction.", "url": "http://arxiv.org/abs/3"},
+    {"title": "深度学习在医学影像诊断中的应用", "summary": "本文综述卷积神经网络在医学影像中的进展。",
+     "url": "http://arxiv.org/abs/4"},
+]
+
+
+def make_index(d):
+    index = LocalLiteratureIndex(os.path.join(d, "lit.db"))
+    index.upsert(local_index.from_arxiv_item(p) for p in PAPERS)
+    return index
+
+
+def test_and_first_then_filtered_or():
+    with tempfile.TemporaryDirectory() as d:
+        index = make_index(d)
+        hits = index.search("quantum learning error correction", max_results=5)
+        assert [h["url"] for h in hits] == ["http://arxiv.org/abs/3"], hits
+        assert hits[0]["coverage"] == 1.0
+        # 部分覆盖：3 个词中命中 2 个的文献在 OR 放宽时保留
+        hits = index.search("quantum error teleportation", max_results=5)
+        assert [h["url"] for h in hits] == ["http://arxiv.org/abs/3"]
+        assert not index.search("quantum error teleportation", max_results=5, min_coverage=1.0)
+        index.close()
+
+
+def test_chinese_query():
+    with tempfile.TemporaryDirectory() as d:
+        index = make_index(d)
+        assert LocalLiteratureIndex.query_terms("医学影像") == ["医学", "学影", "影像"]
+        for query in ("医学影像", "深度学习 诊断", "卷积神经网络"):
+            hits = index.search(query, max_results=3)
+            assert hits and hits[0]["url"] == "http://arxiv.org/abs/4", query
+        assert not index.search("量子计算", max_results=3)
+        index.close()
+
+
+def test_migrates_v1_database():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "lit.db")
+        conn = sqlite3.connect(path)
+        conn.executescript("""
+            CREATE TABLE papers (rowid INTEGER PRIMARY KEY, key TEXT NOT NULL UNIQUE, id TEXT, title TEXT NOT NULL,
+                summary TEXT, authors TEXT, published TEXT, url TEXT, doi TEXT, source TEXT, added_at REAL);
+            CREATE VIRTUAL TABLE papers_fts USING fts5(title, summary, authors, content='papers', content_rowid='rowid');
+            INSERT INTO papers (key, title, summary, authors, url) VALUES ('k', '医学影像分割', '', '[]', 'u');
+        """)
+        conn.commit()
+        conn.close()
+        index = LocalLiteratureIndex(path)
+        assert [h["url"] for h in index.search("影像分割")] == ["u"]
+        index.close()
+
+
+def test_irrelevant_hits_trigger_fallback():
+    live_items = [{"id": "http://arxiv.org/abs/9", "title": "Fault-tolerant quantum machine learning",
+                   "summary": "Error correction for learning on quantum hardware.", "authors": [],
+                   "published": None, "url": "http://arxiv.org/abs/9"}]
+    calls = []
+
+    async def fake_arxiv(query, max_results=5):
+        calls.append(query)
+        return {"query": query, "items": live_items}
+
+    async def run():
+        return await LocalSearchTool.run("machine learning error correction hardware", max_results=4)
+
+    with tempfile.TemporaryDirectory() as d:
+        original_index, original_run = local_index._index, ArxivTool.run
+        local_index._index = make_index(d)
+        ArxivTool.run = staticmethod(fake_arxiv)
+        try:
+            result = asyncio.run(run())
+        finally:
+            local_index._index.close()
+            local_index._index, ArxivTool.run = original_index, original_run
+    # 本地只有 "learning" 之类的常见词命中，必须回退在线检索
+    assert calls, "fallback did not fire"
+    assert result["source"] == "local+arxiv"
+    assert "http://arxiv.org/abs/1" not in [it["url"] for it in result["items"]]
+    assert "http://arxiv.org/abs/9" in [it["url"] for it in result["items"]]
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
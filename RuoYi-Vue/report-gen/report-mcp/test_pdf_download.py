@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 下载测试
+覆盖下载大小上限（声明长度 / 分块传输）以及中止、出错、取消时临时文件的清理
+"""
+
+import asyncio
+import hashlib
+import os
+import sys
+import tempfile
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from tools import pdf_tool
+from tools.pdf_tool import PDFTool
+from utils.http import get_http
+
+CAP = 200_000
+SMALL = b"%PDF-1.4\n" + b"0" * 10_000
+
+
+def _app():
+    async def small(request):
+        return web.Response(body=SMALL, content_type="application/pdf")
+
+    async def declared_large(request):
+        return web.Response(body=b"0" * (CAP + 1), content_type="application/pdf")
+
+    async def chunked(request):
+        # 不声明长度，边下载边计数才能发现超限
+        response = web.StreamResponse(headers={"Content-Type": "application/pdf"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(8):
+            await response.write(b"0" * 64 * 1024)
+        await response.write_eof()
+        return response
+
+    async def broken(request):
+        # 声明的长度大于实际发送的内容后断开连接
+        response = web.StreamResponse(headers={"Content-Type": "application/pdf", "Content-Length": "100000"})
+        await response.prepare(request)
+        await response.write(b"0" * 1000)
+        request.transport.close()
+        return response
+
+    async def slow(request):
+        response = web.StreamResponse(headers={"Content-Type": "application/pdf"})
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(50):
+            await response.write(b"0" * 1024)
+            await asyncio.sleep(0.05)
+        await response.write_eof()
+        return response
+
+    app = web.Application()
+    for path, handler in (("/small.pdf", small), ("/large.pdf", declared_large), ("/chunked.pdf", chunked),
+                          ("/broken.pdf", broken), ("/slow.pdf", slow)):
+        app.router.add_get(path, handler)
+    return app
+
+
+def _run(scenario):
+    """在本地服务上执行下载场景，返回 (场景结果, 临时目录中残留的文件)"""
+    with tempfile.TemporaryDirectory() as spool:
+        async def run():
+            async with TestServer(_app()) as server:
+                try:
+                    return await scenario(lambda path: str(server.make_url(path)))
+                finally:
+                    await get_http().close()
+
+        with mock.patch.object(pdf_tool, "MAX_PDF_BYTES", CAP), mock.patch.object(pdf_tool, "SPOOL_DIR", spool):
+            out = asyncio.run(run())
+        return out, os.listdir(spool)
+
+
+def test_download_ok():
+    async def scenario(url):
+        return await PDFTool._download_pdf(url("/small.pdf"))
+
+    out, left = _run(scenario)
+    assert out["size"] == len(SMALL) and out["sha256"] == hashlib.sha256(SMALL).hexdigest()
+    assert left == [os.path.basename(out["path"])]
+
+
+def test_size_cap():
+    async def scenario(url):
+        return [await PDFTool._download_pdf(url(path)) for path in ("/large.pdf", "/chunked.pdf")]
+
+    (declared, streamed), left = _run(scenario)
+    assert "too large" in declared["error"] and "too large" in streamed["error"]
+    # 超限中止后不留下部分写入的临时文件
+    assert left == []
+
+
+def test_cleanup_on_error():
+    async def scenario(url):
+        return await PDFTool._download_pdf(url("/broken.pdf"))
+
+    out, left = _run(scenario)
+    assert out["error"].startswith("Download failed")
+    assert left == []
+
+
+def test_cleanup_on_cancel():
+    async def scenario(url):
+        task = asyncio.create_task(PDFTool._download_pdf(url("/slow.pdf")))
+        await asyncio.sleep(0.3)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            return "cancelled"
+        return "finished"
+
+    out, left = _run(scenario)
+    assert out == "cancelled"
+    assert left == []
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PDF 解析测试
+覆盖进程池逐页提取、内容哈希磁盘缓存、续解析缺少的页、
+同一文件不同页数上限的并发请求共享解析，以及不支持硬链接时退化为复制
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from utils.pdf_extract import PDF_AVAILABLE, PDFExtractor
+
+
+def make_pdf(path, n_pages):
+    """生成每页一行文字（"Page N marker"）的最小 PDF"""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None,
+               "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for i in range(n_pages):
+        stream = f"BT /F1 12 Tf 72 720 Td (Page {i + 1} marker) Tj ET"
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>")
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {n_pages} >>"
+    out = b"%PDF-1.4\n"
+    offsets = []
+    for i, body in enumerate(objects):
+        offsets.append(len(out))
+        out += f"{i + 1} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode("latin-1")
+    out += "".join(f"{o:010d} 00000 n \n" for o in offsets).encode("latin-1")
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("latin-1")
+    with open(path, "wb") as f:
+        f.write(out)
+
+
+def test_extract_cache_and_extend():
+    if not PDF_AVAILABLE:
+        pytest.skip("PyPDF2 / pdfplumber not installed")
+
+    async def run(d):
+        path = os.path.join(d, "doc.pdf")
+        make_pdf(path, 5)
+        extractor = PDFExtractor(workers=2, pages_per_task=2, cache_dir=os.path.join(d, "cache"))
+        try:
+            first = await extractor.extract(path, 2)
+            assert first["total_pages"] == 5 and first["parsed_pages"] == 2
+            assert "Page 2 marker" in first["pages"][1]
+            again = await extractor.extract(path, 1)
+            assert extractor.metrics["cache_hits"] == 1 and len(again["pages"]) == 1
+            # 请求更多页：只续解析第 3~5 页
+            full = await extractor.extract(path, 50)
+            assert full["parsed_pages"] == 5 and "Page 5 marker" in full["pages"][4]
+            assert extractor.metrics["pages"] == 5
+            # 换一个解析器实例，磁盘缓存仍然命中
+            other = PDFExtractor(workers=1, cache_dir=os.path.join(d, "cache"))
+            assert (await other.extract(path, 50))["pages"] == full["pages"]
+            assert other.metrics == {"cache_hits": 1, "extractions": 0, "pages": 0}
+            # 解析任务的临时副本已清理
+            assert sorted(os.listdir(d)) == ["cache", "doc.pdf"]
+        finally:
+            extractor.shutdown()
+
+    with tempfile.TemporaryDirectory() as d:
+        asyncio.run(run(d))
+
+
+def test_concurrent_requests_share_parse():
+    if not PDF_AVAILABLE:
+        pytest.skip("PyPDF2 / pdfplumber not installed")
+
+    async def run(d):
+        path = os.path.join(d, "doc.pdf")
+        make_pdf(path, 6)
+        extractor = PDFExtractor(workers=2, pages_per_task=2, cache_dir=os.path.join(d, "cache"))
+        try:
+            small, large, same = await asyncio.gather(
+                extractor.extract(path, 2), extractor.extract(path, 6), extractor.extract(path, 2))
+            assert len(small["pages"]) == 2 and len(same["pages"]) == 2 and len(large["pages"]) == 6
+            # 每页只解析一次
+            assert extractor.metrics["pages"] == 6
+        finally:
+            extractor.shutdown()
+
+    with tempfile.TemporaryDirectory() as d:
+        asyncio.run(run(d))
+
+
+def test_copy_fallback_without_hard_links():
+    if not PDF_AVAILABLE:
+        pytest.skip("PyPDF2 / pdfplumber not installed")
+
+    def no_link(src, dst):
+        raise OSError(1, "Operation not permitted")
+
+    async def run(d):
+        path = os.path.join(d, "doc.pdf")
+        make_pdf(path, 1)
+        extractor = PDFExtractor(workers=1, cache_dir=os.path.join(d, "cache"))
+        try:
+            result = await extractor.extract(path, 5)
+            assert "Page 1 marker" in result["pages"][0]
+        finally:
+            extractor.shutdown()
+
+    original = os.link
+    os.link = no_link
+    try:
+        with tempfile.TemporaryDirectory() as d:
+            asyncio.run(run(d))
+    finally:
+        os.link = original
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = skipped = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except pytest.skip.Exception as e:
+            skipped += 1
+            print(f"⏭️  {fn.__name__}: {e.msg}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed - skipped}/{len(tests)} 通过，{skipped} 跳过")
+    sys.exit(1 if failed else 0)
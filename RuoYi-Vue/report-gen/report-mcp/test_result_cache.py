@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MCP 结果缓存测试
+覆盖规范化缓存键、结果分类（正常 / 可重试错误 / 确定性错误）、TTL 选择与旧值返回
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+os.environ.pop("REDIS_URL", None)
+
+from utils.cache import (RESULT_OK, RESULT_PERMANENT, RESULT_TRANSIENT, Cache, classify_result,
+                         make_key)
+
+
+def test_make_key_canonical():
+    a = make_key("arxiv_search", {"query": "graph neural networks", "max_results": 5})
+    b = make_key("arxiv_search", {"max_results": 5, "query": "graph neural networks"})
+    assert a == b and a.startswith("tool:arxiv_search:")
+    assert a != make_key("crossref_search", {"query": "graph neural networks", "max_results": 5})
+    assert a != make_key("arxiv_search", {"query": "graph neural networks", "max_results": 6})
+    # 非 ASCII 与不可 JSON 序列化的参数也能生成稳定的键
+    assert make_key("web_search", {"query": "图神经网络"}) == make_key("web_search", {"query": "图神经网络"})
+    assert make_key("t", {"x": {1, 2}}).startswith("tool:t:")
+
+
+def test_classify_result():
+    assert classify_result({"results": []}) == RESULT_OK
+    assert classify_result([{"title": "x"}]) == RESULT_OK
+    assert classify_result({"error": ""}) == RESULT_OK
+    for message in ("empty query", "DOI not found", "Invalid DOI URL", "Unknown method: foo",
+                    "URL does not appear to be a PDF file", "PDF file too large (>50MB)",
+                    "Failed to download PDF: HTTP 404", "Crossref API error: HTTP 400", "HTTP 410: Gone"):
+        assert classify_result({"error": message}) == RESULT_PERMANENT, message
+    # 上游的临时故障，即使措辞里带 invalid / not available 也不能长期负缓存
+    for message in ("Search failed: service not available", "arXiv search failed: invalid response from upstream",
+                    "Crossref search failed: empty reply from server", "HTTP 503: Service Unavailable",
+                    "Crossref API error: HTTP 429", "arXiv search timeout (15s)", "Download failed: HTTP 408"):
+        assert classify_result({"error": message}) == RESULT_TRANSIENT, message
+    # 结构化状态码优先于错误文本
+    assert classify_result({"status": 504, "error": "arxiv_search timeout (30s)"}) == RESULT_TRANSIENT
+    assert classify_result({"status": 400, "error": "bad args"}) == RESULT_PERMANENT
+    assert classify_result({"status": 500, "error": "DOI not found"}) == RESULT_TRANSIENT
+    # DOI 查询的 found=false 只在确实不存在时长期负缓存，上游 5xx / 网络故障按可重试处理
+    assert classify_result({"doi": "10.1/x", "found": False, "error": "DOI not found"}) == RESULT_PERMANENT
+    assert classify_result({"doi": "10.1/x", "found": False, "error": "HTTP 404"}) == RESULT_PERMANENT
+    assert classify_result({"doi": "10.1/x", "found": False, "error": "HTTP 503"}) == RESULT_TRANSIENT
+    assert classify_result({"doi": "10.1/x", "found": False, "error": "Cannot connect to host"}) == RESULT_TRANSIENT
+
+
+def test_ttl_for():
+    cache = Cache()
+    assert cache.ttl_for({"results": [1]}) == (cache.ttl, cache.stale_ttl)
+    assert cache.ttl_for({"error": "empty query"}) == (cache.permanent_error_ttl, 0)
+    assert cache.ttl_for({"error": "Search failed: service not available"}) == (cache.negative_ttl, 0)
+
+
+def test_set_lookup_stale():
+    async def run():
+        cache = Cache()
+        await cache.set("k", {"results": [1]}, ttl=0.05, stale_ttl=60)
+        assert await cache.lookup("k") == ({"results": [1]}, False)
+        time.sleep(0.06)
+        value, stale = await cache.lookup("k")
+        assert value == {"results": [1]} and stale
+        assert await cache.get("k") is None
+        await cache.set("e", {"error": "Search failed: service not available"})
+        assert await cache.get("e") == {"error": "Search failed: service not available"}
+        assert await cache.lookup("missing") == (None, False)
+
+    asyncio.run(run())
+
+
+def test_defer_refresh_keeps_stale_deadline():
+    async def run():
+        cache = Cache()
+        await cache.set("k", {"results": [1]}, ttl=1, stale_ttl=5)
+        deadline = time.time() + 6
+        await cache.defer_refresh("k", 30)
+        value, stale = await cache.lookup("k")
+        assert value == {"results": [1]} and not stale
+        entry = cache._mem.get("k")
+        # 负缓存期被截断到原截止时间，旧值不会因刷新失败而续命
+        assert entry["_fresh_until"] + entry["_stale_ttl"] <= deadline + 0.01
+        await cache.defer_refresh("missing", 30)
+        assert await cache.lookup("missing") == (None, False)
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
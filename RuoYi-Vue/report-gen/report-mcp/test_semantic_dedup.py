@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+content_dedup semantic 方法测试
+覆盖向量贪心去重（相似度矩阵 / FAISS / 分块三条路径一致）、编码器缓存与并发首次加载只加载一次，
+以及未安装 sentence-transformers 时退化为词汇重叠
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import utils.embeddings as embeddings
+from tools.dedup_tool import DedupTool
+from utils.embeddings import SemanticEncoder, semantic_greedy_dedup
+
+
+class SlowModel:
+    """构造耗时的模型替身，记录构造次数；向量由文本哈希决定（相同文本相同向量，不同文本近似正交）"""
+    loads = 0
+    lock = threading.Lock()
+
+    def __init__(self, name):
+        with SlowModel.lock:
+            SlowModel.loads += 1
+        time.sleep(0.2)
+        self.seen = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        self.seen.extend(texts)
+        vectors = np.stack([np.random.default_rng(zlib.crc32(t.encode("utf-8"))).normal(size=16) for t in texts])
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def noisy_copies(seed=0):
+    rng = np.random.default_rng(seed)
+    bases = rng.normal(size=(40, 24)).astype(np.float32)
+    vectors = bases[rng.integers(0, 40, 300)] + 0.15 * rng.normal(size=(300, 24)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def test_greedy_dedup_paths_agree():
+    vectors = noisy_copies()
+    dense = semantic_greedy_dedup(vectors, 0.9)
+    kept, duplicate_of = dense
+    assert 40 <= len(kept) < 300
+    # 每个重复项都覆盖于更早保留的、相似度达标的向量
+    assert all(j < i and j in kept and vectors[i] @ vectors[j] >= 0.9 for i, j in duplicate_of.items())
+    original = embeddings.DENSE_MATRIX_LIMIT
+    embeddings.DENSE_MATRIX_LIMIT = 10
+    try:
+        if embeddings.faiss is not None:
+            assert semantic_greedy_dedup(vectors, 0.9) == dense
+        faiss_module, embeddings.faiss = embeddings.faiss, None
+        try:
+            assert semantic_greedy_dedup(vectors, 0.9) == dense
+        finally:
+            embeddings.faiss = faiss_module
+    finally:
+        embeddings.DENSE_MATRIX_LIMIT = original
+    assert semantic_greedy_dedup(np.zeros((0, 24), dtype=np.float32), 0.9) == ([], {})
+
+
+def test_encoder_loads_once_and_caches():
+    original = embeddings.SentenceTransformer
+    embeddings.SentenceTransformer = SlowModel
+    SlowModel.loads = 0
+    try:
+        encoder = SemanticEncoder(max_items=100)
+        with ThreadPoolExecutor(8) as pool:
+            results = list(pool.map(lambda i: encoder.encode([f"sentence number {i}", "shared text"]), range(8)))
+        assert SlowModel.loads == 1
+        assert all(r.shape == (2, 16) for r in results)
+        before = len(encoder.model.seen)
+        encoder.encode(["shared text", "shared text"])
+        assert len(encoder.model.seen) == before and encoder.metrics["hits"] >= 2
+    finally:
+        embeddings.SentenceTransformer = original
+
+
+def test_semantic_method_with_and_without_model():
+    content = ("Graph neural networks improve molecule property prediction. "
+               "Graph neural networks improve molecule property prediction! "
+               "Diffusion models generate high quality images from noise.")
+    original_module, original_encoder = embeddings.SentenceTransformer, embeddings._encoder
+    try:
+        embeddings.SentenceTransformer, embeddings._encoder = None, None
+        lexical = asyncio.run(DedupTool.run(content, similarity_threshold=0.8, method="semantic"))
+        assert lexical["backend"] == "lexical"
+        assert lexical["deduplicated_content"].count("Graph neural networks") == 1
+
+        embeddings.SentenceTransformer, embeddings._encoder = SlowModel, None
+        documents = ["Graph neural networks improve molecule property prediction.",
+                     "Diffusion models generate high quality images from noise.",
+                     "Graph neural networks improve molecule property prediction."]
+        result = asyncio.run(DedupTool.run(documents, similarity_threshold=0.99, method="semantic"))
+        assert result["backend"] == "embedding"
+        assert result["unique_count"] == 2 and result["duplicate_groups"] == [[0, 2]]
+    finally:
+        embeddings.SentenceTransformer, embeddings._encoder = original_module, original_encoder
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+上游 HTTP 访问测试
+覆盖主机调度器的请求间隔与排队、限流后重新排队、read_capped 字节上限，以及事件循环切换时旧会话的关闭
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.http import HostScheduler, UpstreamHTTP, read_capped
+
+CHUNK = b"x" * 64 * 1024
+
+
+def _app(hits):
+    async def small(request):
+        return web.Response(body=b"a" * 100)
+
+    async def big(request):
+        return web.Response(body=b"b" * 300_000)
+
+    async def stream(request):
+        # 分块传输，不声明 Content-Length
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        for _ in range(10):
+            await response.write(CHUNK)
+        await response.write_eof()
+        return response
+
+    async def flaky(request):
+        hits.append(time.monotonic())
+        if len(hits) == 1:
+            return web.Response(status=429, headers={"Retry-After": "0.2"})
+        return web.Response(text="ok")
+
+    app = web.Application()
+    app.router.add_get("/small", small)
+    app.router.add_get("/big", big)
+    app.router.add_get("/stream", stream)
+    app.router.add_get("/flaky", flaky)
+    return app
+
+
+def test_scheduler_spacing():
+    scheduler = HostScheduler(min_interval=0.1, max_concurrent=3)
+    started = []
+
+    async def request():
+        async with scheduler.slot():
+            started.append(time.monotonic())
+
+    async def run():
+        await asyncio.gather(*[request() for _ in range(4)])
+
+    asyncio.run(run())
+    started.sort()
+    gaps = [b - a for a, b in zip(started, started[1:])]
+    assert all(gap >= 0.09 for gap in gaps), gaps
+    assert scheduler.requests == 4 and scheduler.waiting == 0
+
+
+def test_scheduler_queues_instead_of_failing():
+    scheduler = HostScheduler(min_interval=0.0, max_concurrent=1)
+    active, peak, done = [0], [0], []
+
+    async def request(i):
+        async with scheduler.slot():
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.02)
+            active[0] -= 1
+            done.append(i)
+
+    async def run():
+        tasks = [asyncio.create_task(request(i)) for i in range(5)]
+        await asyncio.sleep(0.01)
+        # 超出并发上限的请求在本地排队
+        assert scheduler.stats()["waiting"] == 4
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+    assert peak[0] == 1 and sorted(done) == list(range(5))
+    assert scheduler.stats()["waiting"] == 0 and scheduler.stats()["avg_wait_ms"] > 0
+
+
+def test_penalize_pushes_back_schedule():
+    scheduler = HostScheduler(min_interval=0.0, max_concurrent=1)
+
+    async def run():
+        scheduler.penalize(0.15)
+        start = time.monotonic()
+        async with scheduler.slot():
+            return time.monotonic() - start
+
+    assert asyncio.run(run()) >= 0.14
+
+
+def test_throttled_request_requeued():
+    hits = []
+
+    async def run():
+        async with TestServer(_app(hits)) as server:
+            http = UpstreamHTTP()
+            http.schedulers[server.host] = HostScheduler(min_interval=0.0, max_concurrent=1)
+            try:
+                async with http.get("web", str(server.make_url("/flaky"))) as response:
+                    assert response.status == 200 and await response.text() == "ok"
+            finally:
+                await http.close()
+
+    asyncio.run(run())
+    # 429 后按 Retry-After 退避，再次排队成功
+    assert len(hits) == 2 and hits[1] - hits[0] >= 0.19
+
+
+def test_read_capped():
+    async def run():
+        async with TestServer(_app([])) as server:
+            http = UpstreamHTTP()
+            try:
+                async def fetch(path, max_bytes):
+                    async with http.get("web", str(server.make_url(path))) as response:
+                        return await read_capped(response, max_bytes)
+
+                assert await fetch("/small", 1000) == (b"a" * 100, False)
+                body, truncated = await fetch("/big", 1000)
+                assert truncated and body == b"b" * 1000
+                body, truncated = await fetch("/stream", 100_000)
+                assert truncated and len(body) == 100_000
+                body, truncated = await fetch("/stream", len(CHUNK) * 10)
+                assert not truncated and len(body) == len(CHUNK) * 10
+            finally:
+                await http.close()
+
+    asyncio.run(run())
+
+
+def test_sessions_closed_on_loop_change():
+    http = UpstreamHTTP()
+
+    async def open_session():
+        return http.session("web")
+
+    first = asyncio.run(open_session())
+
+    async def switch():
+        second = http.session("web")
+        await http.close()
+        return second
+
+    second = asyncio.run(switch())
+    assert first is not second
+    assert first.closed and second.closed
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+网页内容提取测试
+覆盖结果页并发提取的截止时间、未完成任务的取消与 timeout 标记，以及单页下载的字节上限
+"""
+
+import asyncio
+import os
+import sys
+import time
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from tools import web_search_tool
+from tools.web_search_tool import WebSearchTool
+from utils.http import get_http
+
+
+class SlowFetch:
+    """模拟页面抓取：slow 开头的 URL 长时间不返回，记录并发数与被取消的请求"""
+
+    def __init__(self, delay: float = 5.0):
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.cancelled = []
+
+    async def __call__(self, url):
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+        try:
+            await asyncio.sleep(self.delay if url.startswith("slow") else 0.01)
+            return {"status": "success", "content": f"content of {url}"}
+        except asyncio.CancelledError:
+            self.cancelled.append(url)
+            raise
+        finally:
+            self.active -= 1
+
+
+def _extract(results, fetch, deadline):
+    async def run():
+        with mock.patch.object(WebSearchTool, "_extract_page_content", staticmethod(fetch)):
+            start = time.monotonic()
+            await WebSearchTool._extract_all(results, deadline=deadline)
+            return time.monotonic() - start
+
+    return asyncio.run(run())
+
+
+def test_deadline_cancels_pending():
+    fetch = SlowFetch()
+    results = [{"url": "fast-1"}, {"url": "slow-1"}, {"url": "fast-2"}, {"url": "slow-2"}, {"title": "no url"}]
+    elapsed = _extract(results, fetch, deadline=0.2)
+    # 到达截止时间即返回，不等慢页面
+    assert elapsed < 1.0, elapsed
+    assert results[0]["status"] == "success" and results[2]["status"] == "success"
+    for result in (results[1], results[3]):
+        assert result["status"] == "timeout" and "deadline" in result["error"]
+    # 未完成的抓取被取消，而不是在后台继续占用连接
+    assert sorted(fetch.cancelled) == ["slow-1", "slow-2"] and fetch.active == 0
+    # 没有 URL 的结果没有抓取，不应被标记为超时
+    assert "status" not in results[4]
+
+
+def test_all_done_before_deadline():
+    fetch = SlowFetch()
+    results = [{"url": f"fast-{i}"} for i in range(10)]
+    _extract(results, fetch, deadline=5.0)
+    assert all(result["status"] == "success" for result in results)
+    assert fetch.peak <= web_search_tool.EXTRACT_CONCURRENCY and not fetch.cancelled
+
+
+def test_page_byte_cap():
+    paragraph = "<p>" + "graph neural networks " * 50 + "</p>"
+    page = f"<html><head><title>T</title></head><body><article>{paragraph * 200}</article></body></html>"
+
+    async def handler(request):
+        return web.Response(text=page, content_type="text/html")
+
+    async def run():
+        app = web.Application()
+        app.router.add_get("/page", handler)
+        async with TestServer(app) as server:
+            url = str(server.make_url("/page"))
+            try:
+                with mock.patch.object(web_search_tool, "MAX_PAGE_BYTES", 10_000):
+                    capped = await WebSearchTool._extract_page_content(url)
+                full = await WebSearchTool._extract_page_content(url)
+            finally:
+                await get_http().close()
+        return capped, full
+
+    capped, full = asyncio.run(run())
+    assert len(page) > 10_000
+    assert capped["status"] == "success" and capped["truncated"] is True
+    assert capped["content_length"] < 10_000 < full["content_length"]
+    assert full["truncated"] is False and capped["page_title"] == "T"
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -1,8 +1,8 @@
 #解析Arxiv返回的数据
 import feedparser
-import aiohttp
 import asyncio
 from urllib.parse import quote_plus
+from utils.http import get_http
 
 class ArxivTool:
     name = "arxiv_search"
@@ -24,12 +24,11 @@ class ArxivTool:
         url = base + q
         
         try:
-            timeout = aiohttp.ClientTimeout(total=15.0)  # 15秒超时
-            async with aiohttp.ClientSession(timeout=timeout) as session:
-                async with session.get(url) as response:
-                    if response.status != 200:
-                        return {"error": f"HTTP {response.status}: {response.reason}"}
-                    content = await response.text()
+            # 15秒超时（不含排队时间）；arXiv 要求请求间隔 ≥3 秒，由调度器排队保证
+            async with get_http().get("arxiv", url, timeout=15.0) as response:
+                if response.status != 200:
+                    return {"error": f"HTTP {response.status}: {response.reason}"}
+                content = await response.text()
                     
             # 使用 feedparser 解析获取的内容
             feed = feedparser.parse(content)
@@ -1,8 +1,8 @@
-import aiohttp
 import asyncio
 from typing import List, Dict, Any
 import re
 from urllib.parse import quote
+from utils.http import get_http
 
 class CrossrefTool:
     name = "crossref_search"
@@ -35,31 +35,26 @@ class CrossrefTool:
                 'select': 'DOI,title,author,published-print,published-online,container-title,abstract,URL,type,publisher,subject'
             }
             
-            headers = {
-                'User-Agent': 'ReportGenerator/1.0 (mailto:admin@example.com)'
-            }
+            url = f"{base_url}?" + "&".join([f"{k}={quote(str(v))}" for k, v in params.items()])
             
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as session:
-                url = f"{base_url}?" + "&".join([f"{k}={quote(str(v))}" for k, v in params.items()])
-                
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        items = data.get('message', {}).get('items', [])
-                        
-                        results = []
-                        for item in items:
-                            result = CrossrefTool._parse_crossref_item(item)
-                            results.append(result)
-                        
-                        return {
-                            "query": query,
-                            "count": len(results),
-                            "total_results": data.get('message', {}).get('total-results', 0),
-                            "results": results
-                        }
-                    else:
-                        return {"error": f"Crossref API error: HTTP {response.status}"}
+            async with get_http().get("crossref", url, timeout=15) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    items = data.get('message', {}).get('items', [])
+                    
+                    results = []
+                    for item in items:
+                        result = CrossrefTool._parse_crossref_item(item)
+                        results.append(result)
+                    
+                    return {
+                        "query": query,
+                        "count": len(results),
+                        "total_results": data.get('message', {}).get('total-results', 0),
+                        "results": results
+                    }
+                else:
+                    return {"error": f"Crossref API error: HTTP {response.status}"}
         except Exception as e:
             return {"error": f"Crossref search failed: {str(e)}"}
     
@@ -153,33 +148,28 @@ class DOITool:
         try:
             # 使用 Crossref API 查询 DOI
             url = f"https://api.crossref.org/works/{doi}"
-            headers = {
-                'User-Agent': 'ReportGenerator/1.0 (mailto:admin@example.com)'
-            }
-            
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        item = data.get('message', {})
-                        result = CrossrefTool._parse_crossref_item(item)
-                        return {
-                            "doi": doi,
-                            "found": True,
-                            "result": result
-                        }
-                    elif response.status == 404:
-                        return {
-                            "doi": doi,
-                            "found": False,
-                            "error": "DOI not found"
-                        }
-                    else:
-                        return {
-                            "doi": doi,
-                            "found": False,
-                            "error": f"HTTP {response.status}"
-                        }
+            async with get_http().get("crossref", url, timeout=10) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    item = data.get('message', {})
+                    result = CrossrefTool._parse_crossref_item(item)
+                    return {
+                        "doi": doi,
+                        "found": True,
+                        "result": result
+                    }
+                elif response.status == 404:
+                    return {
+                        "doi": doi,
+                        "found": False,
+                        "error": "DOI not found"
+                    }
+                else:
+                    return {
+                        "doi": doi,
+                        "found": False,
+                        "error": f"HTTP {response.status}"
+                    }
         except Exception as e:
             return {
                 "doi": doi,
@@ -5,10 +5,12 @@ from typing import Dict, Any, List, Set, Tuple
 from difflib import SequenceMatcher
 from collections import defaultdict
 import json
+from utils.minhash import NearDuplicateIndex, greedy_dedup
+from utils.embeddings import embeddings_available, get_encoder, semantic_greedy_dedup
 
 class DedupTool:
     name = "content_dedup"
-    description = "Remove duplicate content from text or list of documents. Args: content (str|list), similarity_threshold(float)=0.8, method(str)='hash'"
+    description = "Remove duplicate content from text or list of documents. Args: content (str|list), similarity_threshold(float)=0.8, method(str)='hash' (hash|similarity|minhash|semantic)"
     
     @staticmethod
     def metadata():
@@ -50,6 +52,10 @@ class DedupTool:
             deduplicated = DedupTool._hash_based_dedup(content)
         elif method == 'similarity':
             deduplicated = DedupTool._similarity_based_dedup(content, similarity_threshold)
+        elif method == 'minhash':
+            deduplicated = DedupTool._minhash_dedup(content, similarity_threshold)
+        elif method == 'semantic' and embeddings_available():
+            deduplicated = await asyncio.to_thread(DedupTool._embedding_dedup, content, similarity_threshold)
         elif method == 'semantic':
             deduplicated = DedupTool._semantic_dedup(content, similarity_threshold)
         else:
@@ -57,6 +63,7 @@ class DedupTool:
         
         return {
             'method': method,
+            'backend': DedupTool._backend(method),
             'original_length': original_length,
             'deduplicated_length': len(deduplicated),
             'reduction_ratio': (original_length - len(deduplicated)) / original_length if original_length > 0 else 0,
@@ -76,6 +83,10 @@ class DedupTool:
             unique_docs, duplicates = DedupTool._hash_based_multi_dedup(documents)
         elif method == 'similarity':
             unique_docs, duplicates = DedupTool._similarity_based_multi_dedup(documents, similarity_threshold)
+        elif method == 'minhash':
+            unique_docs, duplicates = DedupTool._minhash_multi_dedup(documents, similarity_threshold)
+        elif method == 'semantic' and embeddings_available():
+            unique_docs, duplicates = await asyncio.to_thread(DedupTool._embedding_multi_dedup, documents, similarity_threshold)
         elif method == 'semantic':
             unique_docs, duplicates = DedupTool._semantic_multi_dedup(documents, similarity_threshold)
         else:
@@ -83,6 +94,7 @@ class DedupTool:
         
         return {
             'method': method,
+            'backend': DedupTool._backend(method),
             'original_count': original_count,
             'unique_count': len(unique_docs),
             'duplicates_count': len(duplicates),
@@ -92,6 +104,13 @@ class DedupTool:
             'duplicates_found': len(duplicates) > 0
         }
     
+    @staticmethod
+    def _backend(method: str) -> str:
+        """semantic 方法在未安装 sentence-transformers 时退化为词汇重叠"""
+        if method == 'semantic':
+            return 'embedding' if embeddings_available() else 'lexical'
+        return method
+    
     @staticmethod
     def _hash_based_dedup(content: str) -> str:
         """基于哈希的去重"""
@@ -128,9 +147,29 @@ class DedupTool:
         
         return '. '.join(unique_sentences)
     
+    @staticmethod
+    def _minhash_dedup(content: str, threshold: float) -> str:
+        """基于 MinHash + LSH 的去重：与 similarity 方法结果一致，只对候选句子做精确比较"""
+        sentences = re.split(r'[.!?]+', content)
+        sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
+        
+        kept, _ = greedy_dedup(sentences, threshold)
+        return '. '.join(sentences[i] for i in kept)
+    
+    @staticmethod
+    def _embedding_dedup(content: str, threshold: float) -> str:
+        """基于句向量的语义去重：一次批量编码，余弦相似度 ≥ threshold 视为重复"""
+        sentences = re.split(r'[.!?]+', content)
+        sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
+        if not sentences:
+            return ''
+        
+        kept, _ = semantic_greedy_dedup(get_encoder().encode(sentences), threshold)
+        return '. '.join(sentences[i] for i in kept)
+    
     @staticmethod
     def _semantic_dedup(content: str, threshold: float) -> str:
-        """基于语义的去重（简化版）"""
+        """基于语义的去重（简化版，未安装句向量模型时使用）"""
         # 这里使用简化的语义去重，基于关键词重叠
         sentences = re.split(r'[.!?]+', content)
         sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
@@ -222,6 +261,28 @@ class DedupTool:
         
         return unique_docs, duplicates
     
+    @staticmethod
+    def _minhash_multi_dedup(documents: List[str], threshold: float) -> Tuple[List[str], List[List[int]]]:
+        """多文档 MinHash + LSH 去重，重复组格式与 similarity 方法相同"""
+        kept, duplicate_of = greedy_dedup(documents, threshold)
+        
+        groups: Dict[int, List[int]] = {}
+        for i, original in sorted(duplicate_of.items()):
+            groups.setdefault(original, [original]).append(i)
+        
+        return [documents[i] for i in kept], list(groups.values())
+    
+    @staticmethod
+    def _embedding_multi_dedup(documents: List[str], threshold: float) -> Tuple[List[str], List[List[int]]]:
+        """多文档句向量语义去重，重复组格式与 similarity 方法相同"""
+        kept, duplicate_of = semantic_greedy_dedup(get_encoder().encode(documents), threshold)
+        
+        groups: Dict[int, List[int]] = {}
+        for i, original in sorted(duplicate_of.items()):
+            groups.setdefault(original, [original]).append(i)
+        
+        return [documents[i] for i in kept], list(groups.values())
+    
     @staticmethod
     def _semantic_multi_dedup(documents: List[str], threshold: float) -> Tuple[List[str], List[List[int]]]:
         """多文档语义去重"""
@@ -265,7 +326,7 @@ class DedupTool:
 
 class MergeTool:
     name = "content_merge"
-    description = "Merge similar content intelligently. Args: contents (list), merge_strategy(str)='smart', similarity_threshold(float)=0.7"
+    description = "Merge similar content intelligently. Args: contents (list), merge_strategy(str)='smart' (smart|minhash|longest|concatenate|union), similarity_threshold(float)=0.7"
     
     @staticmethod
     def metadata():
@@ -287,6 +348,8 @@ class MergeTool:
         try:
             if merge_strategy == 'smart':
                 result = MergeTool._smart_merge(contents, similarity_threshold)
+            elif merge_strategy == 'minhash':
+                result = MergeTool._minhash_merge(contents, similarity_threshold)
             elif merge_strategy == 'longest':
                 result = MergeTool._longest_merge(contents)
             elif merge_strategy == 'concatenate':
@@ -348,6 +411,46 @@ class MergeTool:
             }
         }
     
+    @staticmethod
+    def _minhash_merge(contents: List[str], threshold: float) -> Dict[str, Any]:
+        """与 smart 合并语义相同，相似句子的查找改为 MinHash + LSH 候选 + 直方图上界过滤 + 精确校验"""
+        sorted_contents = sorted(enumerate(contents), key=lambda x: len(x[1]), reverse=True)
+        
+        index = NearDuplicateIndex(threshold)
+        merged_sentences: List[str] = []
+        used_indices = set()
+        
+        for original_index, content in sorted_contents:
+            sentences = re.split(r'[.!?]+', content)
+            sentences = [s.strip() for s in sentences if len(s.strip()) > 10]
+            
+            for sentence in sentences:
+                slot = index.first_similar(sentence)
+                if slot is None:
+                    index.add(sentence)
+                    merged_sentences.append(sentence)
+                elif len(sentence) > len(merged_sentences[slot]):
+                    # 新句子更长则替换，并把新签名也挂到同一位置
+                    merged_sentences[slot] = sentence
+                    index.replace(slot, sentence)
+            
+            used_indices.add(original_index)
+        
+        merged_content = '. '.join(merged_sentences)
+        total_length = sum(len(c) for c in contents)
+        
+        return {
+            'merged_content': merged_content,
+            'merge_info': {
+                'strategy': 'minhash',
+                'original_count': len(contents),
+                'used_indices': list(used_indices),
+                'original_total_length': total_length,
+                'merged_length': len(merged_content),
+                'compression_ratio': 1 - (len(merged_content) / total_length) if total_length else 0
+            }
+        }
+    
     @staticmethod
     def _longest_merge(contents: List[str]) -> Dict[str, Any]:
         """选择最长的内容"""
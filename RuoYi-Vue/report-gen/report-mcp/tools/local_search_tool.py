@@ -0,0 +1,75 @@
+import asyncio
+import os
+from typing import Any, Dict, List, Optional
+
+from tools.arxiv_tool import ArxivTool
+from utils.local_index import get_local_index
+
+# 本地有效命中数（覆盖查询词比例达到 LOCAL_INDEX_MIN_COVERAGE）低于该比例（相对 max_results）时回退到在线 arXiv 检索
+MIN_RECALL_RATIO = float(os.getenv("LOCAL_INDEX_MIN_RECALL", "0.5"))
+
+
+class LocalSearchTool:
+    name = "local_search"
+    description = ("Search papers from the local literature index (SQLite FTS5), falling back to live arXiv when too few hits match the query terms. "
+                   "Args: query (str), max_results(int)=5, min_results(int)=None, fallback(bool)=True")
+
+    @staticmethod
+    def metadata():
+        return {
+            "name": LocalSearchTool.name,
+            "description": LocalSearchTool.description,
+            "args": {
+                "query": "string",
+                "max_results": "int",
+                "min_results": "int",
+                "fallback": "bool"
+            }
+        }
+
+    @staticmethod
+    async def run(query: str, max_results: int = 5, min_results: Optional[int] = None, fallback: bool = True):
+        if not query:
+            return {"error": "empty query"}
+
+        index = get_local_index()
+        try:
+            items = await asyncio.to_thread(index.search, query, max_results)
+        except Exception as e:
+            items = []
+            local_error = str(e)
+        else:
+            local_error = None
+
+        if min_results is None:
+            min_results = max(1, int(max_results * MIN_RECALL_RATIO))
+        source = "local"
+
+        if len(items) < min_results and fallback:
+            live = await ArxivTool.run(query, max_results)
+            if "error" not in live:
+                await asyncio.to_thread(index.ingest_result, ArxivTool.name, live)
+                items = LocalSearchTool._merge(items, live.get("items", []), max_results)
+                source = "local+arxiv"
+            elif not items:
+                # 本地无结果且在线失败：透传在线错误，便于缓存层按错误类型处理
+                return live
+
+        result = {"query": query, "count": len(items), "items": items, "source": source}
+        if local_error:
+            result["local_error"] = local_error
+        return result
+
+    @staticmethod
+    def _merge(local: List[Dict[str, Any]], live: List[Dict[str, Any]], max_results: int) -> List[Dict[str, Any]]:
+        """本地结果在前，在线结果按 url/标题去重后补足"""
+        seen = {(it.get("url") or "").lower() for it in local} | {(it.get("title") or "").lower() for it in local}
+        seen.discard("")
+        merged = list(local)
+        for it in live:
+            if (it.get("url") or "").lower() in seen or (it.get("title") or "").lower() in seen:
+                continue
+            merged.append(it)
+            if len(merged) >= max_results:
+                break
+        return merged
@@ -1,19 +1,17 @@
-import aiohttp
 import asyncio
-import io
 import re
 from typing import Dict, Any, List
 from urllib.parse import urlparse
 import hashlib
 import os
 import tempfile
+from utils.http import get_http
+from utils.pdf_extract import PDF_AVAILABLE, get_pdf_extractor
 
-try:
-    import PyPDF2
-    import pdfplumber
-    PDF_AVAILABLE = True
-except ImportError:
-    PDF_AVAILABLE = False
+# 下载上限（字节）、流式读取块大小、临时文件目录（默认系统临时目录）
+MAX_PDF_BYTES = int(os.getenv("PDF_MAX_BYTES", str(50 * 1024 * 1024)))
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+SPOOL_DIR = os.getenv("PDF_SPOOL_DIR") or None
 
 class PDFTool:
     name = "pdf_extract"
@@ -39,135 +37,126 @@ class PDFTool:
         if not PDF_AVAILABLE:
             return {"error": "PDF processing libraries not available. Please install PyPDF2 and pdfplumber."}
         
+        pdf_file = None
         try:
-            # 下载 PDF 文件
-            pdf_content = await PDFTool._download_pdf(url)
-            if 'error' in pdf_content:
-                return pdf_content
+            # 下载 PDF 文件（流式写入临时文件）
+            pdf_file = await PDFTool._download_pdf(url)
+            if 'error' in pdf_file:
+                return pdf_file
             
             # 提取文本和元数据
             result = await PDFTool._extract_pdf_content(
-                pdf_content['content'], 
+                pdf_file['path'], 
                 extract_images, 
-                max_pages
+                max_pages,
+                pdf_file['sha256']
             )
             
             result['url'] = url
-            result['file_size'] = pdf_content['size']
+            result['file_size'] = pdf_file['size']
             
             return result
         except Exception as e:
             return {"error": f"PDF processing failed: {str(e)}"}
+        finally:
+            if pdf_file and pdf_file.get('path'):
+                PDFTool._remove(pdf_file['path'])
+    
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
     
     @staticmethod
     async def _download_pdf(url: str) -> Dict[str, Any]:
-        """下载 PDF 文件"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
+        """
+        流式下载 PDF 到临时文件，边下载边计算 SHA-256
+        Content-Length 或已接收字节数超过上限时立即中止，内存占用与文件大小无关
+        """
+        too_large = {"error": f"PDF file too large (>{MAX_PDF_BYTES // (1024 * 1024)}MB)"}
+        path = None
+        complete = False
         try:
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=30)) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        content_type = response.headers.get('content-type', '').lower()
-                        if 'pdf' not in content_type:
-                            # 检查 URL 是否以 .pdf 结尾
-                            if not url.lower().endswith('.pdf'):
-                                return {"error": "URL does not appear to be a PDF file"}
-                        
-                        content = await response.read()
-                        
-                        # 检查文件大小（限制为 50MB）
-                        if len(content) > 50 * 1024 * 1024:
-                            return {"error": "PDF file too large (>50MB)"}
-                        
-                        return {
-                            "content": content,
-                            "size": len(content)
-                        }
-                    else:
-                        return {"error": f"Failed to download PDF: HTTP {response.status}"}
+            async with get_http().get("pdf", url, timeout=30) as response:
+                if response.status != 200:
+                    return {"error": f"Failed to download PDF: HTTP {response.status}"}
+                
+                content_type = response.headers.get('content-type', '').lower()
+                if 'pdf' not in content_type:
+                    # 检查 URL 是否以 .pdf 结尾
+                    if not url.lower().endswith('.pdf'):
+                        return {"error": "URL does not appear to be a PDF file"}
+                
+                # 声明的大小已超限则不下载
+                if response.content_length is not None and response.content_length > MAX_PDF_BYTES:
+                    return too_large
+                
+                digest = hashlib.sha256()
+                size = 0
+                fd, path = tempfile.mkstemp(suffix=".pdf", dir=SPOOL_DIR)
+                with os.fdopen(fd, "wb") as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_PDF_BYTES:
+                            return too_large
+                        f.write(chunk)
+                        digest.update(chunk)
+                
+                complete = True
+                return {
+                    "path": path,
+                    "size": size,
+                    "sha256": digest.hexdigest()
+                }
         except Exception as e:
             return {"error": f"Download failed: {str(e)}"}
+        finally:
+            # 超限、出错或被取消时删除未写完的临时文件
+            if path and not complete:
+                PDFTool._remove(path)
     
     @staticmethod
-    async def _extract_pdf_content(pdf_content: bytes, extract_images: bool, max_pages: int) -> Dict[str, Any]:
-        """提取 PDF 内容"""
+    async def _extract_pdf_content(pdf_path: str, extract_images: bool, max_pages: int, sha256: str = None) -> Dict[str, Any]:
+        """提取 PDF 内容（解析在进程池中进行，结果按文件内容哈希缓存）"""
         try:
-            # 使用 io.BytesIO 创建文件对象
-            pdf_file = io.BytesIO(pdf_content)
-            
-            # 使用 PyPDF2 提取基本信息
-            pdf_reader = PyPDF2.PdfReader(pdf_file)
-            
-            # 获取元数据
-            metadata = {}
-            if pdf_reader.metadata:
-                metadata = {
-                    'title': pdf_reader.metadata.get('/Title', ''),
-                    'author': pdf_reader.metadata.get('/Author', ''),
-                    'subject': pdf_reader.metadata.get('/Subject', ''),
-                    'creator': pdf_reader.metadata.get('/Creator', ''),
-                    'producer': pdf_reader.metadata.get('/Producer', ''),
-                    'creation_date': str(pdf_reader.metadata.get('/CreationDate', '')),
-                    'modification_date': str(pdf_reader.metadata.get('/ModDate', ''))
-                }
-            
-            total_pages = len(pdf_reader.pages)
-            pages_to_process = min(total_pages, max_pages)
-            
-            # 使用 pdfplumber 提取文本（更准确）
-            pdf_file.seek(0)  # 重置文件指针
-            
-            text_content = []
-            tables = []
-            
-            with pdfplumber.open(pdf_file) as pdf:
-                for i, page in enumerate(pdf.pages[:pages_to_process]):
-                    # 提取文本
-                    page_text = page.extract_text()
-                    if page_text:
-                        text_content.append(f"--- Page {i+1} ---\n{page_text}")
-                    
-                    # 提取表格
-                    page_tables = page.extract_tables()
-                    if page_tables:
-                        for j, table in enumerate(page_tables):
-                            tables.append({
-                                'page': i+1,
-                                'table_index': j+1,
-                                'data': table
-                            })
-            
-            # 合并所有文本
-            full_text = '\n\n'.join(text_content)
-            
-            # 生成摘要
-            summary = PDFTool._generate_summary(full_text)
-            
-            # 提取关键信息
-            key_info = PDFTool._extract_key_information(full_text)
-            
-            result = {
-                'status': 'success',
-                'metadata': metadata,
-                'total_pages': total_pages,
-                'processed_pages': pages_to_process,
-                'text_length': len(full_text),
-                'text_content': full_text[:5000],  # 限制返回的文本长度
-                'full_text_available': len(full_text) > 5000,
-                'summary': summary,
-                'key_information': key_info,
-                'tables_count': len(tables),
-                'tables': tables[:5] if tables else []  # 只返回前5个表格
-            }
-            
-            return result
-            
+            extracted = await get_pdf_extractor().extract(pdf_path, max_pages, sha256)
+            return await asyncio.to_thread(PDFTool._build_result, extracted)
         except Exception as e:
             return {"error": f"PDF content extraction failed: {str(e)}"}
     
+    @staticmethod
+    def _build_result(extracted: Dict[str, Any]) -> Dict[str, Any]:
+        """由逐页文本和表格组装返回结果"""
+        text_content = [f"--- Page {i+1} ---\n{page_text}"
+                        for i, page_text in enumerate(extracted['pages']) if page_text]
+        tables = extracted['tables']
+        
+        # 合并所有文本
+        full_text = '\n\n'.join(text_content)
+        
+        # 生成摘要
+        summary = PDFTool._generate_summary(full_text)
+        
+        # 提取关键信息
+        key_info = PDFTool._extract_key_information(full_text)
+        
+        return {
+            'status': 'success',
+            'sha256': extracted['sha256'],
+            'metadata': extracted['metadata'],
+            'total_pages': extracted['total_pages'],
+            'processed_pages': extracted['parsed_pages'],
+            'text_length': len(full_text),
+            'text_content': full_text[:5000],  # 限制返回的文本长度
+            'full_text_available': len(full_text) > 5000,
+            'summary': summary,
+            'key_information': key_info,
+            'tables_count': len(tables),
+            'tables': tables[:5] if tables else []  # 只返回前5个表格
+        }
+    
     @staticmethod
     def _generate_summary(text: str) -> str:
         """生成文档摘要"""
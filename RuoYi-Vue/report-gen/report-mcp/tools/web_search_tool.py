@@ -1,9 +1,15 @@
-import aiohttp
 import asyncio
+import os
 from bs4 import BeautifulSoup
 from urllib.parse import urljoin, urlparse
 import re
 from typing import List, Dict, Any
+from utils.http import get_http, read_capped, decode_body
+
+# 结果页并发抓取上限、整次调用的截止时间（秒）、单页下载上限（字节）
+EXTRACT_CONCURRENCY = int(os.getenv("WEB_EXTRACT_CONCURRENCY", "4"))
+EXTRACT_DEADLINE = float(os.getenv("WEB_EXTRACT_DEADLINE", "20"))
+MAX_PAGE_BYTES = int(os.getenv("WEB_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
 
 class WebSearchTool:
     name = "web_search"
@@ -31,10 +37,7 @@ class WebSearchTool:
             search_results = await WebSearchTool._search_duckduckgo(query, max_results)
             
             if extract_content:
-                # 提取每个页面的内容
-                for result in search_results:
-                    content = await WebSearchTool._extract_page_content(result['url'])
-                    result.update(content)
+                await WebSearchTool._extract_all(search_results)
             
             return {
                 "query": query,
@@ -47,42 +50,37 @@ class WebSearchTool:
     @staticmethod
     async def _search_duckduckgo(query: str, max_results: int) -> List[Dict[str, Any]]:
         """使用 DuckDuckGo 进行搜索"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
+        # DuckDuckGo 即时答案 API
+        search_url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
         
-        async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as session:
-            # DuckDuckGo 即时答案 API
-            search_url = f"https://api.duckduckgo.com/?q={query}&format=json&no_html=1&skip_disambig=1"
-            
-            try:
-                async with session.get(search_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        results = []
-                        
-                        # 处理相关主题
-                        if 'RelatedTopics' in data:
-                            for topic in data['RelatedTopics'][:max_results]:
-                                if isinstance(topic, dict) and 'FirstURL' in topic:
-                                    results.append({
-                                        'title': topic.get('Text', '').split(' - ')[0] if ' - ' in topic.get('Text', '') else topic.get('Text', ''),
-                                        'url': topic['FirstURL'],
-                                        'snippet': topic.get('Text', '')
-                                    })
-                        
-                        # 如果没有足够的结果，使用备用搜索方法
-                        if len(results) < max_results:
-                            backup_results = await WebSearchTool._backup_search(session, query, max_results - len(results))
-                            results.extend(backup_results)
-                        
-                        return results[:max_results]
-            except Exception as e:
-                # 如果 DuckDuckGo API 失败，使用备用方法
-                return await WebSearchTool._backup_search(session, query, max_results)
+        try:
+            async with get_http().get("web", search_url, timeout=10) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = []
+                    
+                    # 处理相关主题
+                    if 'RelatedTopics' in data:
+                        for topic in data['RelatedTopics'][:max_results]:
+                            if isinstance(topic, dict) and 'FirstURL' in topic:
+                                results.append({
+                                    'title': topic.get('Text', '').split(' - ')[0] if ' - ' in topic.get('Text', '') else topic.get('Text', ''),
+                                    'url': topic['FirstURL'],
+                                    'snippet': topic.get('Text', '')
+                                })
+                    
+                    # 如果没有足够的结果，使用备用搜索方法
+                    if len(results) < max_results:
+                        backup_results = await WebSearchTool._backup_search(query, max_results - len(results))
+                        results.extend(backup_results)
+                    
+                    return results[:max_results]
+        except Exception as e:
+            # 如果 DuckDuckGo API 失败，使用备用方法
+            return await WebSearchTool._backup_search(query, max_results)
     
     @staticmethod
-    async def _backup_search(session: aiohttp.ClientSession, query: str, max_results: int) -> List[Dict[str, Any]]:
+    async def _backup_search(query: str, max_results: int) -> List[Dict[str, Any]]:
         """备用搜索方法"""
         # 使用一些公开的搜索引擎或者返回预定义的学术资源
         academic_sources = [
@@ -115,80 +113,109 @@ class WebSearchTool:
         
         return academic_sources[:max_results]
     
+    @staticmethod
+    async def _extract_all(results: List[Dict[str, Any]], deadline: float = EXTRACT_DEADLINE):
+        """
+        并发提取结果页内容（最多 EXTRACT_CONCURRENCY 个同时进行）
+        到达截止时间仍未完成的页面标记为 timeout，已完成的照常返回
+        """
+        sem = asyncio.Semaphore(EXTRACT_CONCURRENCY)
+
+        async def _one(result: Dict[str, Any]):
+            async with sem:
+                result.update(await WebSearchTool._extract_page_content(result['url']))
+
+        targets = [result for result in results if result.get('url')]
+        tasks = [asyncio.create_task(_one(result)) for result in targets]
+        if not tasks:
+            return
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            for result in targets:
+                if 'status' not in result:
+                    result.update({'status': 'timeout', 'error': f'extraction deadline ({deadline:g}s) exceeded'})
+
     @staticmethod
     async def _extract_page_content(url: str) -> Dict[str, Any]:
         """提取网页内容"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         try:
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=15)) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
-                        
-                        # 移除脚本和样式元素
-                        for script in soup(["script", "style"]):
-                            script.decompose()
-                        
-                        # 提取标题
-                        title = soup.find('title')
-                        title_text = title.get_text().strip() if title else ''
-                        
-                        # 提取主要内容
-                        content_selectors = [
-                            'article', 'main', '.content', '#content', 
-                            '.post-content', '.entry-content', '.article-content'
-                        ]
-                        
-                        content_text = ''
-                        for selector in content_selectors:
-                            content_elem = soup.select_one(selector)
-                            if content_elem:
-                                content_text = content_elem.get_text()
-                                break
-                        
-                        # 如果没有找到主要内容，使用 body
-                        if not content_text:
-                            body = soup.find('body')
-                            content_text = body.get_text() if body else ''
-                        
-                        # 清理文本
-                        content_text = re.sub(r'\s+', ' ', content_text).strip()
-                        
-                        # 提取元数据
-                        meta_description = ''
-                        meta_desc = soup.find('meta', attrs={'name': 'description'})
-                        if meta_desc:
-                            meta_description = meta_desc.get('content', '')
-                        
-                        # 提取关键词
-                        meta_keywords = ''
-                        meta_kw = soup.find('meta', attrs={'name': 'keywords'})
-                        if meta_kw:
-                            meta_keywords = meta_kw.get('content', '')
-                        
-                        return {
-                            'page_title': title_text,
-                            'content': content_text[:2000],  # 限制内容长度
-                            'meta_description': meta_description,
-                            'meta_keywords': meta_keywords,
-                            'content_length': len(content_text),
-                            'status': 'success'
-                        }
-                    else:
-                        return {
-                            'status': 'error',
-                            'error': f'HTTP {response.status}'
-                        }
+            async with get_http().get("web", url, timeout=15) as response:
+                if response.status == 200:
+                    body, truncated = await read_capped(response, MAX_PAGE_BYTES)
+                    html = decode_body(response, body)
+                else:
+                    return {
+                        'status': 'error',
+                        'error': f'HTTP {response.status}'
+                    }
+            # HTML 解析是 CPU 密集操作，放到线程中避免阻塞事件循环
+            parsed = await asyncio.to_thread(WebSearchTool._parse_page, html)
+            parsed['truncated'] = truncated
+            return parsed
         except Exception as e:
             return {
                 'status': 'error',
                 'error': str(e)
             }
 
+    @staticmethod
+    def _parse_page(html: str) -> Dict[str, Any]:
+        """解析 HTML，提取标题、正文和元数据"""
+        soup = BeautifulSoup(html, 'html.parser')
+        
+        # 移除脚本和样式元素
+        for script in soup(["script", "style"]):
+            script.decompose()
+        
+        # 提取标题
+        title = soup.find('title')
+        title_text = title.get_text().strip() if title else ''
+        
+        # 提取主要内容
+        content_selectors = [
+            'article', 'main', '.content', '#content', 
+            '.post-content', '.entry-content', '.article-content'
+        ]
+        
+        content_text = ''
+        for selector in content_selectors:
+            content_elem = soup.select_one(selector)
+            if content_elem:
+                content_text = content_elem.get_text()
+                break
+        
+        # 如果没有找到主要内容，使用 body
+        if not content_text:
+            body = soup.find('body')
+            content_text = body.get_text() if body else ''
+        
+        # 清理文本
+        content_text = re.sub(r'\s+', ' ', content_text).strip()
+        
+        # 提取元数据
+        meta_description = ''
+        meta_desc = soup.find('meta', attrs={'name': 'description'})
+        if meta_desc:
+            meta_description = meta_desc.get('content', '')
+        
+        # 提取关键词
+        meta_keywords = ''
+        meta_kw = soup.find('meta', attrs={'name': 'keywords'})
+        if meta_kw:
+            meta_keywords = meta_kw.get('content', '')
+        
+        return {
+            'page_title': title_text,
+            'content': content_text[:2000],  # 限制内容长度
+            'meta_description': meta_description,
+            'meta_keywords': meta_keywords,
+            'content_length': len(content_text),
+            'status': 'success'
+        }
+
 class WebContentTool:
     name = "web_content"
     description = "Extract content from a specific URL. Args: url (str), extract_links(bool)=False"
@@ -224,34 +251,30 @@ class WebContentTool:
     @staticmethod
     async def _extract_links(url: str) -> List[Dict[str, str]]:
         """提取页面中的链接"""
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        
         try:
-            async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as session:
-                async with session.get(url) as response:
-                    if response.status == 200:
-                        html = await response.text()
-                        soup = BeautifulSoup(html, 'html.parser')
+            async with get_http().get("web", url, timeout=10) as response:
+                if response.status == 200:
+                    body, _ = await read_capped(response, MAX_PAGE_BYTES)
+                    html = decode_body(response, body)
+                    soup = BeautifulSoup(html, 'html.parser')
+                    
+                    links = []
+                    for link in soup.find_all('a', href=True):
+                        href = link['href']
+                        text = link.get_text().strip()
                         
-                        links = []
-                        for link in soup.find_all('a', href=True):
-                            href = link['href']
-                            text = link.get_text().strip()
-                            
-                            # 转换相对链接为绝对链接
-                            absolute_url = urljoin(url, href)
-                            
-                            # 过滤有效的 HTTP/HTTPS 链接
-                            if absolute_url.startswith(('http://', 'https://')):
-                                links.append({
-                                    'url': absolute_url,
-                                    'text': text,
-                                    'domain': urlparse(absolute_url).netloc
-                                })
+                        # 转换相对链接为绝对链接
+                        absolute_url = urljoin(url, href)
                         
-                        return links[:50]  # 限制链接数量
+                        # 过滤有效的 HTTP/HTTPS 链接
+                        if absolute_url.startswith(('http://', 'https://')):
+                            links.append({
+                                'url': absolute_url,
+                                'text': text,
+                                'domain': urlparse(absolute_url).netloc
+                            })
+                    
+                    return links[:50]  # 限制链接数量
         except Exception:
             return []
         
@@ -1,37 +1,246 @@
-import os, json
+import os, re, json, time, hashlib
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 try:
-    import redis  # type: ignore
+    import redis.asyncio as aioredis  # type: ignore
 except Exception:
-    redis = None
+    aioredis = None
+try:
+    import zstandard  # type: ignore
+except Exception:
+    zstandard = None
+
+# Redis 中的值前缀：J=原始 JSON，Z=zstd 压缩后的 JSON
+_RAW = b"J:"
+_ZSTD = b"Z:"
+
+
+def make_key(tool: str, args: Dict[str, Any]) -> str:
+    """规范化参数后哈希，参数顺序不同的相同调用命中同一个键"""
+    canonical = json.dumps(args, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+    return f"tool:{tool}:{digest}"
+
+
+# 结果分类：ok=正常结果；transient=超时/限流/5xx 等可重试错误；permanent=404/参数错误等确定性错误
+RESULT_OK = "ok"
+RESULT_TRANSIENT = "transient"
+RESULT_PERMANENT = "permanent"
+
+# 工具自身产生的确定性错误，整句匹配；包装异常的 "xxx failed: ..." 不在此列，按可重试处理
+_PERMANENT_MESSAGES = re.compile(
+    r"empty (query|url|doi|content|text|document list)"
+    r"|invalid doi url|doi not found|content must be string or list|need at least \d+ contents to merge"
+    r"|unknown (method|merge strategy): .*"
+    r"|url does not appear to be a pdf file|pdf file too large .*|no text content found in pdf"
+    r"|pdf processing libraries not available\..*"
+)
+_HTTP_STATUS = re.compile(r"\bhttp (\d{3})\b")
+# 4xx 中可重试的状态码
+_RETRYABLE_4XX = {408, 425, 429}
+
+
+def _status_kind(status: int) -> str:
+    if 400 <= status < 500 and status not in _RETRYABLE_4XX:
+        return RESULT_PERMANENT
+    return RESULT_TRANSIENT
+
+
+def classify_result(result: Any) -> str:
+    """根据工具返回的 status / error 字段判断结果类型"""
+    if not isinstance(result, dict) or not result.get("error"):
+        return RESULT_OK
+    status = result.get("status")
+    if isinstance(status, int) and not isinstance(status, bool):
+        return _status_kind(status)
+    message = str(result["error"]).strip().lower()
+    if _PERMANENT_MESSAGES.fullmatch(message):
+        return RESULT_PERMANENT
+    match = _HTTP_STATUS.search(message)
+    if match:
+        return _status_kind(int(match.group(1)))
+    return RESULT_TRANSIENT
+
+
+class LRUTTLCache:
+    """进程内 LRU + TTL 缓存"""
+
+    def __init__(self, max_items: int = 1024):
+        self.max_items = max_items
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value: Any, ttl: float):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_items:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
 
 class Cache:
     def __init__(self):
         self.url = os.getenv("REDIS_URL")
         self.ttl = int(os.getenv("CACHE_TTL", "3600"))
+        self.mem_ttl = int(os.getenv("CACHE_MEM_TTL", str(min(self.ttl, 300))))
+        # 错误结果的负缓存 TTL；成功结果过期后仍可作为旧值返回的时长（stale-while-revalidate）
+        self.negative_ttl = int(os.getenv("CACHE_NEGATIVE_TTL", "30"))
+        self.permanent_error_ttl = int(os.getenv("CACHE_PERMANENT_ERROR_TTL", "21600"))
+        self.stale_ttl = int(os.getenv("CACHE_STALE_TTL", "86400"))
+        self.compress_min_bytes = int(os.getenv("CACHE_COMPRESS_MIN_BYTES", "4096"))
         self.client = None
-        if self.url and redis is not None:
+        if self.url and aioredis is not None:
             try:
-                self.client = redis.from_url(self.url)
-                self.client.ping()
+                self.client = aioredis.from_url(self.url)
             except Exception:
                 self.client = None
-        self._mem = {}
+        self._mem = LRUTTLCache(int(os.getenv("CACHE_MEM_MAX_ITEMS", "1024")))
+        self._zc = zstandard.ZstdCompressor(level=3) if zstandard is not None else None
+        self._zd = zstandard.ZstdDecompressor() if zstandard is not None else None
+        self.metrics = {
+            "mem_hits": 0, "redis_hits": 0, "misses": 0, "sets": 0, "errors": 0, "stale_hits": 0,
+            "get_seconds": 0.0, "set_seconds": 0.0, "gets": 0
+        }
 
-    def get(self, key):
+    async def connect(self):
+        """启动时探测 Redis，不可用则只用进程内缓存"""
+        if self.client is None:
+            return
         try:
-            if self.client:
-                v = self.client.get(key)
-                return json.loads(v) if v else None
-            return self._mem.get(key)
+            await self.client.ping()
         except Exception:
-            return None
+            self.client = None
+
+    async def close(self):
+        if self.client is not None:
+            try:
+                await self.client.close()
+            except Exception:
+                pass
+
+    def _encode(self, value: Any) -> bytes:
+        raw = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if self._zc is not None and len(raw) >= self.compress_min_bytes:
+            return _ZSTD + self._zc.compress(raw)
+        return _RAW + raw
+
+    def _decode(self, data: bytes) -> Any:
+        if data.startswith(_ZSTD):
+            if self._zd is None:
+                raise ValueError("zstd-compressed cache entry but zstandard is not installed")
+            return json.loads(self._zd.decompress(data[len(_ZSTD):]))
+        if data.startswith(_RAW):
+            data = data[len(_RAW):]
+        return json.loads(data)
+
+    def ttl_for(self, result: Any) -> Tuple[int, int]:
+        """返回 (新鲜期, 过期后可用旧值的时长)；只有成功结果允许返回旧值"""
+        kind = classify_result(result)
+        if kind == RESULT_OK:
+            return self.ttl, self.stale_ttl
+        if kind == RESULT_PERMANENT:
+            return self.permanent_error_ttl, 0
+        return self.negative_ttl, 0
+
+    async def _read_entry(self, key) -> Optional[Any]:
+        entry = self._mem.get(key)
+        if entry is not None:
+            self.metrics["mem_hits"] += 1
+        elif self.client is not None:
+            data = await self.client.get(key)
+            if data:
+                entry = self._decode(data)
+                if isinstance(entry, dict) and "_fresh_until" in entry:
+                    remaining = entry["_fresh_until"] + entry.get("_stale_ttl", 0) - time.time()
+                    self._mem.set(key, entry, min(self.mem_ttl, max(remaining, 1)))
+                self.metrics["redis_hits"] += 1
+        return entry
+
+    async def lookup(self, key) -> Tuple[Optional[Any], bool]:
+        """返回 (值, 是否已过新鲜期)；未命中返回 (None, False)"""
+        start = time.perf_counter()
+        self.metrics["gets"] += 1
+        try:
+            entry = await self._read_entry(key)
+            if entry is None:
+                self.metrics["misses"] += 1
+                return None, False
+            if not (isinstance(entry, dict) and "_fresh_until" in entry):
+                # 旧格式条目，视为新鲜
+                return entry, False
+            stale = entry["_fresh_until"] <= time.time()
+            if stale:
+                self.metrics["stale_hits"] += 1
+            return entry["_v"], stale
+        except Exception:
+            self.metrics["errors"] += 1
+            return None, False
+        finally:
+            self.metrics["get_seconds"] += time.perf_counter() - start
+
+    async def get(self, key):
+        value, stale = await self.lookup(key)
+        return None if stale else value
+
+    async def set(self, key, value, ttl: Optional[int] = None, stale_ttl: Optional[int] = None):
+        start = time.perf_counter()
+        if ttl is None:
+            ttl, default_stale = self.ttl_for(value)
+            stale_ttl = default_stale if stale_ttl is None else stale_ttl
+        stale_ttl = stale_ttl or 0
+        entry = {"_v": value, "_fresh_until": time.time() + ttl, "_stale_ttl": stale_ttl}
+        hard_ttl = ttl + stale_ttl
+        try:
+            self._mem.set(key, entry, min(hard_ttl, self.mem_ttl) if self.client is not None else hard_ttl)
+            if self.client is not None:
+                await self.client.set(key, self._encode(entry), ex=hard_ttl)
+            self.metrics["sets"] += 1
+        except Exception:
+            self.metrics["errors"] += 1
+        finally:
+            self.metrics["set_seconds"] += time.perf_counter() - start
 
-    def set(self, key, value):
+    async def defer_refresh(self, key, ttl: int):
+        """
+        刷新失败时调用：旧值在 ttl 内视为新鲜以免反复重试上游，
+        但不延长原有的旧值截止时间，上游持续失败时旧值照常过期
+        """
         try:
-            if self.client:
-                self.client.setex(key, self.ttl, json.dumps(value, ensure_ascii=False))
-            else:
-                self._mem[key] = value
+            entry = await self._read_entry(key)
+            if not (isinstance(entry, dict) and "_fresh_until" in entry):
+                return
+            remaining = int(entry["_fresh_until"] + entry.get("_stale_ttl", 0) - time.time())
+            if remaining < 1:
+                return
+            ttl = min(ttl, remaining)
+            await self.set(key, entry["_v"], ttl=ttl, stale_ttl=remaining - ttl)
         except Exception:
-            pass
+            self.metrics["errors"] += 1
 
+    def stats(self) -> Dict[str, Any]:
+        m = self.metrics
+        hits = m["mem_hits"] + m["redis_hits"]
+        return {
+            "backend": "redis+memory" if self.client is not None else "memory",
+            "mem_items": len(self._mem),
+            "mem_max_items": self._mem.max_items,
+            "compression": "zstd" if self._zc is not None else "none",
+            "hit_rate": hits / m["gets"] if m["gets"] else 0.0,
+            "avg_get_ms": m["get_seconds"] / m["gets"] * 1000 if m["gets"] else 0.0,
+            "avg_set_ms": m["set_seconds"] / m["sets"] * 1000 if m["sets"] else 0.0,
+            "ttl": {"ok": self.ttl, "transient_error": self.negative_ttl,
+                    "permanent_error": self.permanent_error_ttl, "stale": self.stale_ttl},
+            **{k: m[k] for k in ("mem_hits", "redis_hits", "stale_hits", "misses", "sets", "errors")}
+        }
@@ -0,0 +1,153 @@
+"""
+句向量编码与语义近重复检测
+
+文本只编码一次并归一化，向量按文本哈希缓存（跨调用复用）。
+重复检测：小规模用相似度矩阵，大规模用 FAISS 范围检索，避免两两比较。
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    SentenceTransformer = None
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+EMBEDDING_MODEL = os.getenv("MCP_EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+CACHE_MAX_ITEMS = int(os.getenv("MCP_EMBEDDING_CACHE_ITEMS", "20000"))
+# 超过该数量改用 FAISS 范围检索，避免 n×n 矩阵
+DENSE_MATRIX_LIMIT = int(os.getenv("SEMANTIC_DENSE_LIMIT", "2048"))
+BATCH_SIZE = int(os.getenv("MCP_EMBEDDING_BATCH_SIZE", "64"))
+
+
+def embeddings_available() -> bool:
+    return SentenceTransformer is not None
+
+
+class SemanticEncoder:
+    """延迟加载模型；按文本哈希缓存归一化后的 float32 向量"""
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, max_items: int = CACHE_MAX_ITEMS):
+        self.model_name = model_name
+        self.max_items = max_items
+        self.model = None
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self.metrics = {"hits": 0, "encoded": 0}
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    def _ensure_model_loaded(self):
+        if self.model is not None:
+            return
+        # 并发的首次请求只加载一次模型
+        with self._load_lock:
+            if self.model is not None:
+                return
+            if SentenceTransformer is None:
+                raise RuntimeError("sentence-transformers not available")
+            self.model = SentenceTransformer(self.model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        keys = [self._key(t) for t in texts]
+        vectors: Dict[str, np.ndarray] = {}
+        with self._lock:
+            for key in keys:
+                vec = self._cache.get(key)
+                if vec is not None:
+                    self._cache.move_to_end(key)
+                    vectors[key] = vec
+        self.metrics["hits"] += sum(1 for k in keys if k in vectors)
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            self._ensure_model_loaded()
+            encoded = self.model.encode(list(missing.values()), batch_size=BATCH_SIZE,
+                                        convert_to_numpy=True, normalize_embeddings=True)
+            encoded = np.asarray(encoded, dtype=np.float32)
+            self.metrics["encoded"] += len(missing)
+            with self._lock:
+                for key, vec in zip(missing.keys(), encoded):
+                    vectors[key] = vec
+                    self._cache[key] = vec
+                while len(self._cache) > self.max_items:
+                    self._cache.popitem(last=False)
+
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[k] for k in keys])
+
+
+def _neighbors_dense(vectors: np.ndarray, threshold: float) -> List[np.ndarray]:
+    sims = vectors @ vectors.T
+    return [np.flatnonzero(row >= threshold) for row in sims]
+
+
+def _neighbors_faiss(vectors: np.ndarray, threshold: float) -> List[np.ndarray]:
+    index = faiss.IndexFlatIP(vectors.shape[1])
+    index.add(vectors)
+    lims, _, ids = index.range_search(vectors, threshold)
+    return [ids[lims[i]:lims[i + 1]] for i in range(len(vectors))]
+
+
+def _neighbors_blocked(vectors: np.ndarray, threshold: float, block: int = 1024) -> List[np.ndarray]:
+    result = []
+    for start in range(0, len(vectors), block):
+        sims = vectors[start:start + block] @ vectors.T
+        result.extend(np.flatnonzero(row >= threshold) for row in sims)
+    return result
+
+
+def semantic_greedy_dedup(vectors: np.ndarray, threshold: float) -> Tuple[List[int], Dict[int, int]]:
+    """
+    按顺序处理，与已保留文本中第一个余弦相似度 ≥ threshold 的判为重复
+    返回 (保留的下标, {重复下标: 被哪个保留下标覆盖})
+    """
+    n = len(vectors)
+    if n == 0:
+        return [], {}
+    if n <= DENSE_MATRIX_LIMIT:
+        neighbors = _neighbors_dense(vectors, threshold)
+    elif faiss is not None:
+        neighbors = _neighbors_faiss(vectors, threshold)
+    else:
+        neighbors = _neighbors_blocked(vectors, threshold)
+
+    is_kept = np.zeros(n, dtype=bool)
+    kept: List[int] = []
+    duplicate_of: Dict[int, int] = {}
+    for i in range(n):
+        earlier = neighbors[i]
+        earlier = np.sort(earlier[earlier < i])
+        match: Optional[int] = next((int(j) for j in earlier if is_kept[j]), None)
+        if match is None:
+            is_kept[i] = True
+            kept.append(i)
+        else:
+            duplicate_of[i] = match
+    return kept, duplicate_of
+
+
+_encoder: Optional[SemanticEncoder] = None
+
+
+def get_encoder() -> SemanticEncoder:
+    """获取全局编码器"""
+    global _encoder
+    if _encoder is None:
+        _encoder = SemanticEncoder()
+    return _encoder
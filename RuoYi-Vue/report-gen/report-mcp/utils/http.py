@@ -0,0 +1,219 @@
+"""
+上游 HTTP 访问：按上游复用 aiohttp 会话 + 按主机排队限速
+
+arXiv API 要求连续请求间隔不少于 3 秒且单连接；Crossref 礼貌池（带 mailto）
+要求控制并发与速率。超出速率的请求在本地排队等待，而不是直接失败。
+"""
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+BROWSER_UA = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+CROSSREF_MAILTO = os.getenv("CROSSREF_MAILTO", "admin@example.com")
+
+# 上游会话配置：连接池总上限 / 单主机上限 / 默认请求头
+UPSTREAMS: Dict[str, Dict[str, Any]] = {
+    "arxiv": {"limit": 2, "limit_per_host": 1, "headers": {}},
+    "crossref": {"limit": 10, "limit_per_host": 5,
+                 "headers": {"User-Agent": f"ReportGenerator/1.0 (mailto:{CROSSREF_MAILTO})"}},
+    "web": {"limit": int(os.getenv("WEB_MAX_CONNECTIONS", "50")),
+            "limit_per_host": int(os.getenv("WEB_MAX_CONNECTIONS_PER_HOST", "4")),
+            "headers": {"User-Agent": BROWSER_UA}},
+    "pdf": {"limit": int(os.getenv("PDF_MAX_CONNECTIONS", "10")),
+            "limit_per_host": 2, "headers": {"User-Agent": BROWSER_UA}},
+}
+
+# 主机礼貌策略：最小请求间隔（秒）/ 最大并发
+HOST_POLICIES: Dict[str, Dict[str, float]] = {
+    "export.arxiv.org": {"min_interval": float(os.getenv("ARXIV_MIN_INTERVAL", "3.0")), "max_concurrent": 1},
+    "api.crossref.org": {"min_interval": float(os.getenv("CROSSREF_MIN_INTERVAL", "0.1")),
+                         "max_concurrent": int(os.getenv("CROSSREF_MAX_CONCURRENT", "3"))},
+}
+
+# 被限流（429/503）后最多重新排队的次数，以及 Retry-After 的上限
+RETRY_ON_THROTTLE = int(os.getenv("UPSTREAM_THROTTLE_RETRIES", "2"))
+MAX_RETRY_AFTER = float(os.getenv("UPSTREAM_MAX_RETRY_AFTER", "30"))
+
+
+class HostScheduler:
+    """单个主机的请求调度：限制并发，并保证相邻请求的发出间隔"""
+
+    def __init__(self, min_interval: float = 0.0, max_concurrent: int = 1):
+        self.min_interval = min_interval
+        self.max_concurrent = max(1, int(max_concurrent))
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._loop = None
+        self._next_slot = 0.0
+        self.waiting = 0
+        self.total_wait = 0.0
+        self.requests = 0
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._sem is None or self._loop is not loop:
+            self._sem = asyncio.Semaphore(self.max_concurrent)
+            self._loop = loop
+        return self._sem
+
+    def penalize(self, delay: float):
+        """上游要求退避时，把下一个可用时间点整体后移"""
+        self._next_slot = max(self._next_slot, time.monotonic() + delay)
+
+    @asynccontextmanager
+    async def slot(self):
+        sem = self._semaphore()
+        start = time.monotonic()
+        self.waiting += 1
+        try:
+            await sem.acquire()
+            try:
+                # 预约发出时间点后再等待，多个排队请求依次错开 min_interval
+                now = time.monotonic()
+                send_at = max(now, self._next_slot)
+                self._next_slot = send_at + self.min_interval
+                if send_at > now:
+                    await asyncio.sleep(send_at - now)
+            except BaseException:
+                sem.release()
+                raise
+        finally:
+            self.waiting -= 1
+        self.total_wait += time.monotonic() - start
+        self.requests += 1
+        try:
+            yield
+        finally:
+            sem.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "min_interval": self.min_interval,
+            "max_concurrent": self.max_concurrent,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "avg_wait_ms": self.total_wait / self.requests * 1000 if self.requests else 0.0
+        }
+
+
+class UpstreamHTTP:
+    """按上游名称管理共享会话；事件循环变化或会话关闭时重建"""
+
+    def __init__(self):
+        self._sessions: Dict[str, aiohttp.ClientSession] = {}
+        self._loop = None
+        self._closing: set = set()
+        self.schedulers = {host: HostScheduler(**policy) for host, policy in HOST_POLICIES.items()}
+
+    def session(self, upstream: str) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._discard(loop)
+            self._loop = loop
+        session = self._sessions.get(upstream)
+        if session is None or session.closed:
+            conf = UPSTREAMS[upstream]
+            connector = aiohttp.TCPConnector(
+                limit=conf["limit"],
+                limit_per_host=conf["limit_per_host"],
+                ttl_dns_cache=300,
+                use_dns_cache=True
+            )
+            session = aiohttp.ClientSession(connector=connector, headers=conf["headers"])
+            self._sessions[upstream] = session
+        return session
+
+    def _discard(self, loop):
+        """事件循环变化时关闭旧循环上的会话：旧循环仍在运行则投递回原循环，否则在当前循环上关闭"""
+        owner, sessions = self._loop, [s for s in self._sessions.values() if not s.closed]
+        self._sessions = {}
+        for session in sessions:
+            if owner is not None and owner.is_running():
+                asyncio.run_coroutine_threadsafe(session.close(), owner)
+                continue
+            task = loop.create_task(session.close())
+            self._closing.add(task)
+            task.add_done_callback(self._closing.discard)
+
+    @asynccontextmanager
+    async def get(self, upstream: str, url: str, timeout: float = 15.0, **kwargs):
+        """
+        发起 GET 请求并返回响应（上下文管理器）
+        配置了礼貌策略的主机会先排队；遇到 429/503 时按 Retry-After 退避后重新排队
+        """
+        scheduler = self.schedulers.get(urlparse(url).hostname or "")
+        client_timeout = aiohttp.ClientTimeout(total=timeout)
+        attempt = 0
+        while True:
+            if scheduler is None:
+                async with self.session(upstream).get(url, timeout=client_timeout, **kwargs) as response:
+                    yield response
+                return
+            async with scheduler.slot():
+                async with self.session(upstream).get(url, timeout=client_timeout, **kwargs) as response:
+                    throttled = response.status in (429, 503) and attempt < RETRY_ON_THROTTLE
+                    if throttled:
+                        scheduler.penalize(_retry_after(response, scheduler.min_interval))
+                    else:
+                        yield response
+                        return
+            attempt += 1
+
+    async def close(self):
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        for session in self._sessions.values():
+            if not session.closed:
+                await session.close()
+        self._sessions = {}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sessions": sorted(name for name, s in self._sessions.items() if not s.closed),
+            "hosts": {host: s.stats() for host, s in self.schedulers.items()}
+        }
+
+
+async def read_capped(response: aiohttp.ClientResponse, max_bytes: int, chunk_size: int = 64 * 1024) -> Tuple[bytes, bool]:
+    """流式读取响应体，超过 max_bytes 即停止；返回 (内容, 是否被截断)"""
+    declared = response.content_length
+    if declared is not None and declared <= max_bytes:
+        return await response.read(), False
+    buf = bytearray()
+    async for chunk in response.content.iter_chunked(chunk_size):
+        buf.extend(chunk)
+        if len(buf) > max_bytes:
+            return bytes(buf[:max_bytes]), True
+    return bytes(buf), False
+
+
+def decode_body(response: aiohttp.ClientResponse, body: bytes) -> str:
+    """按响应声明的编码解码，截断处的半个字符直接替换"""
+    try:
+        return body.decode(response.charset or "utf-8", errors="replace")
+    except LookupError:
+        return body.decode("utf-8", errors="replace")
+
+
+def _retry_after(response: aiohttp.ClientResponse, min_interval: float) -> float:
+    value = response.headers.get("Retry-After", "")
+    try:
+        delay = float(value)
+    except ValueError:
+        delay = max(min_interval * 2, 1.0)
+    return min(max(delay, min_interval), MAX_RETRY_AFTER)
+
+
+_http: Optional[UpstreamHTTP] = None
+
+
+def get_http() -> UpstreamHTTP:
+    """获取全局上游 HTTP 管理器"""
+    global _http
+    if _http is None:
+        _http = UpstreamHTTP()
+    return _http
@@ -0,0 +1,335 @@
+"""
+本地文献索引（SQLite FTS5）
+
+数据来源：在线 arxiv_search / crossref_search 的成功结果（自动写入），
+以及批量导入的元数据（arXiv metadata JSONL、Crossref works JSON）。
+检索结果与 ArxivTool 的 items 结构一致：id/title/summary/authors/published/url。
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    rowid INTEGER PRIMARY KEY,
+    key TEXT NOT NULL UNIQUE,
+    id TEXT,
+    title TEXT NOT NULL,
+    summary TEXT,
+    authors TEXT,
+    published TEXT,
+    url TEXT,
+    doi TEXT,
+    source TEXT,
+    added_at REAL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, summary, authors,
+    content='papers', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts(rowid, title, summary, authors)
+    VALUES (new.rowid, fts_text(new.title), fts_text(new.summary), fts_text(new.authors));
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, summary, authors)
+    VALUES ('delete', old.rowid, fts_text(old.title), fts_text(old.summary), fts_text(old.authors));
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts(papers_fts, rowid, title, summary, authors)
+    VALUES ('delete', old.rowid, fts_text(old.title), fts_text(old.summary), fts_text(old.authors));
+    INSERT INTO papers_fts(rowid, title, summary, authors)
+    VALUES (new.rowid, fts_text(new.title), fts_text(new.summary), fts_text(new.authors));
+END;
+"""
+
+# 版本 2：CJK 按二元组入索引（触发器依赖 fts_text），旧库需重建 FTS 表
+_SCHEMA_VERSION = 2
+_DROP_FTS = """
+DROP TRIGGER IF EXISTS papers_ai;
+DROP TRIGGER IF EXISTS papers_ad;
+DROP TRIGGER IF EXISTS papers_au;
+DROP TABLE IF EXISTS papers_fts;
+"""
+_FILL_FTS = """
+INSERT INTO papers_fts(rowid, title, summary, authors)
+SELECT rowid, fts_text(title), fts_text(summary), fts_text(authors) FROM papers
+"""
+
+_UPSERT = """
+INSERT INTO papers (key, id, title, summary, authors, published, url, doi, source, added_at)
+VALUES (:key, :id, :title, :summary, :authors, :published, :url, :doi, :source, :added_at)
+ON CONFLICT(key) DO UPDATE SET
+    title = excluded.title,
+    summary = CASE WHEN length(excluded.summary) > length(coalesce(papers.summary, '')) THEN excluded.summary ELSE papers.summary END,
+    authors = excluded.authors,
+    published = coalesce(excluded.published, papers.published),
+    url = coalesce(excluded.url, papers.url),
+    doi = coalesce(excluded.doi, papers.doi)
+"""
+
+# 标题/摘要/作者列的 BM25 权重
+_BM25_WEIGHTS = (10.0, 1.0, 0.5)
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_ARXIV_ID_RE = re.compile(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?$", re.IGNORECASE)
+_STOPWORDS = frozenset("a an and are as at be by for from in is of on or the to with via using based".split())
+# unicode61 把连续的汉字/假名整体当作一个词，入索引和查询前都拆成重叠二元组
+_CJK_RUN_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+MAX_QUERY_TERMS = 32
+# 命中文献至少覆盖的查询词比例；AND 查询不足 max_results 时放宽为 OR，但低于该比例的命中丢弃
+MIN_TERM_COVERAGE = float(os.getenv("LOCAL_INDEX_MIN_COVERAGE", "0.5"))
+# OR 查询多取的候选倍数，供覆盖率过滤
+_RELAX_CANDIDATES = 4
+
+
+def fts_text(text: Optional[str]) -> Optional[str]:
+    """CJK 连续片段改写为空格分隔的二元组（单字保留），其余文本不变"""
+    if not text:
+        return text
+
+    def bigrams(match):
+        run = match.group(0)
+        grams = [run[i:i + 2] for i in range(len(run) - 1)] or [run]
+        return " " + " ".join(grams) + " "
+
+    return _CJK_RUN_RE.sub(bigrams, text)
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((fts_text(text) or "").lower())
+
+
+def _paper_key(doi: Optional[str], arxiv_id: Optional[str], title: str) -> str:
+    if doi:
+        return "doi:" + doi.strip().lower()
+    if arxiv_id:
+        return "arxiv:" + arxiv_id
+    normalized = " ".join(_TOKEN_RE.findall(title.lower()))
+    return "title:" + hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+def _arxiv_id(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    match = _ARXIV_ID_RE.search(value)
+    if match:
+        return match.group(1)
+    return re.sub(r"v\d+$", "", value.strip()) if re.match(r"^[\w.\-/]+$", value.strip()) else None
+
+
+def _clean(text: Any) -> str:
+    return re.sub(r"\s+", " ", str(text or "")).strip()
+
+
+def from_arxiv_item(item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """ArxivTool 返回的 item"""
+    title = _clean(item.get("title"))
+    if not title:
+        return None
+    arxiv_id = _arxiv_id(item.get("id") or item.get("url"))
+    return {
+        "key": _paper_key(item.get("doi"), arxiv_id, title),
+        "id": item.get("id"),
+        "title": title,
+        "summary": _clean(item.get("summary")),
+        "authors": list(item.get("authors") or []),
+        "published": item.get("published"),
+        "url": item.get("url") or item.get("id"),
+        "doi": item.get("doi"),
+        "source": "arxiv",
+    }
+
+
+def from_crossref_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """CrossrefTool 解析后的 result"""
+    title = _clean(result.get("title"))
+    if not title:
+        return None
+    doi = result.get("doi") or None
+    return {
+        "key": _paper_key(doi, None, title),
+        "id": f"https://doi.org/{doi}" if doi else result.get("url"),
+        "title": title,
+        "summary": _clean(result.get("abstract")),
+        "authors": list(result.get("authors") or []),
+        "published": result.get("published_date") or None,
+        "url": result.get("url") or (f"https://doi.org/{doi}" if doi else None),
+        "doi": doi,
+        "source": "crossref",
+    }
+
+
+def from_arxiv_metadata(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """arXiv 官方元数据快照（arxiv-metadata-oai-snapshot.json）中的一行"""
+    title = _clean(record.get("title"))
+    arxiv_id = record.get("id")
+    if not title or not arxiv_id:
+        return None
+    authors = record.get("authors_parsed")
+    if authors:
+        authors = [" ".join(p for p in reversed(a[:2]) if p) for a in authors]
+    else:
+        authors = [a.strip() for a in re.split(r",| and ", record.get("authors") or "") if a.strip()]
+    url = f"http://arxiv.org/abs/{arxiv_id}"
+    return {
+        "key": _paper_key(record.get("doi"), arxiv_id, title),
+        "id": url,
+        "title": title,
+        "summary": _clean(record.get("abstract")),
+        "authors": authors,
+        "published": record.get("update_date"),
+        "url": url,
+        "doi": record.get("doi"),
+        "source": "arxiv",
+    }
+
+
+def normalize_record(record: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """按字段自动识别记录格式"""
+    if "DOI" in record:
+        # Crossref 原始 works 条目
+        from tools.crossref_tool import CrossrefTool
+        return from_crossref_result(CrossrefTool._parse_crossref_item(record))
+    if "doi" in record and "abstract" in record and "journal" in record:
+        return from_crossref_result(record)
+    if "abstract" in record:
+        return from_arxiv_metadata(record)
+    return from_arxiv_item(record)
+
+
+class LocalLiteratureIndex:
+    """SQLite FTS5 文献索引；单连接 + 锁，调用方通过线程池使用"""
+
+    def __init__(self, path: str):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self._conn.create_function("fts_text", 1, fts_text, deterministic=True)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < _SCHEMA_VERSION:
+                self._conn.executescript(_DROP_FTS)
+            self._conn.executescript(_SCHEMA)
+            if version < _SCHEMA_VERSION:
+                with self._conn:
+                    self._conn.execute(_FILL_FTS)
+                self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def upsert(self, records: Iterable[Optional[Dict[str, Any]]]) -> int:
+        now = time.time()
+        rows = [
+            {**r, "authors": json.dumps(r["authors"], ensure_ascii=False), "added_at": now}
+            for r in records if r
+        ]
+        if not rows:
+            return 0
+        with self._lock, self._conn:
+            self._conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def ingest_result(self, tool: str, result: Dict[str, Any]) -> int:
+        """写入在线检索工具的成功结果"""
+        if tool == "arxiv_search":
+            return self.upsert(from_arxiv_item(it) for it in result.get("items", []))
+        if tool == "crossref_search":
+            return self.upsert(from_crossref_result(r) for r in result.get("results", []))
+        return 0
+
+    @staticmethod
+    def query_terms(query: str) -> List[str]:
+        """查询词：去停用词、去重，CJK 拆为二元组"""
+        seen = []
+        for token in _tokens(query):
+            if token in _STOPWORDS or (len(token) < 2 and token.isascii()) or token in seen:
+                continue
+            seen.append(token)
+            if len(seen) >= MAX_QUERY_TERMS:
+                break
+        return seen
+
+    @staticmethod
+    def build_match(query: str, operator: str = "AND") -> str:
+        """把自然语言查询转换为 FTS5 AND / OR 查询，词项加引号避免语法字符"""
+        return f" {operator} ".join(f'"{t}"' for t in LocalLiteratureIndex.query_terms(query))
+
+    def _match(self, match: str, limit: int) -> List[sqlite3.Row]:
+        sql = (
+            "SELECT p.rowid, p.id, p.title, p.summary, p.authors, p.published, p.url, p.doi, p.source, "
+            "bm25(papers_fts, ?, ?, ?) AS rank "
+            "FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid "
+            "WHERE papers_fts MATCH ? ORDER BY rank LIMIT ?"
+        )
+        with self._lock:
+            return self._conn.execute(sql, (*_BM25_WEIGHTS, match, limit)).fetchall()
+
+    def search(self, query: str, max_results: int = 5,
+               min_coverage: float = MIN_TERM_COVERAGE) -> List[Dict[str, Any]]:
+        """
+        先按 AND 检索（命中全部查询词）；不足 max_results 时放宽为 OR，
+        只保留覆盖查询词比例不低于 min_coverage 的命中，避免常见词凑满结果
+        """
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+        rows = self._match(self.build_match(query, "AND"), max_results)
+        if len(rows) < max_results and len(terms) > 1:
+            seen = {row["rowid"] for row in rows}
+            for row in self._match(self.build_match(query, "OR"), max_results * _RELAX_CANDIDATES):
+                if row["rowid"] in seen or self._coverage(row, terms) < min_coverage:
+                    continue
+                rows.append(row)
+                if len(rows) >= max_results:
+                    break
+        return [{
+            "id": row["id"],
+            "title": row["title"],
+            "summary": row["summary"] or "",
+            "authors": json.loads(row["authors"] or "[]"),
+            "published": row["published"],
+            "url": row["url"],
+            "doi": row["doi"],
+            "source": row["source"],
+            "score": -row["rank"],
+            "coverage": self._coverage(row, terms),
+        } for row in rows]
+
+    @staticmethod
+    def _coverage(row: sqlite3.Row, terms: List[str]) -> float:
+        """命中文献包含的查询词比例"""
+        tokens = set(_tokens(row["title"])) | set(_tokens(row["summary"])) | set(_tokens(row["authors"]))
+        return sum(t in tokens for t in terms) / len(terms)
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM papers").fetchone()[0]
+
+    def optimize(self):
+        """批量导入后合并 FTS 段"""
+        with self._lock, self._conn:
+            self._conn.execute("INSERT INTO papers_fts(papers_fts) VALUES ('optimize')")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_index: Optional[LocalLiteratureIndex] = None
+
+
+def get_local_index() -> LocalLiteratureIndex:
+    """获取全局本地文献索引"""
+    global _index
+    if _index is None:
+        _index = LocalLiteratureIndex(os.getenv("LOCAL_INDEX_PATH", "data/literature.db"))
+    return _index
@@ -0,0 +1,177 @@
+"""
+MinHash + LSH 近重复检索
+
+字符 shingle 的 MinHash 签名按 band 分桶，落入同一桶的文本作为优先候选，用 SequenceMatcher 精确校验。
+SequenceMatcher 相似度与 shingle Jaccard 之间没有严格的换算关系（阈值越低，LSH 漏掉的相似对越多），
+因此 LSH 只用来尽早找到重复项；其余已保留文本用字符直方图上界（≥ quick_ratio ≥ ratio）向量化过滤后
+按顺序精确校验，结果与原有 similarity 方法逐一比较完全一致。
+"""
+import re
+import zlib
+from difflib import SequenceMatcher
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WS_RE = re.compile(r"\s+")
+# 字符直方图的桶数；不同字符哈希到同一桶只会抬高上界，不影响正确性
+_HIST_BUCKETS = 512
+
+
+def _optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """选择 (bands, rows)，使 S 曲线拐点 (1/b)^(1/r) 最接近阈值"""
+    best = (num_perm, 1)
+    best_err = float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
+            continue
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - threshold)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
+
+def ratio_to_jaccard(ratio: float) -> float:
+    """SequenceMatcher.ratio 近似为 Dice 系数，换算为 Jaccard：J = D / (2 - D)"""
+    return ratio / (2.0 - ratio)
+
+
+class MinHashLSH:
+    """
+    增量式 MinHash LSH 索引
+    threshold 为 SequenceMatcher 相似度阈值；分桶时使用换算后的 Jaccard 阈值并留出余量，
+    宁可多召回候选，由精确校验把关
+    """
+
+    def __init__(self, threshold: float, num_perm: int = 128, shingle_size: int = 5, seed: int = 1, margin: float = 0.15):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        lsh_threshold = max(0.05, ratio_to_jaccard(threshold) - margin)
+        self.bands, self.rows = _optimal_bands(lsh_threshold, num_perm)
+        self._buckets: List[Dict[bytes, List[int]]] = [dict() for _ in range(self.bands)]
+
+    def normalize(self, text: str) -> str:
+        return _WS_RE.sub(" ", text.lower()).strip()
+
+    def signature(self, text: str) -> np.ndarray:
+        """text 需已规范化"""
+        k = self.shingle_size
+        if len(text) <= k:
+            shingles = {text}
+        else:
+            shingles = {text[i:i + k] for i in range(len(text) - k + 1)}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        # (a·h + b) mod p，按置换取最小值；uint64 乘法溢出回绕不影响哈希性质
+        phv = (np.outer(self._a, hashes) + self._b[:, None]) % _MERSENNE_PRIME
+        return np.bitwise_and(phv, _MAX_HASH).min(axis=1)
+
+    def _band_keys(self, sig: np.ndarray) -> List[bytes]:
+        r = self.rows
+        return [sig[i * r:(i + 1) * r].tobytes() for i in range(self.bands)]
+
+    def insert(self, key: int, sig: np.ndarray):
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, sig: np.ndarray) -> List[int]:
+        """返回候选键，按插入顺序（即原有贪心算法的比较顺序）排列"""
+        found: Set[int] = set()
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            found.update(bucket.get(band, ()))
+        return sorted(found)
+
+
+def similar(a: str, b: str, threshold: float) -> bool:
+    """精确校验：先用廉价的上界过滤"""
+    if not a or not b:
+        return a == b
+    shorter, longer = sorted((len(a), len(b)))
+    if 2.0 * shorter / (shorter + longer) < threshold:
+        return False
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.real_quick_ratio() >= threshold and matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def _histogram(text: str) -> np.ndarray:
+    codes = np.fromiter(map(ord, text), dtype=np.int64, count=len(text))
+    return np.bincount(codes % _HIST_BUCKETS, minlength=_HIST_BUCKETS).astype(np.int32)
+
+
+class NearDuplicateIndex:
+    """
+    按位置（slot）存放的已保留文本；first_similar 返回第一个 SequenceMatcher(lower) 相似度 ≥ threshold 的位置，
+    与逐一比较的结果相同
+    """
+
+    def __init__(self, threshold: float, num_perm: int = 128):
+        self.threshold = threshold
+        self.lsh = MinHashLSH(threshold, num_perm=num_perm)
+        self._texts: List[str] = []
+        self._hist = np.zeros((16, _HIST_BUCKETS), dtype=np.int32)
+        self._lens = np.zeros(16, dtype=np.int64)
+
+    def __len__(self):
+        return len(self._texts)
+
+    def first_similar(self, text: str) -> Optional[int]:
+        low = text.lower()
+        sig = self.lsh.signature(self.lsh.normalize(text))
+        checked: Set[int] = set()
+        hint: Optional[int] = None
+        for j in self.lsh.query(sig):
+            checked.add(j)
+            if similar(low, self._texts[j], self.threshold):
+                hint = j
+                break
+        # hint 之前的位置可能还有 LSH 未召回的相似文本
+        limit = len(self._texts) if hint is None else hint
+        if limit:
+            overlap = np.minimum(self._hist[:limit], _histogram(low)).sum(axis=1)
+            total = self._lens[:limit] + len(low)
+            bound = np.where(total > 0, 2.0 * overlap / np.maximum(total, 1), 1.0)
+            for k in np.flatnonzero(bound >= self.threshold).tolist():
+                if k not in checked and similar(low, self._texts[k], self.threshold):
+                    return k
+        return hint
+
+    def add(self, text: str) -> int:
+        slot = len(self._texts)
+        if slot == len(self._lens):
+            self._hist = np.vstack([self._hist, np.zeros_like(self._hist)])
+            self._lens = np.concatenate([self._lens, np.zeros_like(self._lens)])
+        self._texts.append("")
+        self.replace(slot, text)
+        return slot
+
+    def replace(self, slot: int, text: str):
+        """替换位置上的文本；旧签名留在桶中只会多出候选，由精确校验过滤"""
+        low = text.lower()
+        self._texts[slot] = low
+        self._hist[slot] = _histogram(low)
+        self._lens[slot] = len(low)
+        self.lsh.insert(slot, self.lsh.signature(self.lsh.normalize(text)))
+
+
+def greedy_dedup(texts: List[str], threshold: float, num_perm: int = 128) -> Tuple[List[int], Dict[int, int]]:
+    """
+    与原 similarity 去重相同的贪心语义：按顺序处理，与已保留文本中第一个相似度 ≥ threshold 的判为重复
+    返回 (保留的下标, {重复下标: 被哪个保留下标覆盖})
+    """
+    index = NearDuplicateIndex(threshold, num_perm=num_perm)
+    kept: List[int] = []
+    duplicate_of: Dict[int, int] = {}
+    for i, text in enumerate(texts):
+        slot = index.first_similar(text)
+        if slot is None:
+            index.add(text)
+            kept.append(i)
+        else:
+            duplicate_of[i] = kept[slot]
+    return kept, duplicate_of
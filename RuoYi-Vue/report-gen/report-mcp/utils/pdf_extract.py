@@ -0,0 +1,241 @@
+"""
+PDF 解析：进程池 + 按页区间并行 + 磁盘缓存
+
+PyPDF2 / pdfplumber 解析是纯 CPU 计算，放在事件循环里会阻塞整个 MCP 服务。
+解析在独立进程中按页区间并行执行；结果以 PDF 内容的 SHA-256 为键缓存到磁盘，
+同一文件（包括不同 URL 指向的同一篇论文）只解析一次；请求更多页时只解析缺少的页。
+"""
+import asyncio
+import hashlib
+import json
+import mmap
+import multiprocessing
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import PyPDF2
+    import pdfplumber
+    PDF_AVAILABLE = True
+except ImportError:
+    PDF_AVAILABLE = False
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+CACHE_DIR = os.getenv("PDF_CACHE_DIR", "data/pdf_cache")
+
+
+@contextmanager
+def _mapped(path: str):
+    """以只读 mmap 打开文件；各工作进程共享页缓存，不复制文件内容"""
+    with open(path, "rb") as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield mm
+
+
+def _read_metadata(path: str) -> Tuple[Dict[str, str], int]:
+    """子进程：读取文档元数据和总页数"""
+    with _mapped(path) as mm:
+        reader = PyPDF2.PdfReader(mm)
+        return _metadata(reader), len(reader.pages)
+
+
+def _metadata(reader) -> Dict[str, str]:
+    metadata = {}
+    if reader.metadata:
+        metadata = {
+            'title': str(reader.metadata.get('/Title', '')),
+            'author': str(reader.metadata.get('/Author', '')),
+            'subject': str(reader.metadata.get('/Subject', '')),
+            'creator': str(reader.metadata.get('/Creator', '')),
+            'producer': str(reader.metadata.get('/Producer', '')),
+            'creation_date': str(reader.metadata.get('/CreationDate', '')),
+            'modification_date': str(reader.metadata.get('/ModDate', ''))
+        }
+    return metadata
+
+
+def _extract_pages(path: str, start: int, end: int) -> Tuple[List[str], List[Dict[str, Any]]]:
+    """子进程：提取 [start, end) 页的文本和表格"""
+    texts = []
+    tables = []
+    with _mapped(path) as mm, pdfplumber.open(mm, pages=list(range(start + 1, end + 1))) as pdf:
+        for offset, page in enumerate(pdf.pages):
+            page_no = start + offset + 1
+            texts.append(page.extract_text() or '')
+            for j, table in enumerate(page.extract_tables() or []):
+                tables.append({'page': page_no, 'table_index': j + 1, 'data': table})
+    return texts, tables
+
+
+def _file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class PDFExtractor:
+    """进程池解析器；缓存条目记录已解析的页数，请求更多页时在其基础上续解析"""
+
+    def __init__(self, workers: int = PDF_WORKERS, pages_per_task: int = PAGES_PER_TASK, cache_dir: str = CACHE_DIR):
+        self.workers = max(1, workers)
+        self.pages_per_task = max(1, pages_per_task)
+        self.cache_dir = cache_dir
+        self._pool: Optional[ProcessPoolExecutor] = None
+        # sha256 -> (解析页数上限, future)；同一文件同时只有一个解析任务
+        self._inflight: Dict[str, Tuple[int, asyncio.Future]] = {}
+        self.metrics = {"cache_hits": 0, "extractions": 0, "pages": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：避免在已有事件循环和线程的进程中 fork
+            self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                             mp_context=multiprocessing.get_context("spawn"))
+        return self._pool
+
+    def _cache_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}.json")
+
+    def _load(self, digest: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._cache_path(digest), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, digest: str, entry: Dict[str, Any]):
+        path = self._cache_path(digest)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except OSError:
+            pass
+
+    async def extract(self, path: str, max_pages: int, digest: Optional[str] = None) -> Dict[str, Any]:
+        """
+        返回 {sha256, metadata, total_pages, pages: [每页文本], tables}
+        pages 只包含前 min(total_pages, max_pages) 页；digest 为空时读取文件计算
+        """
+        if digest is None:
+            digest = await asyncio.to_thread(_file_sha256, path)
+        entry = await asyncio.to_thread(self._load, digest)
+        if entry is not None and self._covers(entry, max_pages):
+            self.metrics["cache_hits"] += 1
+            return self._slice(entry, max_pages)
+
+        # 同一文件的并发请求共享解析任务（不论页数上限），结果按各自的上限切片；
+        # 已有任务覆盖不到的页，在其结果基础上续解析
+        waited = None
+        while True:
+            inflight = self._inflight.get(digest)
+            if inflight is None or inflight is waited:
+                inflight = self._start(path, digest, max_pages, entry)
+            entry = await asyncio.shield(inflight[1])
+            if self._covers(entry, max_pages):
+                return self._slice(entry, max_pages)
+            waited = inflight
+
+    def _start(self, path: str, digest: str, max_pages: int,
+               base: Optional[Dict[str, Any]]) -> Tuple[int, asyncio.Future]:
+        # 解析任务持有文件的独立副本（优先硬链接）：调用方取消或提前删除临时文件都不影响解析
+        own_path = f"{path}.{digest[:12]}.{max_pages}"
+        try:
+            os.link(path, own_path)
+        except OSError:
+            # 文件系统不支持硬链接（部分 overlay / 挂载卷、Windows 共享目录）
+            shutil.copyfile(path, own_path)
+        inflight = (max_pages, asyncio.ensure_future(self._extract(own_path, digest, max_pages, base)))
+        self._inflight[digest] = inflight
+
+        def _done(_):
+            if self._inflight.get(digest) is inflight:
+                del self._inflight[digest]
+
+        inflight[1].add_done_callback(_done)
+        return inflight
+
+    async def _extract(self, path: str, digest: str, max_pages: int,
+                       base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        try:
+            return await self._extract_file(path, digest, max_pages, base)
+        finally:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+    async def _extract_file(self, path: str, digest: str, max_pages: int,
+                            base: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """解析前 max_pages 页；base 为已解析的部分结果时只解析其后的页"""
+        loop = asyncio.get_running_loop()
+        pool = self._executor()
+        if base is not None:
+            metadata, total_pages, first = base["metadata"], base["total_pages"], base["parsed_pages"]
+        else:
+            metadata, total_pages = await loop.run_in_executor(pool, _read_metadata, path)
+            first = 0
+        pages_to_process = max(first, min(total_pages, max_pages))
+
+        ranges = [(start, min(start + self.pages_per_task, pages_to_process))
+                  for start in range(first, pages_to_process, self.pages_per_task)]
+        parts = await asyncio.gather(*[
+            loop.run_in_executor(pool, _extract_pages, path, start, end) for start, end in ranges
+        ])
+
+        pages: List[str] = list(base["pages"]) if base is not None else []
+        tables: List[Dict[str, Any]] = list(base["tables"]) if base is not None else []
+        for texts, part_tables in parts:
+            pages.extend(texts)
+            tables.extend(part_tables)
+
+        entry = {
+            "sha256": digest,
+            "metadata": metadata,
+            "total_pages": total_pages,
+            "parsed_pages": pages_to_process,
+            "pages": pages,
+            "tables": tables
+        }
+        self.metrics["extractions"] += 1
+        self.metrics["pages"] += pages_to_process - first
+        await asyncio.to_thread(self._store, digest, entry)
+        return entry
+
+    @staticmethod
+    def _covers(entry: Dict[str, Any], max_pages: int) -> bool:
+        return entry["parsed_pages"] >= max_pages or entry["parsed_pages"] >= entry["total_pages"]
+
+    @staticmethod
+    def _slice(entry: Dict[str, Any], max_pages: int) -> Dict[str, Any]:
+        n = min(entry["parsed_pages"], max_pages)
+        return {
+            **entry,
+            "parsed_pages": n,
+            "pages": entry["pages"][:n],
+            "tables": [t for t in entry["tables"] if t["page"] <= n]
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_extractor: Optional[PDFExtractor] = None
+
+
+def get_pdf_extractor() -> PDFExtractor:
+    """获取全局 PDF 解析器"""
+    global _extractor
+    if _extractor is None:
+        _extractor = PDFExtractor()
+    return _extractor
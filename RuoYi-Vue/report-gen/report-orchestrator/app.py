@@ -1,15 +1,16 @@
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from pydantic import BaseModel
 from typing import Optional
 from core.orchestrator import Orchestrator
 from core import db
-from core.logger import logger, perf_logger
+from core.logger import logger, perf_logger, phase_stats
 from core.security import security_manager
 from core.export import export_manager
 from api.cache_api import cache_router
 from core.vector_config import get_vector_manager, initialize_vector_store
+from core.vectorstore import embedding_readiness, warm_up_embeddings
 import asyncio
 import time
 import uuid
@@ -90,6 +91,8 @@ async def log_and_security_middleware(request: Request, call_next):
 
 orc = Orchestrator()
 vector_manager = None
+embedding_warmup_task: Optional[asyncio.Task] = None
+EMBEDDING_WARMUP = os.getenv("EMBEDDING_WARMUP", "true").lower() == "true"
 
 class Step1In(BaseModel):
     project_name: str
@@ -101,7 +104,10 @@ class TaskIn(BaseModel):
 
 @app.on_event("startup")
 async def on_startup():
-    global vector_manager
+    global vector_manager, embedding_warmup_task
+    # 后台加载并预热句向量模型：/health 立即可用，/health/ready 在预热完成前返回 503
+    if EMBEDDING_WARMUP:
+        embedding_warmup_task = asyncio.create_task(asyncio.to_thread(warm_up_embeddings))
     try:
         # 初始化向量存储管理器
         vector_manager = await initialize_vector_store()
@@ -113,6 +119,11 @@ async def on_startup():
     except Exception as e:
         logger.error(f"组件初始化失败: {e}")
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 关闭 MCP 客户端连接池
+    await orc.mcp.aclose()
+
 @app.get("/")
 async def root():
     return {
@@ -121,6 +132,7 @@ async def root():
         "status": "running",
         "endpoints": {
             "health": "/health",
+            "ready": "/health/ready",
             "task_info": "/task/{task_id}",
             "step1": "/step1",
             "step2": "/step2",
@@ -141,6 +153,16 @@ async def root():
 async def health():
     return {"status": "ok"}
 
+@app.get("/health/ready")
+async def ready():
+    """就绪探针：句向量模型加载并预热完成后才接收流量"""
+    readiness = embedding_readiness()
+    readiness["warmup_running"] = embedding_warmup_task is not None and not embedding_warmup_task.done()
+    if not EMBEDDING_WARMUP:
+        # 未启用预热时不阻塞流量（模型在首个请求时懒加载）
+        readiness["ready"] = True
+    return JSONResponse(readiness, status_code=200 if readiness["ready"] else 503)
+
 @app.get("/task/{task_id}")
 async def get_task(task_id: str):
     t = await db.get_task(task_id)
@@ -471,6 +493,18 @@ async def clear_vectors():
         logger.error(f"清空向量数据失败: {e}")
         raise HTTPException(status_code=500, detail=f"清空失败: {str(e)}")
 
+# 分阶段耗时指标（压测用）
+@app.get("/api/metrics/phases")
+async def get_phase_metrics():
+    """获取 Step3 各阶段（MCP/向量/处理/LLM）耗时样本"""
+    return {"phases": phase_stats.snapshot()}
+
+@app.post("/api/metrics/phases/reset")
+async def reset_phase_metrics():
+    """清空阶段耗时样本"""
+    phase_stats.reset()
+    return {"message": "phase metrics reset"}
+
 # ============================================================================
 # 兼容性路由 - 为平滑过渡提供向后兼容的API端点
 # 注意：这些路由将在未来版本中被移除，请使用新的POST接口
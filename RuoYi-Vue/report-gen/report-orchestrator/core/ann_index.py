@@ -0,0 +1,214 @@
+"""
+FAISS 近似最近邻索引模式
+平面索引（暴力检索）在向量数超过阈值后自动升级为 IVF 或 HNSW：
+后台线程对当前向量做快照、抽样训练并建索引，再以平面检索为基准计算 recall@k，
+不达标时逐步调大 nprobe / efSearch，仍不达标则保持平面索引。
+新索引由存储在下一次读写时换入（快照之后新增的向量补加进去），后台线程不直接修改存储
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import faiss
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_MODE = os.getenv("VECTOR_INDEX_MODE", "hnsw").lower()  # flat / ivf / hnsw
+ANN_THRESHOLD = int(os.getenv("VECTOR_ANN_THRESHOLD", "50000"))
+IVF_NLIST = int(os.getenv("VECTOR_IVF_NLIST", "0"))  # 0 表示按 4·√n 自动选择
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", "16"))
+HNSW_M = int(os.getenv("VECTOR_HNSW_M", "32"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("VECTOR_HNSW_EF_CONSTRUCTION", "200"))
+HNSW_EF_SEARCH = int(os.getenv("VECTOR_HNSW_EF_SEARCH", "64"))
+TRAIN_SAMPLE = int(os.getenv("VECTOR_ANN_TRAIN_SAMPLE", "100000"))
+MIN_RECALL = float(os.getenv("VECTOR_ANN_MIN_RECALL", "0.95"))
+RECALL_K = 10
+RECALL_QUERIES = 200
+# efSearch 调参上限
+MAX_EF_SEARCH = 1024
+
+
+def index_kind(index) -> str:
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def search_params(index) -> Dict[str, int]:
+    kind = index_kind(index)
+    if kind == "hnsw":
+        return {"efSearch": index.hnsw.efSearch}
+    if kind == "ivf":
+        return {"nprobe": index.nprobe, "nlist": index.nlist}
+    return {}
+
+
+def prepare_loaded(index):
+    """read_index 之后调用：IVF 需要 direct map 才能 reconstruct（混合检索、删除重建依赖它）"""
+    if index_kind(index) == "ivf":
+        index.make_direct_map()
+    return index
+
+
+def build_index(vectors: np.ndarray, metric: int, kind: str, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                hnsw_m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, ef_search: int = HNSW_EF_SEARCH,
+                train_sample: int = TRAIN_SAMPLE, seed: int = 0):
+    """由全部向量构建 IVF / HNSW 索引，行号与输入顺序一致"""
+    n, dim = vectors.shape
+    if kind == "hnsw":
+        index = faiss.IndexHNSWFlat(dim, hnsw_m, metric)
+        index.hnsw.efConstruction = ef_construction
+        index.hnsw.efSearch = ef_search
+        index.add(vectors)
+        return index
+    if kind == "ivf":
+        # 每个聚类至少约 39 个训练点，否则 k-means 质量差
+        nlist = nlist or int(4 * math.sqrt(n))
+        nlist = max(1, min(nlist, n // 39))
+        quantizer = faiss.IndexFlatIP(dim) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        rng = np.random.default_rng(seed)
+        sample = vectors if n <= train_sample else vectors[rng.choice(n, train_sample, replace=False)]
+        index.train(sample)
+        index.add(vectors)
+        index.make_direct_map()
+        index.nprobe = min(nprobe, nlist)
+        return index
+    raise ValueError(f"Unsupported ANN index kind: {kind}")
+
+
+def recall_at_k(index, vectors: np.ndarray, metric: int, k: int = RECALL_K,
+                n_queries: int = RECALL_QUERIES, seed: int = 0) -> float:
+    """以库内抽样向量为查询，对比平面检索的前 k 个结果，返回平均召回率"""
+    n = len(vectors)
+    k = min(k, n)
+    rng = np.random.default_rng(seed)
+    queries = vectors[rng.choice(n, min(n_queries, n), replace=False)]
+    exact = faiss.IndexFlatIP(vectors.shape[1]) if metric == faiss.METRIC_INNER_PRODUCT else faiss.IndexFlatL2(vectors.shape[1])
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+    _, approx = index.search(queries, k)
+    hits = sum(len(set(t) & set(a)) for t, a in zip(truth.tolist(), approx.tolist()))
+    return hits / (len(queries) * k)
+
+
+def tune_for_recall(index, vectors: np.ndarray, metric: int, target: float = MIN_RECALL) -> float:
+    """recall@k 未达标时把 nprobe / efSearch 逐次翻倍，返回最终召回率"""
+    recall = recall_at_k(index, vectors, metric)
+    kind = index_kind(index)
+    while recall < target:
+        if kind == "ivf" and index.nprobe < index.nlist:
+            index.nprobe = min(index.nprobe * 2, index.nlist)
+        elif kind == "hnsw" and index.hnsw.efSearch < MAX_EF_SEARCH:
+            index.hnsw.efSearch = min(index.hnsw.efSearch * 2, MAX_EF_SEARCH)
+        else:
+            break
+        recall = recall_at_k(index, vectors, metric)
+    return recall
+
+
+class AnnPromoter:
+    """
+    平面索引的自动升级
+    maybe_promote() 在写入后调用；take_ready() 由存储在读写前调用，取走已通过召回校验的新索引
+    """
+
+    def __init__(self, metric: int, mode: str = INDEX_MODE, threshold: int = ANN_THRESHOLD,
+                 min_recall: float = MIN_RECALL, background: bool = True, **build_kwargs):
+        self.metric = metric
+        self.mode = mode.lower()
+        self.threshold = threshold
+        self.min_recall = min_recall
+        self.background = background
+        self.build_kwargs = build_kwargs
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._ready: Optional[Tuple[Any, int]] = None
+        # 索引被重建（删除、清空）后递增，丢弃基于旧快照的构建结果
+        self._generation = 0
+        # 召回不达标时，等向量数翻倍再重试
+        self._next_attempt = threshold
+        self.status: Dict[str, Any] = {"state": "idle", "recall": None, "build_seconds": None}
+
+    def maybe_promote(self, index) -> bool:
+        """平面索引达到阈值时启动升级，返回是否启动"""
+        if self.mode not in ("ivf", "hnsw") or index_kind(index) != "flat":
+            return False
+        n = index.ntotal
+        if n == 0 or n < max(self.threshold, self._next_attempt):
+            return False
+        with self._lock:
+            if self._ready is not None or (self._thread is not None and self._thread.is_alive()):
+                return False
+            # 快照在调用线程中完成，之后的写入不影响后台构建
+            vectors = index.reconstruct_n(0, n)
+            self.status = {"state": "building", "kind": self.mode, "vectors": n, "recall": None, "build_seconds": None}
+            args = (vectors, self._generation)
+            if self.background:
+                self._thread = threading.Thread(target=self._build, args=args, name="ann-promote", daemon=True)
+                self._thread.start()
+        if not self.background:
+            self._build(*args)
+        return True
+
+    def cancel(self):
+        """平面索引被重建时调用：作废进行中和已完成但未换入的构建"""
+        with self._lock:
+            self._generation += 1
+            self._ready = None
+        self._next_attempt = self.threshold
+        self.status = {"state": "idle", "recall": None, "build_seconds": None}
+
+    def _build(self, vectors: np.ndarray, generation: int):
+        start = time.time()
+        try:
+            candidate = build_index(vectors, self.metric, self.mode, **self.build_kwargs)
+            recall = tune_for_recall(candidate, vectors, self.metric, self.min_recall)
+        except Exception as e:
+            logger.error(f"ANN index build failed: {e}")
+            self.status.update(state="failed", error=str(e))
+            self._next_attempt = len(vectors) * 2
+            return
+        self.status.update(recall=recall, build_seconds=time.time() - start, params=search_params(candidate))
+        if recall < self.min_recall:
+            logger.warning(f"ANN index rejected: recall@{RECALL_K}={recall:.3f} < {self.min_recall}, keeping flat index")
+            self.status["state"] = "rejected"
+            self._next_attempt = len(vectors) * 2
+            return
+        logger.info(f"ANN index ready: {self.mode}, {len(vectors)} vectors, recall@{RECALL_K}={recall:.3f}")
+        with self._lock:
+            if generation != self._generation:
+                return
+            self._ready = (candidate, len(vectors))
+        self.status["state"] = "ready"
+
+    def take_ready(self) -> Optional[Tuple[Any, int]]:
+        """取走构建完成的 (新索引, 快照时的向量数)"""
+        with self._lock:
+            ready, self._ready = self._ready, None
+        if ready is not None:
+            self.status["state"] = "promoted"
+        return ready
+
+    def wait(self, timeout: Optional[float] = None):
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def get_stats(self, index) -> Dict[str, Any]:
+        return {"index_type": index_kind(index), "mode": self.mode, "threshold": self.threshold,
+                "search_params": search_params(index), "promotion": dict(self.status)}
+
+
+def swap_in(current, promoted: Tuple[Any, int]):
+    """把快照之后写入平面索引的向量补加到新索引，返回新索引"""
+    new_index, snapshot = promoted
+    if current.ntotal > snapshot:
+        new_index.add(current.reconstruct_n(snapshot, current.ntotal - snapshot))
+    return new_index
@@ -0,0 +1,247 @@
+"""
+BM25 稀疏索引
+文档只在入库时分词一次，词频以 CSR 稀疏矩阵保存，可随向量库增量追加；
+查询批量编码为稀疏向量，打分即一次稀疏矩阵乘法。参数与 rank_bm25.BM25Okapi 一致
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from array import array
+from collections import Counter
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+_CJK_CHAR_RE = re.compile(r'[\u4e00-\u9fff]')
+_WORD_RE = re.compile(r'\b\w+\b')
+
+
+def tokenize(text: str) -> Tuple[str, ...]:
+    """中文按字符、英文按单词（小写）分词"""
+    return tuple(_CJK_CHAR_RE.findall(text)) + tuple(_WORD_RE.findall(text.lower()))
+
+
+@lru_cache(maxsize=1024)
+def _query_terms(query: str) -> Tuple[Tuple[str, int], ...]:
+    """查询的 (词, 词频)；同一查询会对多批候选反复打分，只缓存短小的查询而不缓存整篇文档"""
+    return tuple(Counter(tokenize(query)).items())
+
+
+def text_key(text: str) -> str:
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+
+class BM25Index:
+    """
+    增量式 BM25 索引
+    add() 只对新文档分词并追加一行；打分前按需重算权重矩阵（纯向量化，O(nnz)）
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75, epsilon: float = 0.25, path: Optional[str] = None):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.path = path
+        self.vocab: Dict[str, int] = {}
+        self.rows: Dict[str, int] = {}
+        self.keys: List[str] = []
+        # 文本哈希 → 行号：键为向量库 id 时，rerank 仍可按文本找到已入库的行
+        self.text_rows: Dict[str, int] = {}
+        self.text_keys: List[str] = []
+        self._weights: Optional[sparse.csr_matrix] = None
+        self._idf: Optional[np.ndarray] = None
+        self._avgdl = 1.0
+        self._lock = threading.Lock()
+        self.reset()
+        if path:
+            self.load()
+
+    def reset(self):
+        with self._lock:
+            self.vocab, self.rows, self.keys = {}, {}, []
+            self.text_rows, self.text_keys = {}, []
+            self._indptr = array('q', [0])
+            self._indices = array('q')
+            self._tf = array('f')
+            self._doc_len = array('q')
+            self._weights = None
+
+    @property
+    def size(self) -> int:
+        return len(self._doc_len)
+
+    def add(self, texts: Sequence[str], keys: Optional[Sequence[str]] = None) -> List[int]:
+        """追加文档并按键去重（默认键为文本哈希，也可传入向量库的文档 id），返回每个文档对应的行号"""
+        digests = [text_key(text) for text in texts]
+        if keys is None:
+            keys = digests
+        result = []
+        with self._lock:
+            for text, key, digest in zip(texts, keys, digests):
+                row = self.rows.get(key)
+                if row is None:
+                    row = self._append(tokenize(text))
+                    self.rows[key] = row
+                    self.keys.append(key)
+                    self.text_keys.append(digest)
+                    self.text_rows.setdefault(digest, row)
+                result.append(row)
+        return result
+
+    def _append(self, tokens: Tuple[str, ...]) -> int:
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            col = self.vocab.get(term)
+            if col is None:
+                col = self.vocab[term] = len(self.vocab)
+            self._indices.append(col)
+            self._tf.append(tf)
+        self._indptr.append(len(self._indices))
+        self._doc_len.append(len(tokens))
+        self._weights = None
+        return len(self._doc_len) - 1
+
+    def _materialize(self) -> Tuple[sparse.csr_matrix, np.ndarray]:
+        with self._lock:
+            if self._weights is not None:
+                return self._weights, self._idf
+            n_docs, n_terms = self.size, len(self.vocab)
+            indptr = np.frombuffer(self._indptr, dtype=np.int64).copy()
+            indices = np.frombuffer(self._indices, dtype=np.int64).copy()
+            tf = np.frombuffer(self._tf, dtype=np.float32).astype(np.float64)
+            doc_len = np.frombuffer(self._doc_len, dtype=np.int64).astype(np.float64)
+
+            df = np.bincount(indices, minlength=n_terms).astype(np.float64)
+            idf = np.log(n_docs - df + 0.5) - np.log(df + 0.5)
+            if n_terms:
+                # 与 BM25Okapi 一致：负 idf 以平均 idf 的 epsilon 倍代替
+                idf[idf < 0] = self.epsilon * idf.mean()
+
+            avgdl = doc_len.mean() if n_docs else 1.0
+            row_norm = self.k1 * (1 - self.b + self.b * doc_len / (avgdl or 1.0))
+            per_entry = np.repeat(row_norm, np.diff(indptr))
+            weights = tf * (self.k1 + 1) / (tf + per_entry)
+
+            self._weights = sparse.csr_matrix((weights, indices, indptr), shape=(n_docs, n_terms))
+            self._idf = idf
+            self._avgdl = avgdl or 1.0
+            return self._weights, self._idf
+
+    def _query_matrix(self, queries: Sequence[str], idf: np.ndarray) -> sparse.csr_matrix:
+        rows, cols, data = [], [], []
+        for i, query in enumerate(queries):
+            for term, qf in _query_terms(query):
+                col = self.vocab.get(term)
+                if col is not None:
+                    rows.append(i)
+                    cols.append(col)
+                    data.append(qf * idf[col])
+        return sparse.csr_matrix((data, (rows, cols)), shape=(len(queries), len(self.vocab)))
+
+    def score(self, queries: Sequence[str], rows: Optional[Sequence[int]] = None) -> np.ndarray:
+        """批量打分，返回 (查询数, 文档数) 的分数矩阵；rows 指定只对部分文档打分"""
+        weights, idf = self._materialize()
+        if rows is not None:
+            weights = weights[np.asarray(rows, dtype=np.int64)]
+        q = self._query_matrix(queries, idf)
+        return np.asarray((q @ weights.T).todense())
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        """全库检索，返回得分为正的前 k 个 (键, 分数)"""
+        if self.size == 0 or k <= 0:
+            return []
+        scores = self.score([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.keys[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def rerank(self, query: str, texts: List[str], top_k: int) -> List[Tuple[str, float]]:
+        """
+        对候选文本打分排序，不修改索引：已入库的文本直接用倒排权重，
+        未入库的按当前语料的 idf / 平均文档长度单独打分；索引为空时在临时索引中打分
+        """
+        if self.size == 0:
+            temp = BM25Index(self.k1, self.b, self.epsilon)
+            temp.add(texts)
+            return temp.rerank(query, texts, top_k)
+        scores = np.zeros(len(texts))
+        rows = [self.text_rows.get(text_key(text)) for text in texts]
+        known = [i for i, row in enumerate(rows) if row is not None]
+        if known:
+            scores[known] = self.score([query], [rows[i] for i in known])[0]
+        _, idf = self._materialize()
+        for i, row in enumerate(rows):
+            if row is None:
+                scores[i] = self._score_unindexed(query, texts[i], idf)
+        order = np.argsort(-scores, kind="stable")[:top_k]
+        return [(texts[i], float(scores[i])) for i in order]
+
+    def _score_unindexed(self, query: str, text: str, idf: np.ndarray) -> float:
+        """未入库文本的 BM25 分数；语料中没有的词按文档频率 0 计算 idf"""
+        doc = Counter(tokenize(text))
+        norm = self.k1 * (1 - self.b + self.b * sum(doc.values()) / self._avgdl)
+        unseen_idf = np.log(self.size + 0.5) - np.log(0.5)
+        score = 0.0
+        for term, qf in _query_terms(query):
+            tf = doc.get(term)
+            if tf:
+                col = self.vocab.get(term)
+                term_idf = idf[col] if col is not None else unseen_idf
+                score += qf * term_idf * tf * (self.k1 + 1) / (tf + norm)
+        return float(score)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            directory = os.path.dirname(self.path) or "."
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f, indptr=np.frombuffer(self._indptr, dtype=np.int64),
+                         indices=np.frombuffer(self._indices, dtype=np.int64),
+                         tf=np.frombuffer(self._tf, dtype=np.float32),
+                         doc_len=np.frombuffer(self._doc_len, dtype=np.int64))
+            os.replace(tmp, f"{self.path}.npz")
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                vocab = sorted(self.vocab, key=self.vocab.get)
+                json.dump({"vocab": vocab, "rows": self.keys, "texts": self.text_keys}, f, ensure_ascii=False)
+            os.replace(tmp, f"{self.path}.json")
+
+    def load(self) -> bool:
+        try:
+            with np.load(f"{self.path}.npz") as arrays:
+                indptr, indices = arrays["indptr"], arrays["indices"]
+                tf, doc_len = arrays["tf"], arrays["doc_len"]
+            with open(f"{self.path}.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError, KeyError):
+            return False
+        # 旧文件没有 texts 字段，当时的键即文本哈希
+        texts = data.get("texts", data["rows"])
+        if len(data["rows"]) != len(doc_len) or len(texts) != len(doc_len):
+            return False
+        with self._lock:
+            self.vocab = {term: i for i, term in enumerate(data["vocab"])}
+            self.keys = list(data["rows"])
+            self.rows = {key: i for i, key in enumerate(self.keys)}
+            self.text_keys = list(texts)
+            self.text_rows = {}
+            for i, digest in enumerate(self.text_keys):
+                self.text_rows.setdefault(digest, i)
+            self._indptr = array('q', indptr.astype(np.int64).tobytes())
+            self._indices = array('q', indices.astype(np.int64).tobytes())
+            self._tf = array('f', tf.astype(np.float32).tobytes())
+            self._doc_len = array('q', doc_len.astype(np.int64).tobytes())
+            self._weights = None
+        return True
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"documents": self.size, "terms": len(self.vocab), "postings": len(self._indices)}
@@ -1,11 +1,11 @@
 import httpx
 import os
 import json
-import re
 import asyncio
 import logging
 from typing import Dict, Any, Optional, Union
 from .deepseek_config import DeepSeekConfig, get_rate_limiter, get_alert_manager
+from .jsonops import extract_json
 
 logger = logging.getLogger(__name__)
 
@@ -134,27 +134,12 @@ class DeepSeekClient:
     
     def _parse_response(self, text: str) -> Union[Dict[str, Any], str]:
         """解析响应文本，尝试提取JSON"""
-        # 增强 JSON 解析容错性
-        try:
-            # 尝试直接解析
-            return json.loads(text)
-        except json.JSONDecodeError:
-            try:
-                # 尝试提取 JSON 代码块
-                json_match = re.search(r'```(?:json)?\s*({.*?})\s*```', text, re.DOTALL)
-                if json_match:
-                    return json.loads(json_match.group(1))
-                
-                # 尝试提取花括号内容
-                brace_match = re.search(r'{.*}', text, re.DOTALL)
-                if brace_match:
-                    return json.loads(brace_match.group(0))
-                    
-            except json.JSONDecodeError:
-                pass
-            
+        # 单遍配平扫描，兼容代码块、前后说明文字、尾随逗号和截断输出
+        result = extract_json(text)
+        if result is None:
             # 如果都失败，返回原始文本
             return text
+        return result
     
     def _is_auth_error(self, error: Exception) -> bool:
         """判断是否为认证错误"""
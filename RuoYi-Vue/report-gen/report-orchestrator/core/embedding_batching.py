@@ -0,0 +1,62 @@
+"""
+句向量批处理与长文本策略
+按长度分桶组批（批内长度相近，padding 最少），编码后按原顺序还原；
+超过模型最大序列长度的文本：truncate 由模型自身截断，window 滑动窗口编码后按 token 数加权平均
+"""
+import os
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "32"))
+LONG_TEXT_POLICY = os.getenv("EMBEDDING_LONG_TEXT", "truncate").lower()  # "truncate" / "window"
+WINDOW_OVERLAP = int(os.getenv("EMBEDDING_WINDOW_OVERLAP", "32"))
+# [CLS] / [SEP] 占用的位置
+SPECIAL_TOKENS = 2
+
+Offsets = Sequence[Tuple[int, int]]
+
+
+def length_buckets(lengths: Sequence[int], batch_size: int) -> List[List[int]]:
+    """按长度降序排序后切批，返回每批的原始下标（最长的批先算，峰值内存可预期）"""
+    order = np.argsort(-np.asarray(lengths), kind="stable")
+    return [order[i:i + batch_size].tolist() for i in range(0, len(order), max(1, batch_size))]
+
+
+def encode_bucketed(encode_batch: Callable[[List[str]], np.ndarray], texts: List[str], batch_size: int) -> np.ndarray:
+    """按长度分桶调用 encode_batch，结果按输入顺序返回"""
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+    result: Optional[np.ndarray] = None
+    for batch in length_buckets([len(t) for t in texts], batch_size):
+        vectors = np.asarray(encode_batch([texts[i] for i in batch]), dtype=np.float32)
+        if result is None:
+            result = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+        result[batch] = vectors
+    return result
+
+
+def token_windows(offsets: Offsets, window: int, overlap: int = WINDOW_OVERLAP) -> List[Tuple[int, int, int]]:
+    """
+    把 token 偏移切成至多 window 个 token 的窗口，相邻窗口重叠 overlap 个 token
+    返回 [(起始字符, 结束字符, token 数)]
+    """
+    n = len(offsets)
+    if n <= window:
+        return [(offsets[0][0], offsets[-1][1], n)] if n else []
+    stride = max(1, window - overlap)
+    spans = []
+    for start in range(0, n, stride):
+        end = min(start + window, n)
+        spans.append((offsets[start][0], offsets[end - 1][1], end - start))
+        if end == n:
+            break
+    return spans
+
+
+def pool_windows(vectors: np.ndarray, weights: Sequence[int]) -> np.ndarray:
+    """按窗口 token 数加权平均后重新 L2 归一化"""
+    w = np.asarray(weights, dtype=np.float32)[:, None]
+    pooled = (vectors * w).sum(axis=0) / w.sum()
+    norm = np.linalg.norm(pooled)
+    return pooled / norm if norm > 0 else pooled
@@ -0,0 +1,118 @@
+"""
+句向量持久缓存
+以 (模型名, 文本) 的 SHA-1 为键，float16 向量存入 SQLite（WAL 模式，多进程可共享）；
+按最近使用时间做 LRU 淘汰。反复检索到的同一摘要只需编码一次
+"""
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "data/embedding_cache.db")
+CACHE_MAX_ITEMS = int(os.getenv("EMBEDDING_CACHE_MAX_ITEMS", "200000"))
+CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+
+# 单条 SQL 的参数个数上限（SQLite 默认 999）
+_SQL_BATCH = 500
+
+
+class EmbeddingCache:
+    """
+    SQLite 向量缓存
+    超过 max_items 时按 used 时间淘汰最久未用的条目，一次淘汰到容量的 90%，避免每次写入都触发删除
+    """
+
+    def __init__(self, path: str = CACHE_PATH, max_items: int = CACHE_MAX_ITEMS):
+        self.path = path
+        self.max_items = max_items
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS vectors (key TEXT PRIMARY KEY, vec BLOB NOT NULL, used REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_vectors_used ON vectors(used)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        self.metrics = {"hits": 0, "misses": 0, "evicted": 0}
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        return hashlib.sha1(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, np.ndarray]:
+        """批量读取，返回命中的 {键: float16 向量}，并刷新命中条目的使用时间"""
+        found: Dict[str, np.ndarray] = {}
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(keys), _SQL_BATCH):
+                batch = keys[start:start + _SQL_BATCH]
+                marks = ",".join("?" * len(batch))
+                rows = self._conn.execute(f"SELECT key, vec FROM vectors WHERE key IN ({marks})", batch).fetchall()
+                for key, blob in rows:
+                    found[key] = np.frombuffer(blob, dtype=np.float16)
+            if found:
+                now = time.time()
+                self._conn.executemany("UPDATE vectors SET used = ? WHERE key = ?", [(now, k) for k in found])
+                self._conn.commit()
+        self.metrics["hits"] += len(found)
+        self.metrics["misses"] += len(keys) - len(found)
+        return found
+
+    def put_many(self, vectors: Dict[str, np.ndarray]):
+        """批量写入（向量转为 float16），超出容量时淘汰最久未用的条目"""
+        if not vectors:
+            return
+        now = time.time()
+        rows = [(key, np.asarray(vec, dtype=np.float16).tobytes(), now) for key, vec in vectors.items()]
+        with self._lock:
+            before = self._conn.total_changes
+            self._conn.executemany("INSERT OR IGNORE INTO vectors (key, vec, used) VALUES (?, ?, ?)", rows)
+            self._count += self._conn.total_changes - before
+            if self._count > self.max_items:
+                self._evict(self._count - int(self.max_items * 0.9))
+            self._conn.commit()
+
+    def _evict(self, n: int):
+        self._conn.execute(
+            "DELETE FROM vectors WHERE key IN (SELECT key FROM vectors ORDER BY used LIMIT ?)", (n,)
+        )
+        remaining = self._conn.execute("SELECT COUNT(*) FROM vectors").fetchone()[0]
+        self.metrics["evicted"] += self._count - remaining
+        self._count = remaining
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM vectors")
+            self._conn.commit()
+            self._count = 0
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        return {"path": self.path, "items": self._count, "max_items": self.max_items, **self.metrics}
+
+
+_cache: Optional[EmbeddingCache] = None
+_cache_failed = False
+
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """获取全局向量缓存；未启用或缓存文件不可用时返回 None（直接编码，不影响功能）"""
+    global _cache, _cache_failed
+    if _cache is None and CACHE_ENABLED and not _cache_failed:
+        try:
+            _cache = EmbeddingCache()
+        except (OSError, sqlite3.Error) as e:
+            _cache_failed = True
+            logger.warning(f"Embedding cache disabled: {e}")
+    return _cache
@@ -2,11 +2,11 @@ import asyncio
 import json
 import logging
 from typing import Dict, Any, List, Tuple, Optional
-from .mcp_client import MCPClient
+from .mcp_client import MCPClient, LITERATURE_TOOL
 from .deepseek_client import DeepSeekClient
 from .textops import (
     flatten_snippets, deduplicate_citations, rerank_texts, 
-    smart_chunk_by_strategy, budget_context, count_tokens
+    smart_chunk_by_strategy, budget_context, count_tokens, relevance_cutoff
 )
 from .vectorstore import Embedding, FaissStore
 from .vector_config import get_vector_manager
@@ -167,35 +167,36 @@ class EnhancedRAGPipeline:
         
         # 定义检索源
         sources = [
-            ("arxiv_search", {"max_results": self.config.max_search_results}),
+            (LITERATURE_TOOL, {"max_results": self.config.max_search_results}),
             ("crossref_search", {"max_results": self.config.max_search_results}),
         ]
         
-        for query in queries:
-            for source_name, base_params in sources:
-                try:
-                    params = {**base_params, "query": query}
-                    result = await self.mcp.invoke(source_name, params)
-                    
-                    if isinstance(result, dict) and "items" in result:
-                        documents = result["items"]
-                    elif isinstance(result, list):
-                        documents = result
-                    else:
-                        documents = [result] if result else []
-                    
-                    # 标记文档来源
-                    for doc in documents:
-                        if isinstance(doc, dict):
-                            doc["_source"] = source_name
-                            doc["_query"] = query
-                    
-                    all_documents.extend(documents)
-                    logger.debug(f"Retrieved {len(documents)} docs from {source_name} for query: {query[:50]}...")
-                    
-                except Exception as e:
-                    logger.warning(f"Failed to retrieve from {source_name} with query '{query[:50]}...': {e}")
-                    continue
+        # 查询 × 检索源 合并为一次批量调用
+        calls = [(source_name, {**base_params, "query": query})
+                 for query in queries for source_name, base_params in sources]
+        results = await self.mcp.invoke_many(calls, item_timeout=self.config.search_timeout)
+        
+        for (source_name, params), result in zip(calls, results):
+            query = params["query"]
+            if isinstance(result, dict) and "error" in result:
+                logger.warning(f"Failed to retrieve from {source_name} with query '{query[:50]}...': {result['error']}")
+                continue
+            
+            if isinstance(result, dict) and "items" in result:
+                documents = result["items"]
+            elif isinstance(result, list):
+                documents = result
+            else:
+                documents = [result] if result else []
+            
+            # 标记文档来源
+            for doc in documents:
+                if isinstance(doc, dict):
+                    doc["_source"] = source_name
+                    doc["_query"] = query
+            
+            all_documents.extend(documents)
+            logger.debug(f"Retrieved {len(documents)} docs from {source_name} for query: {query[:50]}...")
         
         return all_documents
     
@@ -248,33 +249,42 @@ class EnhancedRAGPipeline:
                 # 适配新的向量存储接口
                 if hasattr(self.store, 'search') and hasattr(self.store, 'add_vectors'):
                      # 新的抽象接口
-                    results = await self.store.search(
+                    results = await self.store.search_hybrid(
+                         query,
                          np.array(query_embedding), 
                          k=self.config.max_retrieved_docs
                     )
-                     # 转换结果格式 (id, distance, metadata) -> (text, metadata)
-                    for vec_id, distance, metadata in results:
+                     # 转换结果格式 (id, relevance, metadata) -> (text, metadata)，相关度记入元数据副本
+                    for vec_id, score, metadata in results:
                          # 从元数据中恢复文本
                          text = metadata.get('text', f"Document {vec_id}")
-                         retrieved_docs.append((text, metadata))
+                         retrieved_docs.append((text, {**metadata, "_score": score}))
                 else:
                      # 旧的FAISS接口
                     results = self.store.search(query_embedding, top_k=self.config.max_retrieved_docs)
-                    retrieved_docs.extend(results)
+                    for text, metadata, score in results:
+                        retrieved_docs.append((text, {**metadata, "_score": score}))
                     
             except Exception as e:
                 logger.warning(f"Vector search failed for query '{query[:50]}...': {e}")
         
-        # 去重（基于URL和标题）
-        seen = set()
+        # 去重（基于URL和标题），多个查询命中同一文档时保留最高相关度
+        best: Dict[Tuple[str, str], int] = {}
         unique_docs = []
         for text, meta in retrieved_docs:
             key = (meta.get("url", ""), meta.get("title", ""))
-            if key not in seen:
-                seen.add(key)
+            if key not in best:
+                best[key] = len(unique_docs)
                 unique_docs.append((text, meta))
+            elif meta["_score"] > unique_docs[best[key]][1]["_score"]:
+                unique_docs[best[key]] = (text, meta)
         
-        return unique_docs
+        # 相关度阈值 + 拐点截断，丢弃尾部无关文档
+        kept = relevance_cutoff([meta["_score"] for _, meta in unique_docs],
+                                min_score=self.config.min_relevance_score)
+        if len(kept) < len(unique_docs):
+            logger.info(f"Relevance cutoff dropped {len(unique_docs) - len(kept)} of {len(unique_docs)} documents")
+        return [unique_docs[i] for i in kept]
     
     async def _rerank_and_deduplicate(self, primary_query: str, documents: List[Tuple[str, Dict[str, Any]]]) -> List[Tuple[str, Dict[str, Any]]]:
         """重排序和去重"""
@@ -300,7 +310,8 @@ class EnhancedRAGPipeline:
         # BM25重排序
         if len(deduplicated_docs) > 1:
             try:
-                reranked_results = rerank_texts(primary_query, [doc[0] for doc in deduplicated_docs], self.config.rerank_top_k)
+                reranked_results = rerank_texts(primary_query, [doc[0] for doc in deduplicated_docs], self.config.rerank_top_k,
+                                                index=getattr(self.store, "bm25", None))
                 
                 # 重建带元数据的结果
                 reranked_docs = []
@@ -322,21 +333,31 @@ class EnhancedRAGPipeline:
         if not documents:
             return ""
         
-        # 提取文本
-        texts = [doc[0] for doc in documents]
-        
-        # 智能分块
+        # 智能分块，块继承所属文档的检索相关度
         all_chunks = []
-        for text in texts:
+        chunk_scores = []
+        chunk_counts = []
+        for text, meta in documents:
             chunks = smart_chunk_by_strategy(
                 text, 
                 strategy=self.config.chunk_strategy, 
                 max_tokens=self.config.chunk_max_tokens
             )
             all_chunks.extend(chunks)
+            chunk_scores.extend([meta.get("_score", 0.0)] * len(chunks))
+            chunk_counts.append(len(chunks))
         
-        # 根据token预算选择最佳块
-        selected_chunks = budget_context(all_chunks, self.config.max_context_tokens)
+        # 按相关度/token 填满预算；旧 FAISS 接口能取回文档向量时，块沿用所属文档向量做 MMR 去冗余
+        chunk_embeddings = None
+        if hasattr(self.store, "get_vectors"):
+            import numpy as np
+            doc_vectors = self.store.get_vectors([text for text, _ in documents])
+            chunk_embeddings = np.repeat(doc_vectors, chunk_counts, axis=0)
+        selected_chunks = budget_context(
+            all_chunks, self.config.max_context_tokens, scores=chunk_scores,
+            embeddings=chunk_embeddings, packing=self.config.context_packing,
+            mmr_lambda=self.config.mmr_lambda
+        )
         
         # 如果启用语义压缩，使用DeepSeek进一步压缩
         if self.config.enable_semantic_compression and len(selected_chunks) > 3:
@@ -0,0 +1,205 @@
+"""
+LLM 响应 JSON 提取
+单遍括号配平扫描，顺带修复常见格式问题：尾随逗号、字符串内未转义换行、输出被截断
+"""
+import json
+from typing import Any, List, Optional, Tuple
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_LITERALS = ("true", "false", "null")
+_TOKEN_CHARS = set("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789.+-")
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def loads(text: str) -> Any:
+    """解析 JSON，优先使用 orjson"""
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except ValueError:
+            pass
+    return json.loads(text)
+
+
+def _try_loads(text: str) -> Tuple[bool, Any]:
+    try:
+        return True, loads(text)
+    except ValueError:
+        return False, None
+
+
+def _last_significant(buf: List[str]) -> str:
+    for ch in reversed(buf):
+        if not ch.isspace():
+            return ch
+    return ""
+
+
+def _rstrip(buf: List[str]):
+    while buf and buf[-1].isspace():
+        buf.pop()
+
+
+def _strip_trailing_comma(buf: List[str]):
+    """去掉闭合括号前的尾随逗号"""
+    _rstrip(buf)
+    if buf and buf[-1] == ",":
+        buf.pop()
+
+
+
+
+def _trim_truncated_tail(buf: List[str], key_start: int):
+    """截断修复：去掉残缺的键、值和悬空的分隔符"""
+    if key_start >= 0:
+        # 截断发生在对象键内部或键之后，整个键丢弃
+        del buf[key_start:]
+    _rstrip(buf)
+
+    # 末尾的裸值：true / false / null 完整即保留；数字无法判断是否被截断（12 可能是 123 的前缀），一律丢弃
+    end = len(buf)
+    start = end
+    while start > 0 and buf[start - 1] in _TOKEN_CHARS:
+        start -= 1
+    if start < end and "".join(buf[start:end]) not in _LITERALS:
+        del buf[start:]
+        _rstrip(buf)
+
+    # 悬空的冒号：连同前面的键一起去掉
+    if buf and buf[-1] == ":":
+        buf.pop()
+        _rstrip(buf)
+        if buf and buf[-1] == '"':
+            i = len(buf) - 2
+            while i >= 0 and not (buf[i] == '"' and (i == 0 or buf[i - 1] != "\\")):
+                i -= 1
+            del buf[max(i, 0):]
+        _rstrip(buf)
+
+    if buf and buf[-1] == ",":
+        buf.pop()
+
+
+def _scan(text: str, start: int) -> Tuple[Optional[str], int, bool]:
+    """
+    从 start 处的开括号开始单遍扫描，返回 (修复后的片段, 结束位置, 是否完整闭合)
+    括号不匹配时片段为 None
+    """
+    buf: List[str] = []
+    stack: List[str] = []
+    in_str = False
+    esc = False
+    key_start = -1
+    n = len(text)
+    i = start
+
+    while i < n:
+        ch = text[i]
+        if in_str:
+            if esc:
+                buf.append(ch)
+                esc = False
+            elif ch == "\\":
+                buf.append(ch)
+                esc = True
+            elif ch == '"':
+                buf.append(ch)
+                in_str = False
+            elif ch == "\n":
+                buf.append("\\n")
+            elif ch == "\r":
+                buf.append("\\r")
+            elif ch == "\t":
+                buf.append("\\t")
+            elif ch < " ":
+                buf.append("\\u%04x" % ord(ch))
+            else:
+                buf.append(ch)
+        elif ch == '"':
+            if stack and stack[-1] == "}" and _last_significant(buf) in ("{", ","):
+                key_start = len(buf)
+            in_str = True
+            buf.append(ch)
+        elif ch == ":":
+            key_start = -1
+            buf.append(ch)
+        elif ch in _CLOSERS:
+            stack.append(_CLOSERS[ch])
+            buf.append(ch)
+        elif ch in "}]":
+            if not stack or stack[-1] != ch:
+                return None, i + 1, True
+            _strip_trailing_comma(buf)
+            stack.pop()
+            buf.append(ch)
+            if not stack:
+                return "".join(buf), i + 1, True
+        else:
+            buf.append(ch)
+        i += 1
+
+    # 输出被截断：补齐字符串和括号
+    if in_str and key_start < 0:
+        if esc:
+            buf.pop()
+        buf.append('"')
+    _trim_truncated_tail(buf, key_start)
+    buf.extend(reversed(stack))
+    return "".join(buf), n, False
+
+
+def _acceptable(value: Any, opener: str) -> bool:
+    """
+    修复后的结果必须是非空对象/数组，避免把 Markdown 中零散的括号误判为 JSON；
+    从 '[' 开始的候选还要求至少含一个对象、数组或字符串，排除正文里的 [1]、[1, 2] 之类引用标号
+    """
+    if not isinstance(value, (dict, list)) or not value:
+        return False
+    if opener == "[":
+        return any(isinstance(item, (dict, list, str)) for item in value)
+    return True
+
+
+def _next_opener(text: str, start: int) -> int:
+    brace, bracket = text.find("{", start), text.find("[", start)
+    if brace == -1 or bracket == -1:
+        return max(brace, bracket)
+    return min(brace, bracket)
+
+
+def extract_json(text: str) -> Optional[Any]:
+    """
+    从 LLM 输出中提取 JSON
+
+    先尝试整体解析；失败则从第一个 '{' 或 '[' 开始单遍配平扫描，返回最外层的值，
+    跳过无法解析的片段继续向后查找。无法提取时返回 None。
+    """
+    if not text:
+        return None
+
+    stripped = text.strip()
+    if stripped[:1] in ("{", "["):
+        ok, value = _try_loads(stripped)
+        if ok:
+            return value
+
+    pos = _next_opener(text, 0)
+    while pos != -1:
+        opener = text[pos]
+        candidate, end, complete = _scan(text, pos)
+        if candidate is not None:
+            ok, value = _try_loads(candidate)
+            if ok and _acceptable(value, opener):
+                return value
+        if opener == "[":
+            # 正文中的方括号（链接、引用）可能包住真正的 JSON，从下一个字符继续找
+            pos = _next_opener(text, pos + 1)
+            continue
+        if not complete:
+            break
+        pos = _next_opener(text, end if candidate is not None else pos + 1)
+    return None
@@ -13,7 +13,7 @@ import json
 from .mcp_client import MCPClient
 from .deepseek_client import DeepSeekClient
 from .textops import flatten_snippets, chunk_texts, rerank_texts, budget_context, smart_sentence_split, deduplicate_citations, smart_chunk_by_strategy
-from .vectorstore import Embedding, FaissStore, PGVectorStore
+from .vectorstore import get_embedding, FaissStore, PGVectorStore
 from .enhanced_rag_pipeline import EnhancedRAGPipeline
 from .rag_config import RAGConfig, get_config
 from . import db
@@ -224,7 +224,7 @@ class LangChainOrchestrator:
         
         # 初始化向量存储
         backend = os.getenv("VECTOR_BACKEND", "faiss").lower()
-        self.embed = Embedding()
+        self.embed = get_embedding()
         if backend == "pgvector":
             self.store = PGVectorStore(os.getenv("PG_DSN", ""))
         else:
@@ -4,6 +4,7 @@ import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional
 from contextvars import ContextVar
+from collections import deque
 import sys
 
 # 请求ID上下文变量
@@ -127,9 +128,31 @@ class PerformanceLogger:
             )
             self.start_time = None
 
+class PhaseStats:
+    """分阶段耗时采样（供压测脚本拉取 p50/p95/p99）"""
+    
+    def __init__(self, max_samples: int = 10000):
+        self.max_samples = max_samples
+        self.samples: Dict[str, deque] = {}
+    
+    def record(self, phase: str, duration: float):
+        """记录一次阶段耗时（秒）"""
+        if phase not in self.samples:
+            self.samples[phase] = deque(maxlen=self.max_samples)
+        self.samples[phase].append(duration)
+    
+    def snapshot(self) -> Dict[str, list]:
+        """导出当前所有样本"""
+        return {phase: list(values) for phase, values in self.samples.items()}
+    
+    def reset(self):
+        """清空样本"""
+        self.samples.clear()
+
 # 全局日志实例
 logger = RequestLogger()
 perf_logger = PerformanceLogger(logger)
+phase_stats = PhaseStats()
 
 # 创建日志目录
 import os
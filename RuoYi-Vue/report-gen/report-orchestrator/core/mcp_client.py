@@ -1,13 +1,98 @@
-import httpx, os
+import httpx, os, asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+# 文献检索工具：默认使用 MCP 本地文献索引（召回不足时由 MCP 回退在线 arXiv），设为 arxiv_search 则直连在线检索
+LITERATURE_TOOL = os.getenv("MCP_LITERATURE_TOOL", "local_search")
+# 单次 /invoke_batch 的最大调用数，需不大于 MCP 服务端的 MAX_BATCH_SIZE
+MCP_BATCH_SIZE = max(1, int(os.getenv("MCP_BATCH_SIZE", "32")))
+
 class MCPClient:
-    def __init__(self, base: str):
+    def __init__(self, base: str, timeout: float = 30.0, max_connections: int = 20,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
         self.base = base.rstrip('/')
+        self.timeout = timeout
+        self.transport = transport
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop = None
+        self._batch_supported = True
+        self._closing: set = set()
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """复用连接池；事件循环变化时关闭旧连接池并重建（脚本里多次 asyncio.run 的场景）"""
+        loop = asyncio.get_running_loop()
+        if self._client is not None and not self._client.is_closed and self._loop is not loop:
+            self._discard(self._client, self._loop, loop)
+            self._client = None
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(timeout=self.timeout, limits=self.limits, transport=self.transport)
+            self._loop = loop
+        return self._client
+
+    def _discard(self, client: httpx.AsyncClient, owner, loop):
+        """旧循环仍在运行则投递回原循环关闭，否则在当前循环上关闭"""
+        if owner is not None and owner.is_running():
+            asyncio.run_coroutine_threadsafe(client.aclose(), owner)
+            return
+        task = loop.create_task(client.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose(self):
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+        self._loop = None
+
     async def invoke(self, tool: str, args: dict):
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            r = await client.post(f"{self.base}/invoke", json={"tool": tool, "args": args})
-            r.raise_for_status()
-            data = r.json()
-            return data.get("result", data)
+        client = self._get_client()
+        r = await client.post(f"{self.base}/invoke", json={"tool": tool, "args": args})
+        r.raise_for_status()
+        data = r.json()
+        return data.get("result", data)
+
+    async def invoke_many(self, calls: List[Tuple[str, dict]], item_timeout: float = 20.0) -> List[Dict[str, Any]]:
+        """
+        批量调用工具；返回结果与 calls 顺序一致
+        按 MCP_BATCH_SIZE 分片并发提交 /invoke_batch，单项失败或超时以 {"error": ...} 占位，不影响其他项
+        服务端不支持 /invoke_batch 时退化为并发单次调用；分片仍超出服务端上限（400）时该分片逐项调用
+        """
+        if not calls:
+            return []
+        chunks = [calls[i:i + MCP_BATCH_SIZE] for i in range(0, len(calls), MCP_BATCH_SIZE)]
+        parts = await asyncio.gather(*[self._invoke_chunk(chunk, item_timeout) for chunk in chunks])
+        return [item for part in parts for item in part]
 
+    async def _invoke_chunk(self, calls: List[Tuple[str, dict]], item_timeout: float) -> List[Dict[str, Any]]:
+        if self._batch_supported:
+            client = self._get_client()
+            payload = {
+                "calls": [{"tool": tool, "args": args} for tool, args in calls],
+                "timeout": item_timeout
+            }
+            try:
+                r = await client.post(f"{self.base}/invoke_batch", json=payload,
+                                      timeout=max(self.timeout, item_timeout + 5.0))
+                if r.status_code in (404, 405):
+                    self._batch_supported = False
+                elif r.status_code != 400:
+                    r.raise_for_status()
+                    items = r.json().get("results", [])
+                    return [item.get("result", item) if "result" in item else {"error": item.get("error", "unknown error")}
+                            for item in items]
+            except httpx.HTTPError as e:
+                return [{"error": f"batch invoke failed: {e}"} for _ in calls]
+        return await self._invoke_each(calls, item_timeout)
 
+    async def _invoke_each(self, calls: List[Tuple[str, dict]], item_timeout: float) -> List[Dict[str, Any]]:
+        async def _one(tool: str, args: dict):
+            try:
+                return await asyncio.wait_for(self.invoke(tool, args), timeout=item_timeout)
+            except asyncio.TimeoutError:
+                return {"error": f"{tool} timeout ({item_timeout:.0f}s)"}
+            except Exception as e:
+                return {"error": f"{tool} failed: {e}"}
 
+        return list(await asyncio.gather(*[_one(tool, args) for tool, args in calls]))
@@ -0,0 +1,103 @@
+"""
+ONNX Runtime 句向量后端
+加载 scripts/export_onnx_embedding.py 导出的 MiniLM（可选 int8 动态量化），
+复现 sentence-transformers 的 mean pooling + L2 归一化，输出与 PyTorch 版本兼容的向量，
+已有索引无需重建。相比 PyTorch fp32 常驻内存小、CPU 推理快
+"""
+import os
+from typing import List, Tuple
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+try:
+    from tokenizers import Tokenizer
+except ImportError:
+    Tokenizer = None
+
+ONNX_DIR = os.getenv("EMBEDDING_ONNX_DIR", "")
+ONNX_QUANTIZED = os.getenv("EMBEDDING_ONNX_QUANTIZED", "true").lower() == "true"
+# 0 表示由 ONNX Runtime 按物理核数决定
+INTRA_OP_THREADS = int(os.getenv("EMBEDDING_THREADS", "0"))
+INTER_OP_THREADS = int(os.getenv("EMBEDDING_INTER_THREADS", "1"))
+MAX_SEQ_LENGTH = 256  # 与 all-MiniLM-L6-v2 的 max_seq_length 一致
+
+FP32_FILE = "model.onnx"
+INT8_FILE = "model_int8.onnx"
+TOKENIZER_FILE = "tokenizer.json"
+
+
+def onnx_available() -> bool:
+    return ort is not None and Tokenizer is not None
+
+
+def default_model_dir(model_name: str) -> str:
+    return ONNX_DIR or os.path.join("models", f"{model_name.rsplit('/', 1)[-1]}-onnx")
+
+
+def mean_pool(token_embeddings: np.ndarray, attention_mask: np.ndarray, normalize: bool = True) -> np.ndarray:
+    """按 attention mask 对 token 向量求平均（忽略 padding），再做 L2 归一化"""
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    pooled = summed / np.clip(mask.sum(axis=1), 1e-9, None)
+    if normalize:
+        pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return pooled.astype(np.float32)
+
+
+class OnnxEncoder:
+    """与 SentenceTransformer.encode 接口兼容的 ONNX 编码器"""
+
+    def __init__(self, model_dir: str, quantized: bool = ONNX_QUANTIZED,
+                 intra_op_threads: int = INTRA_OP_THREADS, inter_op_threads: int = INTER_OP_THREADS,
+                 max_seq_length: int = MAX_SEQ_LENGTH):
+        if not onnx_available():
+            raise RuntimeError("onnxruntime / tokenizers not available")
+        model_file = os.path.join(model_dir, INT8_FILE if quantized else FP32_FILE)
+        if not os.path.exists(model_file):
+            raise FileNotFoundError(f"ONNX model not found: {model_file}（先运行 scripts/export_onnx_embedding.py）")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+        self.session = ort.InferenceSession(model_file, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        # 不截断的分词器，用于长文本切窗口
+        self._splitter = Tokenizer.from_file(os.path.join(model_dir, TOKENIZER_FILE))
+        self._splitter.no_truncation()
+        self._splitter.no_padding()
+        self.model_file = model_file
+        self.max_seq_length = max_seq_length
+
+    @classmethod
+    def for_model(cls, model_name: str) -> "OnnxEncoder":
+        return cls(default_model_dir(model_name))
+
+    def token_offsets(self, text: str) -> List[Tuple[int, int]]:
+        return self._splitter.encode(text, add_special_tokens=False).offsets
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool(token_embeddings, attention_mask)
+
+    def encode(self, texts: List[str], batch_size: int = 32, convert_to_numpy: bool = True) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        parts = [self._encode_batch(texts[i:i + batch_size]) for i in range(0, len(texts), batch_size)]
+        return np.vstack(parts)
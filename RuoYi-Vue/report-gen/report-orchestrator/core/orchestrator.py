@@ -1,11 +1,13 @@
 import os
 import time
+import numpy as np
 from typing import Dict, Any
-from .mcp_client import MCPClient
+from .mcp_client import MCPClient, LITERATURE_TOOL
 from .deepseek_client import DeepSeekClient
-from .textops import flatten_snippets, chunk_texts, rerank_texts, budget_context, smart_sentence_split, deduplicate_citations, smart_chunk_by_strategy
-from .vectorstore import Embedding, FaissStore, PGVectorStore
-from .logger import logger
+from .textops import flatten_snippets, chunk_texts, rerank_texts, budget_context, smart_sentence_split, deduplicate_citations, smart_chunk_by_strategy, relevance_cutoff
+from .vectorstore import get_embedding, FaissStore, PGVectorStore
+from .logger import logger, phase_stats
+from .rag_config import RAGConfig
 from . import db
 
 class Orchestrator:
@@ -13,7 +15,8 @@ class Orchestrator:
         self.mcp = MCPClient(os.getenv("MCP_BASE", "http://localhost:8000"))
         self.ds = DeepSeekClient.from_env()
         backend = os.getenv("VECTOR_BACKEND", "faiss").lower()
-        self.embed = Embedding()
+        self.embed = get_embedding()
+        self.rag_config = RAGConfig()
         if backend == "pgvector":
             self.store = PGVectorStore(os.getenv("PG_DSN", ""))
         else:
@@ -53,9 +56,9 @@ class Orchestrator:
             
             # MCP 检索阶段
             mcp_start = time.time()
-            r = await self.mcp.invoke("arxiv_search", {"query": query, "max_results": 8})
+            r = await self.mcp.invoke(LITERATURE_TOOL, {"query": query, "max_results": 8})
             mcp_time = time.time() - mcp_start
-            logger.info(f"[{section_key}] MCP arXiv 检索耗时: {mcp_time:.2f}s")
+            logger.info(f"[{section_key}] MCP 文献检索({LITERATURE_TOOL})耗时: {mcp_time:.2f}s")
             items = r.get("items", [])
             
             # 向量处理阶段
@@ -66,8 +69,15 @@ class Orchestrator:
                 embs = self.embed.encode(texts)
                 self.store.add(embs, texts, metas)
             q_emb = self.embed.encode([query])[0]
-            retrieved = self.store.search(q_emb, top_k=12)  # 先检索更多
+            if hasattr(self.store, "hybrid_search"):
+                retrieved = self.store.hybrid_search(query, q_emb, top_k=12)  # 先检索更多（向量 + BM25）
+            else:
+                retrieved = self.store.search(q_emb, top_k=12)
+            # 按相关度阈值和拐点截掉尾部无关文档
+            kept = relevance_cutoff([rt[2] for rt in retrieved], min_score=self.rag_config.min_relevance_score)
+            retrieved = [retrieved[i] for i in kept]
             retrieved_texts = [rt[0] for rt in retrieved]
+            relevance = {rt[0]: rt[2] for rt in retrieved}
             refs = [rt[1].get("url") for rt in retrieved if rt[1].get("url")]
             vector_time = time.time() - vector_start
             logger.info(f"[{section_key}] 向量处理耗时: {vector_time:.2f}s, 检索到 {len(retrieved_texts)} 条文档")
@@ -78,17 +88,26 @@ class Orchestrator:
             deduplicated_texts = deduplicate_citations(retrieved_texts, similarity_threshold=0.8)
             
             # 使用 BM25 重排序
-            reranked = rerank_texts(query, deduplicated_texts, top_k=8)
+            reranked = rerank_texts(query, deduplicated_texts, top_k=8, index=getattr(self.store, "bm25", None))
             reranked_texts = [item[0] for item in reranked]
             
             # 智能分块策略（混合策略：段落 -> 句子 -> token）
             all_chunks = []
+            chunk_scores = []
+            chunk_counts = []
             for text in reranked_texts:
                 chunks = smart_chunk_by_strategy(text, strategy="mixed", max_tokens=400)
                 all_chunks.extend(chunks)
+                chunk_scores.extend([relevance.get(text, 0.0)] * len(chunks))
+                chunk_counts.append(len(chunks))
             
-            # 根据 token 预算控制上下文长度
-            budgeted_texts = budget_context(all_chunks, max_tokens=1500)
+            # 按相关度/token 填满预算；块沿用所属文档的向量做 MMR，避免同一来源占满上下文
+            chunk_embs = None
+            if hasattr(self.store, "get_vectors") and reranked_texts:
+                chunk_embs = np.repeat(self.store.get_vectors(reranked_texts), chunk_counts, axis=0)
+            budgeted_texts = budget_context(all_chunks, max_tokens=1500, scores=chunk_scores,
+                                            embeddings=chunk_embs, packing=self.rag_config.context_packing,
+                                            mmr_lambda=self.rag_config.mmr_lambda)
             context = "\n\n".join(budgeted_texts)
             process_time = time.time() - process_start
             logger.info(f"[{section_key}] 文本处理耗时: {process_time:.2f}s, 最终上下文长度: {len(context)} 字符")
@@ -107,6 +126,8 @@ class Orchestrator:
             merged_refs = list({*(ds.get("参考网址", []) or []), *[u for u in refs if u]})
             
             total_time = time.time() - start_time
+            for phase, duration in (("mcp", mcp_time), ("vector", vector_time), ("processing", process_time), ("llm", deepseek_time), ("section", total_time)):
+                phase_stats.record(phase, duration)
             logger.info(f"[{section_key}] 章节生成完成，总耗时: {total_time:.2f}s (MCP:{mcp_time:.1f}s + 向量:{vector_time:.1f}s + 处理:{process_time:.1f}s + DeepSeek:{deepseek_time:.1f}s)")
             
             return f"{h1}::{h2}", {"研究内容": ds.get("研究内容") or ds.get("content"), "参考网址": merged_refs}
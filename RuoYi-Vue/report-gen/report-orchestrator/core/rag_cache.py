@@ -8,7 +8,7 @@ import numpy as np
 from dataclasses import dataclass, asdict
 import logging
 import faiss
-from .vectorstore import Embedding, FaissStore
+from .vectorstore import get_embedding, FaissStore
 
 logger = logging.getLogger(__name__)
 
@@ -81,7 +81,7 @@ class RAGCache:
         os.makedirs(cache_dir, exist_ok=True)
         
         # 初始化embedding模型
-        self.embedding = Embedding(embedding_model)
+        self.embedding = get_embedding(embedding_model)
         
         # 缓存文件路径
         self.cache_file = os.path.join(cache_dir, "rag_cache.json")
@@ -95,7 +95,8 @@ class RAGCache:
         self.query_store = FaissStore(
             dim=384,  # all-MiniLM-L6-v2的维度
             index_path=self.query_index_file,
-            meta_path=self.query_meta_file
+            meta_path=self.query_meta_file,
+            with_bm25=False
         )
         
         # 加载缓存
@@ -188,7 +189,7 @@ class RAGCache:
             # 在向量索引中搜索
             results = self.query_store.search(query_embedding, top_k=5)
             
-            for text, meta in results:
+            for text, meta, _ in results:
                 query_hash = meta.get("query_hash")
                 if query_hash and query_hash in self.cache:
                     entry = self.cache[query_hash]
@@ -349,7 +350,8 @@ class RAGCache:
             self.query_store = FaissStore(
                 dim=384,
                 index_path=self.query_index_file,
-                meta_path=self.query_meta_file
+                meta_path=self.query_meta_file,
+                with_bm25=False
             )
         except Exception as e:
             logger.warning(f"重置向量索引失败: {e}")
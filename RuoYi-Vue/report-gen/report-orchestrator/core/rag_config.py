@@ -14,6 +14,8 @@ class RAGConfig:
     max_context_tokens: int = 1500
     chunk_max_tokens: int = 400
     chunk_strategy: str = "mixed"  # "sentence", "paragraph", "token", "mixed"
+    context_packing: str = "knapsack"  # "greedy", "knapsack"（相关度/token 背包 + MMR 去冗余）
+    mmr_lambda: float = 0.7
     
     # 缓存配置
     cache_dir: str = "./cache"
@@ -99,6 +101,8 @@ class RAGConfig:
             "max_context_tokens": self.max_context_tokens,
             "chunk_max_tokens": self.chunk_max_tokens,
             "chunk_strategy": self.chunk_strategy,
+            "context_packing": self.context_packing,
+            "mmr_lambda": self.mmr_lambda,
             "enable_query_expansion": self.enable_query_expansion,
             "enable_semantic_compression": self.enable_semantic_compression,
             "enable_multi_source": self.enable_multi_source,
@@ -128,6 +132,10 @@ class RAGConfig:
             return False
         if self.chunk_strategy not in ["sentence", "paragraph", "token", "mixed"]:
             return False
+        if self.context_packing not in ["greedy", "knapsack"]:
+            return False
+        if self.mmr_lambda < 0 or self.mmr_lambda > 1:
+            return False
         return True
     
     def optimize_for_performance(self) -> 'RAGConfig':
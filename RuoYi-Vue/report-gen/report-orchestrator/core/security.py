@@ -62,8 +62,13 @@ class SecurityManager:
     """安全管理器"""
     
     def __init__(self):
-        self.rate_limiter = RateLimiter(max_requests=100, window_seconds=3600)  # 每小时100次
-        self.concurrency_limiter = ConcurrencyLimiter(max_concurrent=10)  # 最大10个并发
+        import os
+        # 默认每小时100次、最大10个并发；压测时可通过环境变量放宽
+        self.rate_limiter = RateLimiter(
+            max_requests=int(os.getenv('RATE_LIMIT_MAX_REQUESTS', '100')),
+            window_seconds=int(os.getenv('RATE_LIMIT_WINDOW_SECONDS', '3600'))
+        )
+        self.concurrency_limiter = ConcurrencyLimiter(max_concurrent=int(os.getenv('MAX_CONCURRENT_REQUESTS', '10')))
         self.whitelist: List[str] = self._load_whitelist()
         self.blacklist: List[str] = self._load_blacklist()
     
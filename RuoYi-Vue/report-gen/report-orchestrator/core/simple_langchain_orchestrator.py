@@ -13,7 +13,7 @@ import json
 from .mcp_client import MCPClient
 from .deepseek_client import DeepSeekClient
 from .textops import flatten_snippets, chunk_texts, rerank_texts, budget_context, smart_sentence_split, deduplicate_citations, smart_chunk_by_strategy
-from .vectorstore import Embedding, FaissStore, PGVectorStore
+from .vectorstore import get_embedding, FaissStore, PGVectorStore
 from .vector_config import get_vector_manager
 from .enhanced_rag_pipeline import EnhancedRAGPipeline
 from .rag_config import RAGConfig, get_config
@@ -29,7 +29,7 @@ class SimpleLangChainOrchestrator:
         self.ds = DeepSeekClient.from_env()
         
         # 初始化向量存储
-        self.embed = Embedding()
+        self.embed = get_embedding()
         self.vector_manager = get_vector_manager()
         self.store = None  # 延迟初始化
         
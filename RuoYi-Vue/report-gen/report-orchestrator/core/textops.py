@@ -1,12 +1,15 @@
-from typing import List, Tuple, Set
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Set
 import re
 import hashlib
+import threading
+import numpy as np
+from .bm25 import BM25Index
 try:
     import tiktoken
-    from rank_bm25 import BM25Okapi
 except ImportError:
     tiktoken = None
-    BM25Okapi = None
 
 def flatten_snippets(items) -> List[str]:
     texts = []
@@ -37,51 +40,188 @@ def chunk_texts(texts: List[str], max_len: int = 900) -> List[str]:
             chunks.append(cur)
     return chunks
 
-def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
-    """估算文本的 token 数量"""
-    if tiktoken:
-        try:
-            encoding = tiktoken.encoding_for_model(model)
-            return len(encoding.encode(text))
-        except:
-            pass
+_CJK_CHAR_RE = re.compile(r'[\u4e00-\u9fff]')
+_WORD_RE = re.compile(r'\b\w+\b')
+_TOKEN_COUNT_CACHE_SIZE = 20000
+_token_count_cache: "OrderedDict[Tuple[str, str], int]" = OrderedDict()
+_token_count_lock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = "gpt-3.5-turbo"):
+    """进程内缓存的 tiktoken 编码器；不可用（未安装、未知模型、无法下载词表）时返回 None，且只尝试一次"""
+    if not tiktoken:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+def _estimate_tokens(text: str) -> int:
     # 简单估算：中文按字符数，英文按单词数 * 1.3
-    chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', text))
-    english_words = len(re.findall(r'\b\w+\b', text))
+    chinese_chars = len(_CJK_CHAR_RE.findall(text))
+    english_words = len(_WORD_RE.findall(text))
     return int(chinese_chars + english_words * 1.3)
 
-def rerank_texts(query: str, texts: List[str], top_k: int = 6) -> List[Tuple[str, float]]:
-    """使用 BM25 对文本进行重排序"""
-    if not texts or not BM25Okapi:
-        return [(t, 1.0) for t in texts[:top_k]]
-    
-    # 简单分词（支持中英文）
-    def tokenize(text: str) -> List[str]:
-        # 中文按字符分，英文按单词分
-        chinese = re.findall(r'[\u4e00-\u9fff]', text)
-        english = re.findall(r'\b\w+\b', text.lower())
-        return chinese + english
-    
+
+def _cached_counts(keys: List[Tuple[str, str]]) -> Dict[Tuple[str, str], int]:
+    found = {}
+    with _token_count_lock:
+        for key in keys:
+            n = _token_count_cache.get(key)
+            if n is not None:
+                _token_count_cache.move_to_end(key)
+                found[key] = n
+    return found
+
+
+def _remember_counts(counts: Dict[Tuple[str, str], int]):
+    with _token_count_lock:
+        _token_count_cache.update(counts)
+        while len(_token_count_cache) > _TOKEN_COUNT_CACHE_SIZE:
+            _token_count_cache.popitem(last=False)
+
+
+def count_tokens(text: str, model: str = "gpt-3.5-turbo") -> int:
+    """估算文本的 token 数量"""
+    return count_tokens_many([text], model)[0]
+
+
+def count_tokens_many(texts: List[str], model: str = "gpt-3.5-turbo") -> List[int]:
+    """批量计算 token 数：命中缓存的直接返回，其余去重后走编码器的批量接口"""
+    keys = [(model, text) for text in texts]
+    counts = _cached_counts(keys)
+    missing = list(dict.fromkeys(text for key, text in zip(keys, texts) if key not in counts))
+    if missing:
+        encoding = get_encoding(model)
+        if encoding is not None:
+            if len(missing) == 1:
+                lengths = [len(encoding.encode_ordinary(missing[0]))]
+            else:
+                lengths = [len(ids) for ids in encoding.encode_ordinary_batch(missing)]
+        else:
+            lengths = [_estimate_tokens(text) for text in missing]
+        fresh = {(model, text): n for text, n in zip(missing, lengths)}
+        _remember_counts(fresh)
+        counts.update(fresh)
+    return [counts[key] for key in keys]
+
+def rerank_texts(query: str, texts: List[str], top_k: int = 6, index: Optional[BM25Index] = None) -> List[Tuple[str, float]]:
+    """
+    使用 BM25 对文本进行重排序
+    index 为向量库维护的持久 BM25 索引时，已入库文本无需重新分词建索引；未指定时临时建索引
+    """
+    if not texts:
+        return []
     try:
-        corpus_tokens = [tokenize(text) for text in texts]
-        bm25 = BM25Okapi(corpus_tokens)
-        query_tokens = tokenize(query)
-        scores = bm25.get_scores(query_tokens)
-        
-        # 按分数排序
-        ranked = sorted(zip(texts, scores), key=lambda x: x[1], reverse=True)
-        return ranked[:top_k]
-    except:
+        if index is None:
+            index = BM25Index()
+        return index.rerank(query, texts, top_k)
+    except Exception:
         # 如果 BM25 失败，返回原始顺序
         return [(t, 1.0) for t in texts[:top_k]]
 
-def budget_context(texts: List[str], max_tokens: int = 1500, model: str = "gpt-3.5-turbo") -> List[str]:
-    """根据 token 预算控制上下文长度"""
+def relevance_cutoff(scores: List[float], min_score: float = 0.0, elbow: bool = True,
+                     min_keep: int = 1, elbow_ratio: float = 2.0, min_gap: float = 0.05) -> List[int]:
+    """
+    按相关度截断检索结果，返回保留项的下标（保持原顺序）
+    先丢弃低于 min_score 的项；elbow=True 时再在降序分数的最大落差处截断
+    （落差需超过平均落差的 elbow_ratio 倍且不小于 min_gap，至少保留 min_keep 项）
+    """
+    kept = [i for i, s in enumerate(scores) if s >= min_score]
+    if not elbow or len(kept) <= max(min_keep, 1) + 1:
+        return kept
+    ordered = np.sort(np.asarray([scores[i] for i in kept], dtype=np.float64))[::-1]
+    gaps = ordered[:-1] - ordered[1:]
+    start = max(min_keep, 1) - 1
+    cut = start + int(np.argmax(gaps[start:]))
+    if gaps[cut] < min_gap or gaps[cut] < elbow_ratio * gaps.mean():
+        return kept
+    threshold = ordered[cut]
+    return [i for i in kept if scores[i] >= threshold]
+
+def _truncate_to_budget(text: str, text_tokens: int, max_tokens: int) -> str:
+    """按 token 比例截断单个超长文本（留点余量）"""
+    ratio = max_tokens / text_tokens
+    return text[:int(len(text) * ratio * 0.9)]
+
+
+def _pack_knapsack(tokens: np.ndarray, relevance: np.ndarray, max_tokens: int,
+                   embeddings: Optional[np.ndarray] = None, mmr_lambda: float = 0.7) -> List[int]:
+    """
+    相关度/token 密度贪心近似 0-1 背包，收益按 MMR 扣除与已选块的冗余：
+        gain_i = λ·rel_i - (1-λ)·max_{j∈已选} cos(i, j)
+    每步在剩余预算放得下的块中选 gain_i / tokens_i 最大者；
+    最后与"单个最相关块"比较，取总相关度更高的一组（经典的 1/2 近似修正）
+    """
+    n = len(tokens)
+    sims = None
+    if embeddings is not None and n:
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+        sims = vectors @ vectors.T
+    redundancy = np.zeros(n)
+    available = np.ones(n, dtype=bool)
+    selected: List[int] = []
+    remaining = max_tokens
+    cost = np.maximum(tokens, 1).astype(np.float64)
+    while True:
+        candidates = available & (tokens <= remaining)
+        if not candidates.any():
+            break
+        gain = mmr_lambda * relevance - (1 - mmr_lambda) * redundancy
+        density = np.where(candidates & (gain > 0), gain / cost, -np.inf)
+        best = int(np.argmax(density))
+        if density[best] == -np.inf:
+            break
+        selected.append(best)
+        available[best] = False
+        remaining -= int(tokens[best])
+        if sims is not None:
+            np.maximum(redundancy, sims[best], out=redundancy)
+
+    fitting = np.flatnonzero(tokens <= max_tokens)
+    if len(fitting):
+        single = int(fitting[np.argmax(relevance[fitting])])
+        if relevance[single] > relevance[selected].sum():
+            selected = [single]
+    return selected
+
+
+def budget_context(texts: List[str], max_tokens: int = 1500, model: str = "gpt-3.5-turbo",
+                   scores: Optional[List[float]] = None, embeddings: Optional[np.ndarray] = None,
+                   packing: str = "greedy", mmr_lambda: float = 0.7) -> List[str]:
+    """
+    根据 token 预算控制上下文长度
+    packing="greedy"：给出 scores 时先按分数从高到低排序（同分保持原顺序），再按顺序截取到第一个放不下的块
+    packing="knapsack"：按相关度/token 选块填满预算，embeddings（每块一个向量）用于 MMR 去冗余；
+    超过整个预算的块先截断再参与选择。结果按分数从高到低返回
+    """
+    if packing == "knapsack" and texts:
+        token_counts = count_tokens_many(texts, model)
+        texts = list(texts)
+        for i, n in enumerate(token_counts):
+            if n > max_tokens:
+                texts[i] = _truncate_to_budget(texts[i], n, max_tokens)
+                token_counts[i] = count_tokens(texts[i], model)
+        raw = np.asarray(scores if scores is not None else [1.0] * len(texts), dtype=np.float64)
+        # 相关度按比例缩放到 (0, 1]（负分先平移），保证每块都有正收益，剩余预算仍可被低分块填满
+        low = min(raw.min(), 0.0)
+        span = raw.max() - low
+        relevance = 0.05 + 0.95 * ((raw - low) / span if span > 0 else np.ones_like(raw))
+        chosen = _pack_knapsack(np.asarray(token_counts), relevance, max_tokens, embeddings, mmr_lambda)
+        chosen.sort(key=lambda i: (-raw[i], i))
+        return [texts[i] for i in chosen]
+
+    if scores is not None:
+        order = sorted(range(len(texts)), key=lambda i: -scores[i])
+        texts = [texts[i] for i in order]
     result = []
     total_tokens = 0
     
-    for text in texts:
-        text_tokens = count_tokens(text, model)
+    for text, text_tokens in zip(texts, count_tokens_many(texts, model)):
         if total_tokens + text_tokens <= max_tokens:
             result.append(text)
             total_tokens += text_tokens
@@ -89,230 +229,306 @@ def budget_context(texts: List[str], max_tokens: int = 1500, model: str = "gpt-3
             # 如果单个文本就超过预算，截断它
             if not result and text_tokens > max_tokens:
                 # 简单截断到预算内
-                ratio = max_tokens / text_tokens
-                truncated = text[:int(len(text) * ratio * 0.9)]  # 留点余量
-                result.append(truncated)
+                result.append(_truncate_to_budget(text, text_tokens, max_tokens))
             break
     
     return result
 
+# 单遍扫描：受保护的片段（URL、缩写、小数）整体被消耗，不会产生切分点
+_SENTENCE_SCAN_RE = re.compile(r"""
+    (?P<url>(?:https?://|www\.)\S*?(?=[.!?;,)]*(?:\s|$)))   # URL（不含末尾标点）
+  | (?P<abbr>[A-Z]\.)                                        # 缩写：U.S.、A.
+  | (?P<num>\d\.\d)                                          # 小数
+  | (?P<cut>[。！？；]|[.!?;](?=\s+[A-Z])|\n+)               # 中文句末标点、英文句号后跟大写字母、换行
+""", re.X)
+
+
+def sentence_spans(text: str) -> List[Tuple[int, int]]:
+    """智能中英文混排分句，返回每句（去除首尾空白后）在原文中的 [start, end) 偏移"""
+    spans = []
+    start = 0
+    for m in _SENTENCE_SCAN_RE.finditer(text):
+        if m.lastgroup != "cut":
+            continue
+        a, b = _strip_span(text, start, m.end())
+        if a < b:
+            spans.append((a, b))
+        start = m.end()
+    a, b = _strip_span(text, start, len(text))
+    if a < b:
+        spans.append((a, b))
+    return spans
+
 def smart_sentence_split(text: str) -> List[str]:
     """智能中英文混排分句"""
     if not text:
         return []
-    
-    # 预处理：保护特殊格式
-    text = re.sub(r'(\d+\.\d+)', '<<NUM>>\\1<<NUM>>', text)  # 保护小数
-    text = re.sub(r'([A-Z]\.)+', lambda m: m.group().replace('.', '<<DOT>>'), text)  # 保护缩写
-    text = re.sub(r'(www\.|http[s]?://)', '<<URL>>\\1', text)  # 保护URL
-    
-    # 中英文混排分句规则
-    patterns = [
-        r'[。！？；]',  # 中文句号
-        r'[.!?;](?=\s+[A-Z])',  # 英文句号后跟大写字母
-        r'[.!?;](?=\s*$)',  # 句末标点
-        r'\n+',  # 换行符
-    ]
-    
-    sentences = [text]
-    for pattern in patterns:
-        new_sentences = []
-        for sent in sentences:
-            parts = re.split(f'({pattern})', sent)
-            current = ''
-            for i, part in enumerate(parts):
-                if re.match(pattern, part):
-                    current += part
-                    new_sentences.append(current.strip())
-                    current = ''
-                else:
-                    current += part
-            if current.strip():
-                new_sentences.append(current.strip())
-        sentences = new_sentences
-    
-    # 恢复特殊格式
-    result = []
-    for sent in sentences:
-        if not sent:
+    return [text[a:b] for a, b in sentence_spans(text)]
+
+_SHINGLE_SIZE = 5
+_NUM_PERM = 64
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_HASH_BASE = np.uint64(1000003)
+_rng = np.random.RandomState(7)
+_PERM_A = _rng.randint(1, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, 1 << 32, size=_NUM_PERM, dtype=np.uint64)
+
+
+def _shingle_hashes(text: str, k: int = _SHINGLE_SIZE) -> np.ndarray:
+    """字符 k-shingle 的多项式滚动哈希（向量化），返回去重后的 uint64 数组"""
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    if len(codes) <= k:
+        k = len(codes)
+    n = len(codes) - k + 1
+    h = np.zeros(n, dtype=np.uint64)
+    for j in range(k):
+        # uint64 溢出回绕不影响哈希性质
+        h = h * _HASH_BASE + codes[j:j + n]
+    return np.unique(h)
+
+
+def _lsh_bands(threshold: float, num_perm: int = _NUM_PERM) -> Tuple[int, int]:
+    """选择 (bands, rows)，使 S 曲线拐点 (1/b)^(1/r) 略低于阈值，宁可多召回候选"""
+    target = max(0.05, threshold - 0.1)
+    best, best_err = (num_perm, 1), float("inf")
+    for rows in range(1, num_perm + 1):
+        if num_perm % rows:
             continue
-        sent = sent.replace('<<NUM>>', '').replace('<<DOT>>', '.').replace('<<URL>>', '')
-        sent = sent.strip()
-        if sent:
-            result.append(sent)
-    
-    return result
+        bands = num_perm // rows
+        err = abs((1.0 / bands) ** (1.0 / rows) - target)
+        if err < best_err:
+            best, best_err = (bands, rows), err
+    return best
+
 
 def deduplicate_citations(texts: List[str], similarity_threshold: float = 0.8) -> List[str]:
-    """引用去重"""
+    """
+    引用去重
+    完全重复（去空白、标点后哈希相同）直接跳过；近重复按字符 shingle 的 Jaccard 相似度判断，
+    与已保留文本相似度 ≥ similarity_threshold 即丢弃。
+    MinHash 签名存放在 NumPy 矩阵中，LSH 分桶只对同桶文本做精确校验，避免两两比较
+    """
     if not texts:
         return []
-    
+
     def text_hash(text: str) -> str:
         """计算文本哈希"""
         # 标准化文本：去除空白、标点，转小写
         normalized = re.sub(r'[\s\W]+', '', text.lower())
         return hashlib.md5(normalized.encode()).hexdigest()
-    
-    def similarity(text1: str, text2: str) -> float:
-        """计算文本相似度（简单版本）"""
-        if not text1 or not text2:
-            return 0.0
-        
-        # 转换为字符集合
-        set1 = set(text1.lower())
-        set2 = set(text2.lower())
-        
-        # Jaccard 相似度
-        intersection = len(set1 & set2)
-        union = len(set1 | set2)
-        
-        return intersection / union if union > 0 else 0.0
-    
-    unique_texts = []
+
+    candidates = []
     seen_hashes: Set[str] = set()
-    
     for text in texts:
         if not text.strip():
             continue
-            
         # 完全重复检查
         text_hash_val = text_hash(text)
         if text_hash_val in seen_hashes:
             continue
-        
-        # 相似度检查
+        seen_hashes.add(text_hash_val)
+        candidates.append(text)
+
+    if len(candidates) <= 1:
+        return candidates
+
+    shingles = [_shingle_hashes(re.sub(r'\s+', ' ', t.lower()).strip()) for t in candidates]
+    signatures = np.empty((len(candidates), _NUM_PERM), dtype=np.uint64)
+    for i, hashes in enumerate(shingles):
+        phv = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _MERSENNE_PRIME
+        signatures[i] = np.bitwise_and(phv, _MAX_HASH).min(axis=1)
+
+    bands, rows = _lsh_bands(similarity_threshold)
+    band_keys = signatures.reshape(len(candidates), bands, rows)
+    buckets: List[Dict[bytes, List[int]]] = [dict() for _ in range(bands)]
+
+    unique_texts = []
+    for i, text in enumerate(candidates):
+        keys = [band_keys[i, b].tobytes() for b in range(bands)]
+        matched: Set[int] = set()
+        for bucket, key in zip(buckets, keys):
+            matched.update(bucket.get(key, ()))
+
+        # 相似度检查：候选按保留顺序精确计算 Jaccard
         is_similar = False
-        for existing in unique_texts:
-            if similarity(text, existing) >= similarity_threshold:
+        for j in sorted(matched):
+            inter = len(np.intersect1d(shingles[i], shingles[j], assume_unique=True))
+            union = len(shingles[i]) + len(shingles[j]) - inter
+            if union and inter / union >= similarity_threshold:
                 is_similar = True
                 break
-        
+
         if not is_similar:
             unique_texts.append(text)
-            seen_hashes.add(text_hash_val)
-    
+            for bucket, key in zip(buckets, keys):
+                bucket.setdefault(key, []).append(i)
+
     return unique_texts
 
+_SENTENCE_END_CHARS = '。！？.!?\n'
+_PARAGRAPH_SEP_RE = re.compile(r'\n\n')
+
+
+def _token_prefix(text: str, model: str) -> np.ndarray:
+    """
+    prefix[i] 为 text[:i] 的 token 数（长度 len(text)+1）
+    有编码器时整段只编码一次，按每个 token 的起始字符偏移累计；否则按估算规则逐字符赋权
+    """
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+    encoding = get_encoding(model)
+    if encoding is not None:
+        ids = np.asarray(encoding.encode_ordinary(text), dtype=np.int64)
+        # token 字节偏移 -> 字符偏移：全程向量化，避免逐 token 解码
+        token_bytes = np.cumsum(_token_byte_lengths(model)[ids]) - _token_byte_lengths(model)[ids]
+        char_bytes = np.cumsum(1 + (codes >= 0x80) + (codes >= 0x800) + (codes >= 0x10000))
+        char_starts = np.concatenate(([0], char_bytes[:-1]))
+        starts = np.searchsorted(char_starts, token_bytes, side="right") - 1
+        return np.searchsorted(starts, np.arange(len(text) + 1), side="left").astype(np.float64)
+    weights = np.zeros(len(text) + 1, dtype=np.float64)
+    weights[1:] += (codes >= 0x4e00) & (codes <= 0x9fff)
+    word_starts = np.fromiter((m.start() for m in _WORD_RE.finditer(text)), dtype=np.int64)
+    weights[word_starts + 1] += 1.3
+    return np.cumsum(weights)
+
+
+@lru_cache(maxsize=None)
+def _token_byte_lengths(model: str) -> np.ndarray:
+    """词表中每个 token 的字节长度，按模型缓存"""
+    encoding = get_encoding(model)
+    lengths = np.zeros(encoding.max_token_value + 1, dtype=np.int64)
+    for token_id in range(len(lengths)):
+        try:
+            lengths[token_id] = len(encoding.decode_single_token_bytes(token_id))
+        except KeyError:
+            pass
+    return lengths
+
+
+def _strip_span(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
+
+
+class OffsetChunker:
+    """
+    单次分词的分块引擎
+    文本只编码一次得到 token 前缀和，段落/句子以字符偏移表示，任意区间的 token 数 O(1) 得到；
+    分块沿偏移贪心推进，输出原文切片，整体近似线性
+    """
+
+    def __init__(self, text: str, max_tokens: int = 500, model: str = "gpt-3.5-turbo"):
+        self.text = text
+        self.max_tokens = max_tokens
+        self.prefix = _token_prefix(text, model)
+        self._prefix = self.prefix.tolist()
+
+    def tokens(self, start: int, end: int) -> float:
+        return self._prefix[end] - self._prefix[start]
+
+    def paragraph_spans(self, start: int, end: int) -> List[Tuple[int, int]]:
+        spans = []
+        cursor = start
+        for m in _PARAGRAPH_SEP_RE.finditer(self.text, start, end):
+            spans.append(_strip_span(self.text, cursor, m.start()))
+            cursor = m.end()
+        spans.append(_strip_span(self.text, cursor, end))
+        return [(a, b) for a, b in spans if a < b]
+
+    def sentence_spans(self, start: int, end: int) -> List[Tuple[int, int]]:
+        return [(start + a, start + b) for a, b in sentence_spans(self.text[start:end])]
+
+    def _pack(self, spans: List[Tuple[int, int]], oversized=None) -> List[Tuple[int, int]]:
+        """贪心合并相邻片段，片段 token 数之和不超过 max_tokens；超长片段交给 oversized 继续切分"""
+        chunks = []
+        current = None
+        current_tokens = 0.0
+        for a, b in spans:
+            n = self.tokens(a, b)
+            if current is not None and current_tokens + n <= self.max_tokens:
+                current = (current[0], b)
+                current_tokens += n
+                continue
+            if current is not None:
+                chunks.append(current)
+            if oversized is not None and n > self.max_tokens:
+                chunks.extend(oversized(a, b))
+                current, current_tokens = None, 0.0
+            else:
+                current, current_tokens = (a, b), n
+        if current is not None:
+            chunks.append(current)
+        return chunks
+
+    def by_sentence(self, start: int, end: int, oversized=None) -> List[Tuple[int, int]]:
+        return self._pack(self.sentence_spans(start, end), oversized)
+
+    def by_paragraph(self, start: int, end: int) -> List[Tuple[int, int]]:
+        return self._pack(self.paragraph_spans(start, end), self.by_sentence)
+
+    def by_mixed(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """段落 -> 句子 -> token"""
+        by_sentence = lambda a, b: self.by_sentence(a, b, self.by_token)
+        return self._pack(self.paragraph_spans(start, end), by_sentence)
+
+    def by_token(self, start: int, end: int) -> List[Tuple[int, int]]:
+        """按 token 偏移切分，切点在 100 个字符内向前对齐到句末标点"""
+        if self.tokens(start, end) <= self.max_tokens:
+            return [(start, end)]
+        chunks = []
+        pos = start
+        while pos < end:
+            limit = int(np.searchsorted(self.prefix, self._prefix[pos] + self.max_tokens, side="right")) - 1
+            cut = min(max(limit, pos + 1), end)
+            if cut < end:
+                for i in range(cut - 1, max(pos, cut - 100), -1):
+                    if self.text[i] in _SENTENCE_END_CHARS:
+                        cut = i + 1
+                        break
+            chunks.append((pos, cut))
+            pos = cut
+        return chunks
+
+    def chunk(self, strategy: str = "mixed") -> List[str]:
+        n = len(self.text)
+        if strategy == "sentence":
+            spans = self.by_sentence(0, n)
+        elif strategy == "paragraph":
+            spans = self.by_paragraph(0, n)
+        elif strategy == "token":
+            spans = self.by_token(0, n)
+        else:
+            spans = self.by_mixed(0, n)
+        chunks = []
+        for a, b in spans:
+            a, b = _strip_span(self.text, a, b)
+            if a < b:
+                chunks.append(self.text[a:b])
+        return chunks
+
+
 def smart_chunk_by_strategy(text: str, strategy: str = "sentence", max_tokens: int = 500, model: str = "gpt-3.5-turbo") -> List[str]:
     """智能分块策略"""
     if not text:
         return []
-    
-    if strategy == "sentence":
-        return chunk_by_sentence(text, max_tokens, model)
-    elif strategy == "paragraph":
-        return chunk_by_paragraph(text, max_tokens, model)
-    elif strategy == "token":
-        return chunk_by_token(text, max_tokens, model)
-    else:
-        # 默认混合策略
-        return chunk_by_mixed(text, max_tokens, model)
+    # 未知策略按混合策略处理
+    return OffsetChunker(text, max_tokens, model).chunk(strategy)
 
 def chunk_by_sentence(text: str, max_tokens: int = 500, model: str = "gpt-3.5-turbo") -> List[str]:
     """按句子分块"""
-    sentences = smart_sentence_split(text)
-    chunks = []
-    current_chunk = ""
-    current_tokens = 0
-    
-    for sentence in sentences:
-        sentence_tokens = count_tokens(sentence, model)
-        
-        if current_tokens + sentence_tokens <= max_tokens:
-            current_chunk += (" " if current_chunk else "") + sentence
-            current_tokens += sentence_tokens
-        else:
-            if current_chunk:
-                chunks.append(current_chunk)
-            current_chunk = sentence
-            current_tokens = sentence_tokens
-    
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    return chunks
+    return OffsetChunker(text, max_tokens, model).chunk("sentence")
 
 def chunk_by_paragraph(text: str, max_tokens: int = 500, model: str = "gpt-3.5-turbo") -> List[str]:
-    """按段落分块"""
-    paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
-    chunks = []
-    current_chunk = ""
-    current_tokens = 0
-    
-    for paragraph in paragraphs:
-        paragraph_tokens = count_tokens(paragraph, model)
-        
-        if current_tokens + paragraph_tokens <= max_tokens:
-            current_chunk += ("\n\n" if current_chunk else "") + paragraph
-            current_tokens += paragraph_tokens
-        else:
-            if current_chunk:
-                chunks.append(current_chunk)
-            
-            # 如果单个段落超过限制，按句子分块
-            if paragraph_tokens > max_tokens:
-                chunks.extend(chunk_by_sentence(paragraph, max_tokens, model))
-                current_chunk = ""
-                current_tokens = 0
-            else:
-                current_chunk = paragraph
-                current_tokens = paragraph_tokens
-    
-    if current_chunk:
-        chunks.append(current_chunk)
-    
-    return chunks
+    """按段落分块，超长段落按句子分块"""
+    return OffsetChunker(text, max_tokens, model).chunk("paragraph")
 
 def chunk_by_token(text: str, max_tokens: int = 500, model: str = "gpt-3.5-turbo") -> List[str]:
     """按 token 数量分块"""
-    if count_tokens(text, model) <= max_tokens:
-        return [text]
-    
-    # 简单按字符比例分块
-    total_tokens = count_tokens(text, model)
-    char_per_token = len(text) / total_tokens
-    max_chars = int(max_tokens * char_per_token * 0.9)  # 留点余量
-    
-    chunks = []
-    start = 0
-    
-    while start < len(text):
-        end = min(start + max_chars, len(text))
-        
-        # 尝试在句子边界分割
-        if end < len(text):
-            # 向前找句子结束符
-            for i in range(end, max(start, end - 100), -1):
-                if text[i] in '。！？.!?\n':
-                    end = i + 1
-                    break
-        
-        chunk = text[start:end].strip()
-        if chunk:
-            chunks.append(chunk)
-        start = end
-    
-    return chunks
+    return OffsetChunker(text, max_tokens, model).chunk("token")
 
 def chunk_by_mixed(text: str, max_tokens: int = 500, model: str = "gpt-3.5-turbo") -> List[str]:
     """混合分块策略：优先段落，其次句子，最后 token"""
-    # 先尝试按段落分块
-    paragraph_chunks = chunk_by_paragraph(text, max_tokens, model)
-    
-    # 检查是否有超长块需要进一步分割
-    final_chunks = []
-    for chunk in paragraph_chunks:
-        if count_tokens(chunk, model) <= max_tokens:
-            final_chunks.append(chunk)
-        else:
-            # 超长块按句子分割
-            sentence_chunks = chunk_by_sentence(chunk, max_tokens, model)
-            for sent_chunk in sentence_chunks:
-                if count_tokens(sent_chunk, model) <= max_tokens:
-                    final_chunks.append(sent_chunk)
-                else:
-                    # 还是超长就按 token 分割
-                    final_chunks.extend(chunk_by_token(sent_chunk, max_tokens, model))
-    
-    return final_chunks
+    return OffsetChunker(text, max_tokens, model).chunk("mixed")
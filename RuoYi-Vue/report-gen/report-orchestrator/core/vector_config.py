@@ -25,11 +25,21 @@ class VectorStoreConfig:
     # FAISS配置
     faiss_index_path: str = './data/faiss.index'
     faiss_meta_path: str = './data/faiss_meta.json'
+    # 近似最近邻：flat / ivf / hnsw，向量数超过阈值后由平面索引自动升级
+    faiss_index_mode: str = 'hnsw'
+    faiss_ann_threshold: int = 50000
     
     # PGVector配置
     pg_dsn: Optional[str] = None
     pg_vector_table: str = 'vectors'
     
+    # 混合检索配置（向量 + BM25）
+    vector_hybrid: bool = False
+    hybrid_fusion: str = 'rrf'
+    hybrid_rrf_k: int = 60
+    hybrid_dense_weight: float = 0.5
+    bm25_index_path: Optional[str] = None
+    
     @classmethod
     def from_env(cls) -> 'VectorStoreConfig':
         """从环境变量创建配置"""
@@ -42,9 +52,17 @@ class VectorStoreConfig:
             
             faiss_index_path=os.getenv('FAISS_INDEX_PATH', './data/faiss.index'),
             faiss_meta_path=os.getenv('FAISS_META_PATH', './data/faiss_meta.json'),
+            faiss_index_mode=os.getenv('VECTOR_INDEX_MODE', 'hnsw').lower(),
+            faiss_ann_threshold=int(os.getenv('VECTOR_ANN_THRESHOLD', '50000')),
             
             pg_dsn=os.getenv('PG_DSN'),
-            pg_vector_table=os.getenv('PG_VECTOR_TABLE', 'vectors')
+            pg_vector_table=os.getenv('PG_VECTOR_TABLE', 'vectors'),
+            
+            vector_hybrid=os.getenv('VECTOR_HYBRID', 'false').lower() == 'true',
+            hybrid_fusion=os.getenv('HYBRID_FUSION', 'rrf').lower(),
+            hybrid_rrf_k=int(os.getenv('HYBRID_RRF_K', '60')),
+            hybrid_dense_weight=float(os.getenv('HYBRID_DENSE_WEIGHT', '0.5')),
+            bm25_index_path=os.getenv('BM25_INDEX_PATH')
         )
     
     def validate(self) -> bool:
@@ -61,12 +79,20 @@ class VectorStoreConfig:
         if self.vector_batch_size <= 0:
             errors.append(f"Invalid batch_size: {self.vector_batch_size}")
         
+        if self.hybrid_fusion not in ['rrf', 'weighted']:
+            errors.append(f"Invalid hybrid fusion: {self.hybrid_fusion}")
+        
+        if not 0 <= self.hybrid_dense_weight <= 1:
+            errors.append(f"Invalid hybrid dense weight: {self.hybrid_dense_weight}")
+        
         # 检查后端特定配置
         if self.vector_backend == 'faiss':
             if not self.faiss_index_path:
                 errors.append("FAISS index path is required")
             if not self.faiss_meta_path:
                 errors.append("FAISS metadata path is required")
+            if self.faiss_index_mode not in ['flat', 'ivf', 'hnsw']:
+                errors.append(f"Invalid FAISS index mode: {self.faiss_index_mode}")
         
         elif self.vector_backend == 'pgvector':
             if not self.pg_dsn:
@@ -83,19 +109,30 @@ class VectorStoreConfig:
     def get_backend_config(self) -> Dict[str, Any]:
         """获取后端特定配置"""
         if self.vector_backend == 'faiss':
-            return {
+            config = {
                 'index_path': self.faiss_index_path,
                 'meta_path': self.faiss_meta_path,
-                'dimension': self.vector_dimension
+                'dimension': self.vector_dimension,
+                'index_mode': self.faiss_index_mode,
+                'ann_threshold': self.faiss_ann_threshold
             }
         elif self.vector_backend == 'pgvector':
-            return {
+            config = {
                 'dsn': self.pg_dsn,
                 'table_name': self.pg_vector_table,
                 'dimension': self.vector_dimension
             }
         else:
             raise ValueError(f"Unsupported backend: {self.vector_backend}")
+        
+        config.update({
+            'hybrid': self.vector_hybrid,
+            'fusion': self.hybrid_fusion,
+            'rrf_k': self.hybrid_rrf_k,
+            'dense_weight': self.hybrid_dense_weight,
+            'bm25_path': self.bm25_index_path
+        })
+        return config
     
     def ensure_directories(self):
         """确保必要的目录存在"""
@@ -115,8 +152,15 @@ class VectorStoreConfig:
             'vector_cache_ttl': self.vector_cache_ttl,
             'faiss_index_path': self.faiss_index_path,
             'faiss_meta_path': self.faiss_meta_path,
+            'faiss_index_mode': self.faiss_index_mode,
+            'faiss_ann_threshold': self.faiss_ann_threshold,
             'pg_dsn': self.pg_dsn,
-            'pg_vector_table': self.pg_vector_table
+            'pg_vector_table': self.pg_vector_table,
+            'vector_hybrid': self.vector_hybrid,
+            'hybrid_fusion': self.hybrid_fusion,
+            'hybrid_rrf_k': self.hybrid_rrf_k,
+            'hybrid_dense_weight': self.hybrid_dense_weight,
+            'bm25_index_path': self.bm25_index_path
         }
 
 class VectorStoreManager:
@@ -52,11 +52,55 @@ class VectorStore(ABC):
     async def clear(self) -> bool:
         """清空所有数据"""
         pass
+    
+    async def get_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按 id 批量获取元数据"""
+        return {}
+    
+    def relevance(self, score: float) -> float:
+        """把 search 返回的原始分数换算为相关度（越大越相关，与 min_relevance_score 同一量纲）"""
+        return score
+    
+    async def score_ids(self, query_vector: np.ndarray, ids: List[str]) -> Dict[str, float]:
+        """按 id 计算与查询向量的原始分数（与 search 返回的分数同一口径），供混合检索给词法命中补分"""
+        return {}
+    
+    async def search_hybrid(self, query_text: str, query_vector: np.ndarray, k: int = 10, filter_dict: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """混合检索，返回 (id, 相关度, 元数据)；不支持词法检索的后端退化为向量检索"""
+        results = await self.search(query_vector, k, filter_dict)
+        return [(vec_id, self.relevance(score), meta) for vec_id, score, meta in results]
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = 60, weights: Optional[List[float]] = None) -> List[Tuple[str, float]]:
+    """RRF 融合：score(d) = Σ w_i / (k + rank_i(d))，rank 从 1 开始"""
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, doc_id in enumerate(ranking, start=1):
+            scores[doc_id] = scores.get(doc_id, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
+
+def weighted_score_fusion(dense: List[Tuple[str, float]], sparse_hits: List[Tuple[str, float]],
+                          dense_weight: float = 0.5, higher_is_better: bool = False) -> List[Tuple[str, float]]:
+    """加权融合：两路分数各自 min-max 归一化后加权求和；向量分数为距离时先取反"""
+    def normalize(hits: List[Tuple[str, float]], invert: bool) -> Dict[str, float]:
+        if not hits:
+            return {}
+        values = np.array([-v if invert else v for _, v in hits], dtype=np.float64)
+        span = values.max() - values.min()
+        normed = (values - values.min()) / span if span > 0 else np.ones_like(values)
+        return {doc_id: float(n) for (doc_id, _), n in zip(hits, normed)}
+    
+    d = normalize(dense, invert=not higher_is_better)
+    s = normalize(sparse_hits, invert=False)
+    scores = {doc_id: dense_weight * d.get(doc_id, 0.0) + (1 - dense_weight) * s.get(doc_id, 0.0)
+              for doc_id in set(d) | set(s)}
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
 
 class FAISSVectorStore(VectorStore):
     """FAISS向量存储实现"""
     
-    def __init__(self, index_path: str, meta_path: str, dimension: int = 768):
+    def __init__(self, index_path: str, meta_path: str, dimension: int = 768,
+                 index_mode: Optional[str] = None, ann_threshold: Optional[int] = None):
         self.index_path = Path(index_path)
         self.meta_path = Path(meta_path)
         self.dimension = dimension
@@ -77,6 +121,11 @@ class FAISSVectorStore(VectorStore):
         except ImportError:
             raise ImportError("FAISS not installed. Run: pip install faiss-cpu")
         
+        # 向量数超过阈值后后台升级为 IVF / HNSW（VECTOR_INDEX_MODE=flat 时保持暴力检索）
+        from .ann_index import AnnPromoter
+        ann_kwargs = {k: v for k, v in (("mode", index_mode), ("threshold", ann_threshold)) if v is not None}
+        self.ann = AnnPromoter(faiss.METRIC_L2, **ann_kwargs)
+        
         # 初始化或加载索引
         asyncio.create_task(self._initialize())
     
@@ -95,8 +144,9 @@ class FAISSVectorStore(VectorStore):
     
     async def _create_new_index(self):
         """创建新的索引"""
-        # 使用L2距离的平面索引
+        # 使用L2距离的平面索引（重建后作废基于旧索引的升级任务）
         self.index = self.faiss.IndexFlatL2(self.dimension)
+        self.ann.cancel()
         self.metadata = {}
         self.id_to_index = {}
         self.index_to_id = {}
@@ -105,8 +155,9 @@ class FAISSVectorStore(VectorStore):
     
     async def _load_index(self):
         """加载现有索引"""
-        # 加载FAISS索引
-        self.index = self.faiss.read_index(str(self.index_path))
+        # 加载FAISS索引（IVF 需恢复 direct map 才能 reconstruct）
+        from .ann_index import prepare_loaded
+        self.index = prepare_loaded(self.faiss.read_index(str(self.index_path)))
         
         # 加载元数据
         with open(self.meta_path, 'r', encoding='utf-8') as f:
@@ -115,6 +166,15 @@ class FAISSVectorStore(VectorStore):
             self.id_to_index = data.get('id_to_index', {})
             self.index_to_id = {v: k for k, v in self.id_to_index.items()}
             self.next_index = data.get('next_index', 0)
+        self.ann.maybe_promote(self.index)
+    
+    async def _swap_promoted_index(self):
+        """换入后台构建完成的 ANN 索引，快照之后新增的向量补加进去"""
+        promoted = self.ann.take_ready()
+        if promoted is not None:
+            from .ann_index import swap_in
+            self.index = swap_in(self.index, promoted)
+            await self._save_index()
     
     async def _save_index(self):
         """保存索引和元数据"""
@@ -143,6 +203,7 @@ class FAISSVectorStore(VectorStore):
             raise ValueError("Length mismatch between vectors, metadata, and ids")
         
         # 添加向量到索引
+        await self._swap_promoted_index()
         start_index = self.index.ntotal
         self.index.add(vectors.astype(np.float32))
         
@@ -157,6 +218,7 @@ class FAISSVectorStore(VectorStore):
         
         # 保存更改
         await self._save_index()
+        self.ann.maybe_promote(self.index)
         
         logger.info(f"Added {len(vectors)} vectors to FAISS index")
         return ids
@@ -166,6 +228,7 @@ class FAISSVectorStore(VectorStore):
         if query_vector.shape[0] != self.dimension:
             raise ValueError(f"Query vector dimension {query_vector.shape[0]} doesn't match index dimension {self.dimension}")
         
+        await self._swap_promoted_index()
         if self.index.ntotal == 0:
             return []
         
@@ -193,6 +256,24 @@ class FAISSVectorStore(VectorStore):
         
         return results[:k]
     
+    async def get_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按 id 批量获取元数据"""
+        return {vec_id: self.metadata[vec_id] for vec_id in ids if vec_id in self.metadata}
+    
+    def relevance(self, score: float) -> float:
+        """IndexFlatL2 返回平方 L2 距离；对单位向量 d² = 2 - 2cos，换算为余弦相似度"""
+        return 1.0 - score / 2.0
+    
+    async def score_ids(self, query_vector: np.ndarray, ids: List[str]) -> Dict[str, float]:
+        """重建已入库向量，计算与查询的平方 L2 距离"""
+        rows = [(vec_id, self.id_to_index[vec_id]) for vec_id in ids if vec_id in self.id_to_index]
+        if not rows or self.index is None:
+            return {}
+        vectors = np.stack([self.index.reconstruct(int(idx)) for _, idx in rows])
+        q = query_vector.reshape(1, -1).astype(np.float32)
+        distances = ((vectors - q) ** 2).sum(axis=1)
+        return {vec_id: float(d) for (vec_id, _), d in zip(rows, distances)}
+    
     def _matches_filter(self, metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
         """检查元数据是否匹配过滤条件"""
         for key, value in filter_dict.items():
@@ -248,7 +329,8 @@ class FAISSVectorStore(VectorStore):
             'dimension': self.dimension,
             'index_path': str(self.index_path),
             'meta_path': str(self.meta_path),
-            'index_size_mb': self.index_path.stat().st_size / 1024 / 1024 if self.index_path.exists() else 0
+            'index_size_mb': self.index_path.stat().st_size / 1024 / 1024 if self.index_path.exists() else 0,
+            'ann': self.ann.get_stats(self.index) if self.index is not None else None
         }
     
     async def clear(self) -> bool:
@@ -404,6 +486,27 @@ class PGVectorStore(VectorStore):
             
             return results
     
+    def relevance(self, score: float) -> float:
+        """pgvector 的 <-> 为 L2 距离；对单位向量换算为余弦相似度"""
+        return 1.0 - score * score / 2.0
+    
+    async def score_ids(self, query_vector: np.ndarray, ids: List[str]) -> Dict[str, float]:
+        """按 id 计算与查询的 L2 距离"""
+        if not ids:
+            return {}
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT id, vector <-> $1 as distance FROM {self.table_name} WHERE id = ANY($2)",
+                                    query_vector.tolist(), ids)
+        return {row['id']: float(row['distance']) for row in rows}
+    
+    async def get_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按 id 批量获取元数据"""
+        if not ids:
+            return {}
+        async with self.pool.acquire() as conn:
+            rows = await conn.fetch(f"SELECT id, metadata FROM {self.table_name} WHERE id = ANY($1)", ids)
+        return {row['id']: json.loads(row['metadata']) if row['metadata'] else {} for row in rows}
+    
     async def delete(self, ids: List[str]) -> bool:
         """删除向量"""
         try:
@@ -494,6 +597,144 @@ class PGVectorStore(VectorStore):
             logger.error(f"备份PGVector数据失败: {e}")
             return False
 
+class HybridVectorStore(VectorStore):
+    """
+    混合检索：向量索引 + 持久化 BM25 倒排索引
+    两路并行检索各取 k × candidate_multiplier 个候选，再按 RRF 或加权分数融合。
+    文本取自元数据的 text 字段，随 add_vectors 增量写入 BM25 索引
+    """
+    
+    def __init__(self, dense: VectorStore, bm25_path: str, fusion: str = 'rrf', rrf_k: int = 60,
+                 dense_weight: float = 0.5, candidate_multiplier: int = 3):
+        from .bm25 import BM25Index
+        self.dense = dense
+        self.bm25 = BM25Index(path=bm25_path)
+        self.fusion = fusion
+        self.rrf_k = rrf_k
+        self.dense_weight = dense_weight
+        self.candidate_multiplier = max(1, candidate_multiplier)
+        self._synced = False
+    
+    def __getattr__(self, name):
+        # 其余属性（dimension、index 等）透传给向量后端
+        return getattr(self.__dict__['dense'], name)
+    
+    def _ensure_synced(self):
+        """BM25 索引缺失或与向量后端不一致时，按后端元数据中的文本重建"""
+        if self._synced:
+            return
+        metadata = getattr(self.dense, 'metadata', None)
+        if isinstance(metadata, dict) and self.bm25.size != len(metadata):
+            self._rebuild(metadata)
+        self._synced = True
+    
+    def _rebuild(self, metadata: Dict[str, Dict[str, Any]]):
+        self.bm25.reset()
+        ids = [vec_id for vec_id, meta in metadata.items() if meta.get('text')]
+        self.bm25.add([metadata[vec_id]['text'] for vec_id in ids], keys=ids)
+        self.bm25.save()
+        logger.info(f"Rebuilt BM25 index with {self.bm25.size} documents")
+    
+    async def add_vectors(self, vectors: np.ndarray, metadata: List[Dict[str, Any]], ids: Optional[List[str]] = None) -> List[str]:
+        """添加向量和元数据"""
+        self._ensure_synced()
+        ids = await self.dense.add_vectors(vectors, metadata, ids)
+        pairs = [(vec_id, meta['text']) for vec_id, meta in zip(ids, metadata) if meta.get('text')]
+        if pairs:
+            self.bm25.add([text for _, text in pairs], keys=[vec_id for vec_id, _ in pairs])
+            await asyncio.to_thread(self.bm25.save)
+        return ids
+    
+    async def search(self, query_vector: np.ndarray, k: int = 10, filter_dict: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """搜索最相似的向量"""
+        return await self.dense.search(query_vector, k, filter_dict)
+    
+    def relevance(self, score: float) -> float:
+        """search 返回后端原始距离，按后端换算；search_hybrid 返回的已是相关度"""
+        return self.dense.relevance(score)
+    
+    async def score_ids(self, query_vector: np.ndarray, ids: List[str]) -> Dict[str, float]:
+        return await self.dense.score_ids(query_vector, ids)
+    
+    async def search_hybrid(self, query_text: str, query_vector: np.ndarray, k: int = 10, filter_dict: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float, Dict[str, Any]]]:
+        """
+        混合检索，返回 (id, 相关度, 元数据)
+        融合（RRF / 加权）只决定排序；相关度统一为与查询的余弦相似度（与 FaissStore.hybrid_search 一致），
+        可直接与 min_relevance_score 比较。仅由词法召回的文档向后端补算分数，无法补算的记为 0
+        """
+        self._ensure_synced()
+        n_candidates = k * self.candidate_multiplier
+        dense_hits, sparse_hits = await asyncio.gather(
+            self.dense.search(query_vector, n_candidates, filter_dict),
+            asyncio.to_thread(self.bm25.search, query_text, n_candidates)
+        )
+        
+        metadata = {vec_id: meta for vec_id, _, meta in dense_hits}
+        missing = [vec_id for vec_id, _ in sparse_hits if vec_id not in metadata]
+        if missing:
+            metadata.update(await self.dense.get_metadata(missing))
+        # 词法命中同样遵守过滤条件；已被删除的 id 取不到元数据，一并丢弃
+        sparse_hits = [(vec_id, score) for vec_id, score in sparse_hits
+                       if vec_id in metadata and (not filter_dict or self._matches(metadata[vec_id], filter_dict))]
+        
+        if self.fusion == 'weighted':
+            fused = weighted_score_fusion([(vec_id, dist) for vec_id, dist, _ in dense_hits], sparse_hits, self.dense_weight)
+        else:
+            weights = [self.dense_weight * 2, (1 - self.dense_weight) * 2]
+            fused = reciprocal_rank_fusion(
+                [[vec_id for vec_id, _, _ in dense_hits], [vec_id for vec_id, _ in sparse_hits]],
+                k=self.rrf_k, weights=weights
+            )
+        top = [vec_id for vec_id, _ in fused[:k]]
+        
+        raw = {vec_id: dist for vec_id, dist, _ in dense_hits}
+        missing = [vec_id for vec_id in top if vec_id not in raw]
+        if missing:
+            raw.update(await self.dense.score_ids(query_vector, missing))
+        return [(vec_id, self.dense.relevance(raw[vec_id]) if vec_id in raw else 0.0, metadata.get(vec_id, {}))
+                for vec_id in top]
+    
+    @staticmethod
+    def _matches(metadata: Dict[str, Any], filter_dict: Dict[str, Any]) -> bool:
+        return all(key in metadata and metadata[key] == value for key, value in filter_dict.items())
+    
+    async def get_metadata(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await self.dense.get_metadata(ids)
+    
+    async def delete(self, ids: List[str]) -> bool:
+        """删除向量，并按剩余元数据重建 BM25 索引"""
+        ok = await self.dense.delete(ids)
+        metadata = getattr(self.dense, 'metadata', None)
+        if ok and isinstance(metadata, dict):
+            await asyncio.to_thread(self._rebuild, metadata)
+        return ok
+    
+    async def update_metadata(self, id: str, metadata: Dict[str, Any]) -> bool:
+        """更新元数据"""
+        return await self.dense.update_metadata(id, metadata)
+    
+    async def get_stats(self) -> Dict[str, Any]:
+        """获取存储统计信息"""
+        stats = await self.dense.get_stats()
+        stats.update({
+            'hybrid': True,
+            'fusion': self.fusion,
+            'bm25': self.bm25.get_stats()
+        })
+        return stats
+    
+    async def clear(self) -> bool:
+        """清空所有数据"""
+        ok = await self.dense.clear()
+        if ok:
+            self.bm25.reset()
+            await asyncio.to_thread(self.bm25.save)
+        return ok
+    
+    async def backup(self, backup_path: str) -> bool:
+        """备份向量数据"""
+        return await self.dense.backup(backup_path)
+
 class VectorStoreFactory:
     """向量存储工厂类"""
     
@@ -510,7 +751,9 @@ class VectorStoreFactory:
             meta_path = kwargs.get('meta_path') or os.getenv('FAISS_META_PATH', './data/faiss_meta.json')
             dimension = kwargs.get('dimension', 768)
             
-            return FAISSVectorStore(index_path, meta_path, dimension)
+            store = FAISSVectorStore(index_path, meta_path, dimension,
+                                     index_mode=kwargs.get('index_mode'), ann_threshold=kwargs.get('ann_threshold'))
+            default_bm25_path = os.path.splitext(meta_path)[0] + '.bm25'
             
         elif backend == 'pgvector':
             dsn = kwargs.get('dsn') or os.getenv('PG_DSN')
@@ -520,10 +763,25 @@ class VectorStoreFactory:
             table_name = kwargs.get('table_name', 'vectors')
             dimension = kwargs.get('dimension', 768)
             
-            return PGVectorStore(dsn, table_name, dimension)
+            store = PGVectorStore(dsn, table_name, dimension)
+            default_bm25_path = f'./data/{table_name}.bm25'
             
         else:
             raise ValueError(f"Unsupported vector backend: {backend}")
+        
+        hybrid = kwargs.get('hybrid')
+        if hybrid is None:
+            hybrid = os.getenv('VECTOR_HYBRID', 'false').lower() == 'true'
+        if not hybrid:
+            return store
+        
+        return HybridVectorStore(
+            store,
+            bm25_path=kwargs.get('bm25_path') or os.getenv('BM25_INDEX_PATH') or default_bm25_path,
+            fusion=kwargs.get('fusion', os.getenv('HYBRID_FUSION', 'rrf')),
+            rrf_k=int(kwargs.get('rrf_k', os.getenv('HYBRID_RRF_K', '60'))),
+            dense_weight=float(kwargs.get('dense_weight', os.getenv('HYBRID_DENSE_WEIGHT', '0.5')))
+        )
 
 # 全局向量存储实例
 _vector_store = None
@@ -1,32 +1,198 @@
 import os, json
-from typing import List, Dict, Tuple, Any
+import threading
+import time
+from typing import List, Dict, Tuple, Any, Optional
 import numpy as np
 import hashlib
 from datetime import datetime
+import logging
 import faiss
+from .ann_index import AnnPromoter, prepare_loaded, swap_in
+from .bm25 import BM25Index
+from .embedding_batching import BATCH_SIZE, LONG_TEXT_POLICY, SPECIAL_TOKENS, encode_bucketed, pool_windows, token_windows
+from .embedding_cache import EmbeddingCache, get_embedding_cache
+from .vector_store import reciprocal_rank_fusion
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+# 句向量推理后端：torch（sentence-transformers）或 onnx（ONNX Runtime，可选 int8 量化）
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+_WARMUP_TEXTS = ["warm up", "模型预热：加载权重并完成首次推理"]
+
 
 class Embedding:
-    def __init__(self, model_name="sentence-transformers/all-MiniLM-L6-v2"):
+    def __init__(self, model_name=DEFAULT_EMBEDDING_MODEL, cache: Optional[EmbeddingCache] = None,
+                 backend: Optional[str] = None, batch_size: Optional[int] = None, long_text: Optional[str] = None):
         self.model_name = model_name
+        self.backend = (backend or EMBEDDING_BACKEND).lower()
         self.model = None
+        self.batch_size = batch_size or BATCH_SIZE
+        # 超长文本策略：truncate（与模型默认截断结果一致）或 window（滑动窗口加权平均）
+        self.long_text = (long_text or LONG_TEXT_POLICY).lower()
+        # 缓存键带上推理后端与量化方式（int8 与 fp32 向量有差异）；window 会改变长文本的向量，同样带上策略
+        if self.backend == "onnx":
+            from .onnx_embedding import ONNX_QUANTIZED
+            variant = "onnx-int8" if ONNX_QUANTIZED else "onnx-fp32"
+        else:
+            variant = self.backend
+        self.cache_namespace = f"{model_name}@{variant}" + ("" if self.long_text == "truncate" else "#window")
+        self.metrics = {"encoded": 0, "batches": 0, "windowed": 0}
+        # 持久向量缓存：未指定时首次编码才打开全局缓存（EMBEDDING_CACHE_ENABLED=false 时不缓存）
+        self.cache = cache
+        # 就绪状态：cold -> loading -> loaded -> ready（完成过一次推理）/ failed
+        self.state = "cold"
+        self.error: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self._load_lock = threading.Lock()
     
     def _ensure_model_loaded(self):
-        if self.model is None:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(self.model_name)
-    def encode(self, texts: List[str]) -> np.ndarray:
+        if self.model is not None:
+            return
+        # 并发的首次请求只加载一次模型
+        with self._load_lock:
+            if self.model is not None:
+                return
+            self.state = "loading"
+            start = time.time()
+            try:
+                if self.backend == "onnx":
+                    from .onnx_embedding import OnnxEncoder
+                    self.model = OnnxEncoder.for_model(self.model_name)
+                else:
+                    from sentence_transformers import SentenceTransformer
+                    self.model = SentenceTransformer(self.model_name)
+            except Exception as e:
+                self.state, self.error = "failed", str(e)
+                raise
+            self.load_seconds = time.time() - start
+            self.state = "loaded"
+
+    def warmup(self):
+        """加载模型并做一次真实推理（绕过向量缓存），让首个请求不再承担冷启动开销"""
         self._ensure_model_loaded()
-        return self.model.encode(texts, convert_to_numpy=True)
+        try:
+            self.model.encode(_WARMUP_TEXTS, convert_to_numpy=True)
+        except Exception as e:
+            self.state, self.error = "failed", str(e)
+            raise
+        self.state, self.error = "ready", None
+
+    def status(self) -> Dict[str, Any]:
+        return {"state": self.state, "backend": self.backend, "error": self.error, "load_seconds": self.load_seconds}
+
+    def _token_offsets(self, text: str) -> Optional[List[Tuple[int, int]]]:
+        """模型分词器给出的 token 字符偏移（不截断、不含特殊 token）"""
+        if hasattr(self.model, "token_offsets"):
+            return self.model.token_offsets(text)
+        tokenizer = getattr(self.model, "tokenizer", None)
+        if tokenizer is None:
+            return None
+        return tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, truncation=False)["offset_mapping"]
+
+    def _encode_batch(self, batch: List[str]) -> np.ndarray:
+        self.metrics["batches"] += 1
+        return self.model.encode(batch, batch_size=len(batch), convert_to_numpy=True)
+
+    def _run_model(self, texts: List[str]) -> np.ndarray:
+        """
+        按长度分桶编码；truncate 策略下超长文本由模型按 max_seq_length 自行截断，不额外分词，
+        window 策略下超长文本切成窗口，窗口向量按 token 数加权合并回原文本
+        """
+        limit = int(getattr(self.model, "max_seq_length", None) or 256) - SPECIAL_TOKENS
+        pieces: List[str] = []
+        owners: List[int] = []
+        weights: List[int] = []
+        for i, text in enumerate(texts):
+            # 每个 token 至少覆盖一个字符，字符数不超过上限的文本无需分词检查
+            offsets = self._token_offsets(text) if self.long_text == "window" and len(text) > limit else None
+            if offsets and len(offsets) > limit:
+                spans = token_windows(offsets, limit)
+                self.metrics["windowed"] += 1
+            else:
+                spans = [(0, len(text), 1)]
+            for start, end, n in spans:
+                pieces.append(text[start:end])
+                owners.append(i)
+                weights.append(n)
+
+        vectors = encode_bucketed(self._encode_batch, pieces, self.batch_size)
+        self.metrics["encoded"] += len(texts)
+        if len(pieces) == len(texts):
+            return vectors
+        bounds = np.searchsorted(owners, np.arange(len(texts) + 1))
+        return np.stack([
+            pool_windows(vectors[lo:hi], weights[lo:hi]) if hi - lo > 1 else vectors[lo]
+            for lo, hi in zip(bounds[:-1], bounds[1:])
+        ])
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """批内去重后先查持久缓存，只对从未编码过的文本运行模型"""
+        cache = self.cache if self.cache is not None else get_embedding_cache()
+        keys = [EmbeddingCache.key(self.cache_namespace, text) for text in texts]
+        unique = dict(zip(keys, texts))
+        vectors = cache.get_many(list(unique)) if cache is not None else {}
+        missing = [key for key in unique if key not in vectors]
+        if missing:
+            self._ensure_model_loaded()
+            encoded = self._run_model([unique[key] for key in missing])
+            self.state = "ready"
+            if cache is not None:
+                # 返回与缓存中相同精度的向量，同一文本命中与否结果一致
+                encoded = encoded.astype(np.float16)
+                cache.put_many(dict(zip(missing, encoded)))
+            vectors.update(zip(missing, encoded))
+        if not keys:
+            return np.zeros((0, 0), dtype=np.float32)
+        return np.stack([vectors[key] for key in keys]).astype(np.float32)
+
+_embeddings: Dict[str, Embedding] = {}
+_embeddings_lock = threading.Lock()
+
+
+def get_embedding(model_name: str = DEFAULT_EMBEDDING_MODEL) -> Embedding:
+    """获取进程内共享的句向量模型（按模型名注册，同一模型只加载一次）"""
+    with _embeddings_lock:
+        embedding = _embeddings.get(model_name)
+        if embedding is None:
+            embedding = _embeddings[model_name] = Embedding(model_name)
+        return embedding
+
+
+def warm_up_embeddings(model_names: Optional[List[str]] = None) -> Dict[str, Any]:
+    """预热指定模型（默认：已注册的全部模型和默认模型），单个模型失败不影响其他模型"""
+    names = model_names or list(dict.fromkeys([*_embeddings, DEFAULT_EMBEDDING_MODEL]))
+    for name in names:
+        try:
+            get_embedding(name).warmup()
+        except Exception as e:
+            logger.error(f"Embedding warm-up failed for {name}: {e}")
+    return embedding_readiness()
+
+
+def embedding_readiness() -> Dict[str, Any]:
+    """就绪状态：所有已注册模型均完成预热才算就绪"""
+    with _embeddings_lock:
+        models = {name: embedding.status() for name, embedding in _embeddings.items()}
+    ready = bool(models) and all(m["state"] == "ready" for m in models.values())
+    return {"ready": ready, "models": models}
+
 
 class FaissStore:
-    def __init__(self, dim: int = 384, index_path: str = "faiss.index", meta_path: str = "faiss_meta.json"):
+    def __init__(self, dim: int = 384, index_path: str = "faiss.index", meta_path: str = "faiss_meta.json", with_bm25: bool = True,
+                 index_mode: Optional[str] = None, ann_threshold: Optional[int] = None):
         self.dim = dim
         self.index_path = index_path
         self.meta_path = meta_path
         self.index = faiss.IndexFlatIP(dim)  # 内积相似度
+        # 向量数超过阈值后后台升级为 IVF / HNSW（VECTOR_INDEX_MODE=flat 时保持暴力检索）
+        ann_kwargs = {k: v for k, v in (("mode", index_mode), ("threshold", ann_threshold)) if v is not None}
+        self.ann = AnnPromoter(faiss.METRIC_INNER_PRODUCT, **ann_kwargs)
         self.metadata: List[Dict[str, Any]] = []
         self.text_hashes: set = set()  # 用于去重
         self.version = 1
+        # 与向量同步增量维护的 BM25 索引，供重排序直接复用
+        self.bm25: Optional[BM25Index] = BM25Index() if with_bm25 else None
         self.load()
 
     def _get_text_hash(self, text: str) -> str:
@@ -54,12 +220,16 @@ class FaissStore:
         if not unique_embeddings:
             return  # 所有文本都重复
         
+        self._swap_promoted_index()
         unique_embeddings = np.array(unique_embeddings)
         
         # 归一化向量（用于余弦相似度）
         faiss.normalize_L2(unique_embeddings)
         self.index.add(unique_embeddings.astype("float32"))
         
+        if self.bm25 is not None:
+            self.bm25.add(unique_texts)
+        
         # 添加元数据
         for i, (text, meta) in enumerate(zip(unique_texts, unique_metas)):
             self.metadata.append({
@@ -71,9 +241,17 @@ class FaissStore:
                 "version": self.version
             })
         self.save()
+        self.ann.maybe_promote(self.index)
+
+    def _swap_promoted_index(self):
+        """换入后台构建完成的 ANN 索引（在调用线程中执行，不与写入并发）"""
+        promoted = self.ann.take_ready()
+        if promoted is not None:
+            self.index = swap_in(self.index, promoted)
+            self.save()
 
-    def search(self, query_emb: np.ndarray, top_k=5) -> List[Tuple[str, Dict]]:
-        """搜索最相似的向量"""
+    def _search_rows(self, query_emb: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        self._swap_promoted_index()
         if self.index.ntotal == 0:
             return []
         
@@ -81,16 +259,55 @@ class FaissStore:
             query_emb = query_emb.reshape(1, -1)
         
         # 归一化查询向量
+        query_emb = query_emb.astype("float32")
         faiss.normalize_L2(query_emb)
         
-        D, I = self.index.search(query_emb.astype("float32"), top_k)
+        D, I = self.index.search(query_emb, top_k)
+        return [(int(i), float(d)) for d, i in zip(D[0], I[0]) if 0 <= i < len(self.metadata)]
+
+    def search(self, query_emb: np.ndarray, top_k=5) -> List[Tuple[str, Dict, float]]:
+        """搜索最相似的向量，返回 (文本, 元数据, 余弦相似度)"""
         res = []
-        for i in I[0]:
-            if 0 <= i < len(self.metadata):
-                meta = self.metadata[i]
-                res.append((meta["text"], meta["meta"]))
+        for i, score in self._search_rows(query_emb, top_k):
+            meta = self.metadata[i]
+            res.append((meta["text"], meta["meta"], score))
         return res
 
+    def hybrid_search(self, query: str, query_emb: np.ndarray, top_k=5, candidate_multiplier: int = 3) -> List[Tuple[str, Dict, float]]:
+        """向量 + BM25 混合检索，按 RRF 融合两路排名；分数统一为与查询的余弦相似度"""
+        if self.bm25 is None:
+            return self.search(query_emb, top_k)
+        n_candidates = top_k * candidate_multiplier
+        row_by_hash = {meta["hash"]: i for i, meta in enumerate(self.metadata)}
+        dense = self._search_rows(query_emb, n_candidates)
+        scores = {str(i): score for i, score in dense}
+        lexical = [str(row_by_hash[key]) for key, _ in self.bm25.search(query, n_candidates) if key in row_by_hash]
+        fused = [row for row, _ in reciprocal_rank_fusion([[str(i) for i, _ in dense], lexical])[:top_k]]
+        
+        # 仅由词法召回的文档补算余弦相似度（IndexFlatIP 可直接重建向量）
+        missing = [row for row in fused if row not in scores]
+        if missing:
+            q = query_emb.reshape(1, -1).astype("float32")
+            faiss.normalize_L2(q)
+            vectors = np.stack([self.index.reconstruct(int(row)) for row in missing])
+            scores.update(zip(missing, (vectors @ q[0]).tolist()))
+        
+        res = []
+        for row in fused:
+            meta = self.metadata[int(row)]
+            res.append((meta["text"], meta["meta"], float(scores[row])))
+        return res
+
+    def get_vectors(self, texts: List[str]) -> np.ndarray:
+        """按文本取回已入库的归一化向量（未入库的文本返回零向量），供上下文打包做 MMR 去冗余"""
+        row_by_hash = {meta["hash"]: i for i, meta in enumerate(self.metadata)}
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, text in enumerate(texts):
+            row = row_by_hash.get(self._get_text_hash(text))
+            if row is not None:
+                vectors[i] = self.index.reconstruct(row)
+        return vectors
+
     def save(self):
         """保存索引和元数据（版本化）"""
         os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
@@ -118,11 +335,25 @@ class FaissStore:
                 "total_vectors": len(self.metadata),
                 "metadata": self.metadata
             }, f, ensure_ascii=False, indent=2)
+        
+        if self.bm25 is not None:
+            self.bm25.save()
+
+    def _bm25_path(self) -> str:
+        return os.path.splitext(self.meta_path)[0] + ".bm25"
+
+    def _load_bm25(self):
+        """加载 BM25 索引；缺失或与元数据不一致时按元数据中的文本重建"""
+        self.bm25 = BM25Index(path=self._bm25_path())
+        if self.bm25.size != len(self.metadata):
+            self.bm25 = BM25Index()
+            self.bm25.path = self._bm25_path()
+            self.bm25.add([m["text"] for m in self.metadata])
 
     def load(self):
         """加载索引和元数据"""
         if os.path.exists(self.index_path):
-            self.index = faiss.read_index(self.index_path)
+            self.index = prepare_loaded(faiss.read_index(self.index_path))
         
         if os.path.exists(self.meta_path):
             with open(self.meta_path, "r", encoding="utf-8") as f:
@@ -156,6 +387,10 @@ class FaissStore:
                         text_hash = self._get_text_hash(meta["text"])
                         meta["hash"] = text_hash
                         self.text_hashes.add(text_hash)
+        
+        if self.bm25 is not None:
+            self._load_bm25()
+        self.ann.maybe_promote(self.index)
 
     def cleanup_old_versions(self, keep_versions: int = 5):
         """清理旧版本文件"""
@@ -189,7 +424,9 @@ class FaissStore:
             "total_vectors": len(self.metadata),
             "unique_texts": len(self.text_hashes),
             "index_size": self.index.ntotal,
-            "dimension": self.dim
+            "dimension": self.dim,
+            "ann": self.ann.get_stats(self.index),
+            "bm25": self.bm25.get_stats() if self.bm25 is not None else None
         }
 
 class PGVectorStore:
@@ -219,6 +456,10 @@ class PGVectorStore:
             self.conn.commit()
 
     def search(self, query_emb: np.ndarray, top_k=5):
+        """返回 (文本, 元数据, 余弦相似度)"""
         with self.conn.cursor() as cur:
-            cur.execute("SELECT text, meta FROM embeddings ORDER BY embedding <-> %s LIMIT %s", (query_emb.tolist(), top_k))
-            return cur.fetchall()
+            cur.execute(
+                "SELECT text, meta, 1 - (embedding <=> %s) FROM embeddings ORDER BY embedding <-> %s LIMIT %s",
+                (query_emb.tolist(), query_emb.tolist(), top_k)
+            )
+            return [(text, meta, float(score)) for text, meta, score in cur.fetchall()]
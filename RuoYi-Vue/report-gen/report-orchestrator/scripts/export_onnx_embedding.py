@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+导出句向量模型为 ONNX（供 EMBEDDING_BACKEND=onnx 使用）
+生成 model.onnx（fp32）、model_int8.onnx（动态 int8 量化）和 tokenizer.json，
+并用一组样例文本校验与 PyTorch 输出的余弦相似度
+
+示例：
+    python scripts/export_onnx_embedding.py --output models/all-MiniLM-L6-v2-onnx
+需要 sentence-transformers、onnx、onnxruntime（仅导出时需要 torch）
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from core.onnx_embedding import FP32_FILE, INT8_FILE, TOKENIZER_FILE, OnnxEncoder, default_model_dir
+
+SAMPLES = [
+    "深度学习在医学影像诊断中的应用研究",
+    "Graph neural networks for molecular property prediction",
+    "本文提出一种基于 Transformer 的长文档检索方法，在多个基准数据集上取得了显著提升。",
+    "Dense retrieval using dual encoders and approximate nearest neighbour search",
+]
+
+
+def export(model_name: str, output: str, opset: int):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    st = SentenceTransformer(model_name, device="cpu")
+    transformer = st[0].auto_model.eval()
+    tokenizer = st.tokenizer
+    os.makedirs(output, exist_ok=True)
+    tokenizer.backend_tokenizer.save(os.path.join(output, TOKENIZER_FILE))
+
+    sample = tokenizer(SAMPLES[:2], padding=True, return_tensors="pt")
+    names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic = {name: {0: "batch", 1: "sequence"} for name in names}
+    dynamic["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(sample[name] for name in names),
+            os.path.join(output, FP32_FILE),
+            input_names=names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic,
+            opset_version=opset,
+        )
+    return st
+
+
+def quantize(output: str):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(os.path.join(output, FP32_FILE), os.path.join(output, INT8_FILE), weight_type=QuantType.QInt8)
+
+
+def verify(st, output: str):
+    reference = st.encode(SAMPLES, convert_to_numpy=True, normalize_embeddings=True)
+    for quantized in (False, True):
+        vectors = OnnxEncoder(output, quantized=quantized).encode(SAMPLES)
+        cosine = (vectors * reference).sum(axis=1)
+        label = "int8" if quantized else "fp32"
+        print(f"{label}: 与 PyTorch 的余弦相似度 min={cosine.min():.5f} mean={cosine.mean():.5f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="导出 ONNX 句向量模型")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default=None, help="输出目录（默认 EMBEDDING_ONNX_DIR 或 models/<模型名>-onnx）")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    output = args.output or default_model_dir(args.model)
+    st = export(args.model, output, args.opset)
+    quantize(output)
+    print(f"已导出到 {output}")
+    verify(st, output)
+
+
+if __name__ == "__main__":
+    main()
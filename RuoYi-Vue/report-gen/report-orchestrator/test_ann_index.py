@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+近似最近邻索引测试
+覆盖 IVF / HNSW 构建与 recall@k 调参、FaissStore 与 FAISSVectorStore 的自动升级、换入与持久化
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+if faiss is not None:
+    from core.ann_index import AnnPromoter, build_index, index_kind, recall_at_k, tune_for_recall
+
+DIM = 32
+
+
+def clustered(n, seed=0, normalize=True):
+    """带聚类结构的向量，接近真实句向量分布"""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, DIM))
+    vectors = centers[rng.integers(0, 20, n)] + 0.3 * rng.normal(size=(n, DIM))
+    vectors = vectors.astype(np.float32)
+    if normalize:
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors
+
+
+def test_build_and_tune_recall():
+    if faiss is None:
+        pytest.skip("faiss not installed")
+    vectors = clustered(4000)
+    for kind in ("hnsw", "ivf"):
+        index = build_index(vectors, faiss.METRIC_INNER_PRODUCT, kind, nprobe=1, ef_search=8)
+        assert index_kind(index) == kind and index.ntotal == len(vectors)
+        recall = tune_for_recall(index, vectors, faiss.METRIC_INNER_PRODUCT, target=0.95)
+        assert recall >= 0.95, f"{kind} recall {recall:.3f}"
+    # IVF 从 nprobe=1 起步，调参后应被调大
+    assert index.nprobe > 1
+    assert np.allclose(index.reconstruct(7), vectors[7])
+
+
+def test_promoter_rejects_low_recall_and_cancel():
+    if faiss is None:
+        pytest.skip("faiss not installed")
+    vectors = clustered(2000)
+    flat = faiss.IndexFlatIP(DIM)
+    flat.add(vectors)
+    strict = AnnPromoter(faiss.METRIC_INNER_PRODUCT, mode="ivf", threshold=1000, min_recall=1.01, background=False)
+    assert strict.maybe_promote(flat)
+    assert strict.status["state"] == "rejected" and strict.take_ready() is None
+    # 拒绝后要等向量数翻倍才重试
+    assert not strict.maybe_promote(flat)
+
+    promoter = AnnPromoter(faiss.METRIC_INNER_PRODUCT, mode="hnsw", threshold=1000, background=False)
+    assert promoter.maybe_promote(flat)
+    promoter.cancel()
+    assert promoter.take_ready() is None
+    assert not AnnPromoter(faiss.METRIC_INNER_PRODUCT, mode="flat", threshold=10).maybe_promote(flat)
+
+
+def test_faiss_store_promotes_and_persists():
+    if faiss is None:
+        pytest.skip("faiss not installed")
+    from core.vectorstore import FaissStore
+    vectors = clustered(2500, seed=1)
+    texts = [f"snippet {i}" for i in range(len(vectors))]
+    with tempfile.TemporaryDirectory() as d:
+        paths = dict(index_path=os.path.join(d, "f.index"), meta_path=os.path.join(d, "f_meta.json"))
+        store = FaissStore(dim=DIM, index_mode="ivf", ann_threshold=2000, **paths)
+        store.add(vectors[:2400], texts[:2400], [{"i": i} for i in range(2400)])
+        store.ann.wait()
+        assert index_kind(store.index) == "flat"
+        # 构建期间写入的向量在换入时补加
+        store.add(vectors[2400:], texts[2400:], [{"i": i} for i in range(2400, 2500)])
+        assert index_kind(store.index) == "ivf" and store.index.ntotal == 2500
+        hits = store.search(vectors[2450], top_k=1)
+        assert hits[0][0] == texts[2450]
+        assert np.allclose(store.get_vectors([texts[5]])[0], vectors[5], atol=1e-5)
+        assert store.get_stats()["ann"]["promotion"]["recall"] >= 0.95
+
+        reopened = FaissStore(dim=DIM, index_mode="ivf", ann_threshold=2000, **paths)
+        assert index_kind(reopened.index) == "ivf"
+        hybrid = reopened.hybrid_search("snippet 42", vectors[42], top_k=3)
+        assert hybrid[0][0] == texts[42]
+
+
+def test_faiss_vector_store_promotes_and_rebuilds_on_delete():
+    if faiss is None:
+        pytest.skip("faiss not installed")
+    from core.vector_store import FAISSVectorStore
+
+    async def run():
+        vectors = clustered(1500, seed=2, normalize=False)
+        with tempfile.TemporaryDirectory() as d:
+            store = FAISSVectorStore(os.path.join(d, "v.index"), os.path.join(d, "v_meta.json"), DIM,
+                                     index_mode="hnsw", ann_threshold=1000)
+            await asyncio.sleep(0)
+            ids = await store.add_vectors(vectors, [{"i": i} for i in range(len(vectors))])
+            store.ann.wait()
+            results = await store.search(vectors[3], k=5)
+            assert index_kind(store.index) == "hnsw"
+            assert results[0][0] == ids[3]
+            await store.delete(ids[:600])
+            # 删除后重建为平面索引，剩余 900 条低于阈值不再升级
+            assert index_kind(store.index) == "flat" and store.index.ntotal == 900
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = skipped = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except pytest.skip.Exception as e:
+            skipped += 1
+            print(f"⏭️  {fn.__name__}: {e.msg}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed - skipped}/{len(tests)} 通过，{skipped} 跳过")
+    sys.exit(1 if failed else 0)
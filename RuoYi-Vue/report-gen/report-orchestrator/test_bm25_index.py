@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BM25 稀疏索引测试
+覆盖与 rank_bm25 的分数一致性、增量追加、持久化以及 FaissStore 同步维护
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.bm25 import BM25Index, _query_terms, tokenize
+from core.textops import rerank_texts, relevance_cutoff, budget_context, count_tokens
+
+DOCS = [
+    "深度学习在医学影像诊断中的应用",
+    "Graph neural networks for molecular property prediction",
+    "Transformer attention for long document retrieval",
+    "医学影像分割的卷积神经网络方法",
+    "Sparse retrieval with BM25 and inverted indexes",
+    "Dense retrieval using dual encoders and vector search",
+]
+
+
+def test_matches_rank_bm25():
+    BM25Okapi = pytest.importorskip("rank_bm25").BM25Okapi
+    query = "医学影像 retrieval attention"
+    expected = BM25Okapi([list(tokenize(d)) for d in DOCS]).get_scores(list(tokenize(query)))
+    index = BM25Index()
+    index.add(DOCS[:2])
+    index.add(DOCS[2:])
+    assert np.allclose(index.score([query])[0], expected)
+
+
+def test_incremental_add_dedup():
+    index = BM25Index()
+    assert index.add(DOCS[:3]) == [0, 1, 2]
+    assert index.add([DOCS[1], DOCS[3]]) == [1, 3]
+    assert index.size == 4
+
+
+def test_batch_queries_and_subset():
+    index = BM25Index()
+    index.add(DOCS)
+    scores = index.score(["医学影像", "dense vector search"])
+    assert scores.shape == (2, len(DOCS))
+    assert scores[0].argmax() in (0, 3) and scores[1].argmax() == 5
+    assert np.allclose(index.score(["医学影像"], [3, 0])[0], scores[0][[3, 0]])
+
+
+def test_rerank_texts():
+    ranked = rerank_texts("inverted indexes BM25", DOCS, top_k=2)
+    assert ranked[0][0] == DOCS[4] and len(ranked) == 2
+    assert rerank_texts("x", []) == []
+
+
+def test_rerank_does_not_modify_index():
+    index = BM25Index()
+    index.add(DOCS[:4])
+    before = index.score(["retrieval"]).copy()
+    candidates = [DOCS[2], DOCS[4], DOCS[5]]
+    ranked = index.rerank("sparse inverted indexes", candidates, top_k=3)
+    assert index.size == 4 and len(index.keys) == 4
+    assert np.allclose(index.score(["retrieval"]), before)
+    assert ranked[0][0] == DOCS[4]
+    # 已入库文本的分数与全库打分一致
+    scores = dict(ranked)
+    assert np.isclose(scores[DOCS[2]], index.score(["sparse inverted indexes"], [2])[0][0])
+    # 与追加后再打分相比，只差在 idf / 平均长度的统计口径上，排序一致
+    index.add([DOCS[4], DOCS[5]])
+    added = index.score(["sparse inverted indexes"], [2, 4, 5])[0]
+    assert [t for t, _ in ranked] == [candidates[i] for i in np.argsort(-added, kind="stable")]
+
+
+def test_only_queries_are_cached():
+    # 文档分词不进缓存，避免整篇文本常驻内存；查询缓存有界
+    assert not hasattr(tokenize, "cache_info")
+    _query_terms.cache_clear()
+    index = BM25Index()
+    index.add(DOCS)
+    index.rerank("sparse inverted indexes", DOCS + ["an unindexed passage about indexes"], top_k=3)
+    index.score(["sparse inverted indexes"])
+    info = _query_terms.cache_info()
+    assert info.currsize == 1 and info.hits >= 1 and info.maxsize <= 1024
+
+
+def test_persistence():
+    with tempfile.TemporaryDirectory() as d:
+        index = BM25Index(path=os.path.join(d, "bm25"))
+        index.add(DOCS)
+        index.save()
+        loaded = BM25Index(path=os.path.join(d, "bm25"))
+        assert loaded.size == len(DOCS)
+        assert np.allclose(loaded.score(["neural networks"]), index.score(["neural networks"]))
+
+
+def test_faiss_store_keeps_bm25_in_sync():
+    FaissStore = pytest.importorskip("core.vectorstore").FaissStore
+    with tempfile.TemporaryDirectory() as d:
+        paths = dict(index_path=os.path.join(d, "f.index"), meta_path=os.path.join(d, "f_meta.json"))
+        store = FaissStore(dim=8, **paths)
+        embs = np.random.RandomState(0).rand(len(DOCS), 8).astype("float32")
+        store.add(embs, DOCS, [{} for _ in DOCS])
+        assert store.bm25.size == len(DOCS)
+        reopened = FaissStore(dim=8, **paths)
+        assert reopened.bm25.size == len(DOCS)
+        assert reopened.bm25.rerank("molecular graph", DOCS + ["unrelated query candidate"], 1)[0][0] == DOCS[1]
+        # 重排序不写入持久索引，重新加载时不必重建
+        assert reopened.bm25.size == len(DOCS)
+
+
+def test_scored_search_results():
+    FaissStore = pytest.importorskip("core.vectorstore").FaissStore
+    with tempfile.TemporaryDirectory() as d:
+        store = FaissStore(dim=8, index_path=os.path.join(d, "f.index"), meta_path=os.path.join(d, "f_meta.json"))
+        embs = np.random.RandomState(1).rand(len(DOCS), 8).astype("float32")
+        store.add(embs, DOCS, [{"i": i} for i in range(len(DOCS))])
+        dense = store.search(embs[2], top_k=3)
+        assert dense[0][0] == DOCS[2] and abs(dense[0][2] - 1.0) < 1e-4
+        assert all(a[2] >= b[2] for a, b in zip(dense, dense[1:]))
+        hybrid = store.hybrid_search("molecular property prediction", embs[0], top_k=3)
+        assert DOCS[1] in [text for text, _, _ in hybrid]
+        assert all(-1.0 <= score <= 1.0 + 1e-4 for _, _, score in hybrid)
+
+
+def test_hybrid_store_reports_cosine_relevance():
+    pytest.importorskip("faiss")
+    import asyncio
+    from core.vector_store import FAISSVectorStore, HybridVectorStore
+
+    rng = np.random.RandomState(3)
+    embs = rng.normal(size=(len(DOCS), 16)).astype("float32")
+    embs /= np.linalg.norm(embs, axis=1, keepdims=True)
+    query = embs[4] + 0.5 * embs[0]
+    query /= np.linalg.norm(query)
+
+    async def run(d, fusion):
+        dense = FAISSVectorStore(os.path.join(d, f"{fusion}.index"), os.path.join(d, f"{fusion}.json"), 16)
+        await asyncio.sleep(0)
+        store = HybridVectorStore(dense, os.path.join(d, f"{fusion}.bm25"), fusion=fusion, candidate_multiplier=1)
+        await store.add_vectors(embs, [{"text": t} for t in DOCS])
+        # 词法命中 DOCS[1] 不在向量候选中，其分数由后端补算
+        return await store.search_hybrid("inverted indexes BM25 molecular graph", query, k=3)
+
+    with tempfile.TemporaryDirectory() as d:
+        for fusion in ("rrf", "weighted"):
+            results = asyncio.run(run(d, fusion))
+            texts = [meta["text"] for _, _, meta in results]
+            scores = [score for _, score, _ in results]
+            assert texts[0] == DOCS[4]
+            # 分数是余弦相似度（与融合方式无关），好的命中能通过 0.3 的相关度阈值
+            expected = [float(embs[DOCS.index(t)] @ query) for t in texts]
+            assert np.allclose(scores, expected, atol=1e-4), (fusion, scores, expected)
+            assert 0 in relevance_cutoff(scores, min_score=0.3)
+
+
+def test_hybrid_store_rerank_hits_indexed_rows():
+    pytest.importorskip("faiss")
+    import asyncio
+    from unittest import mock
+    from core.vector_store import FAISSVectorStore, HybridVectorStore
+
+    embs = np.random.RandomState(5).rand(len(DOCS), 8).astype("float32")
+
+    async def build(d):
+        dense = FAISSVectorStore(os.path.join(d, "h.index"), os.path.join(d, "h.json"), 8)
+        await asyncio.sleep(0)
+        store = HybridVectorStore(dense, os.path.join(d, "h.bm25"))
+        ids = await store.add_vectors(embs, [{"text": t} for t in DOCS])
+        return store, ids
+
+    with tempfile.TemporaryDirectory() as d:
+        store, ids = asyncio.run(build(d))
+        # 行按向量 id 检索，同时可按文本找到
+        assert set(store.bm25.keys) == set(ids)
+        reloaded = BM25Index(path=os.path.join(d, "h.bm25"))
+        for index in (store.bm25, reloaded):
+            with mock.patch.object(BM25Index, "_score_unindexed", side_effect=AssertionError("miss")):
+                ranked = index.rerank("sparse inverted indexes", DOCS, top_k=3)
+            assert ranked[0][0] == DOCS[4]
+            scores = dict(ranked)
+            assert np.isclose(scores[DOCS[4]], index.score(["sparse inverted indexes"], [index.rows[ids[4]]])[0][0])
+            assert index.search("molecular graph", 1)[0][0] == ids[1]
+
+
+def test_relevance_cutoff():
+    assert relevance_cutoff([0.9, 0.88, 0.85, 0.2, 0.18]) == [0, 1, 2]
+    assert relevance_cutoff([0.5, 0.1, 0.45], min_score=0.3) == [0, 2]
+    # 分数均匀下降时没有拐点，全部保留
+    assert relevance_cutoff([0.9, 0.8, 0.7, 0.6]) == [0, 1, 2, 3]
+    assert relevance_cutoff([0.1, 0.05], min_score=0.3) == []
+
+
+def test_budget_context_prefers_high_scores():
+    texts = ["low relevance text", "most relevant text", "medium relevance text"]
+    assert budget_context(texts, max_tokens=100, scores=[0.1, 0.9, 0.5]) == [texts[1], texts[2], texts[0]]
+    assert budget_context(texts, max_tokens=100) == texts
+
+
+def test_knapsack_packing_fills_budget():
+    small = ["evidence %d " % i + "fact " * 200 for i in range(5)]
+    budget = sum(count_tokens(t) for t in small)
+    big = "word " * 2000
+    while count_tokens(big) > budget - 50:
+        big = big[:-50]
+    texts = [big] + small
+    scores = [0.9] + [0.85] * 5
+    # 贪心：较大的高分块先占住预算，后面的小块全部丢弃
+    assert budget_context(texts, max_tokens=budget, scores=scores) == [big]
+    packed = budget_context(texts, max_tokens=budget, scores=scores, packing="knapsack")
+    assert packed == small
+
+
+def test_knapsack_mmr_skips_redundant_chunks():
+    texts = ["alpha finding " * 20, "alpha finding restated " * 15, "beta finding " * 20]
+    embs = np.array([[1.0, 0.0], [0.99, 0.1], [0.0, 1.0]])
+    scores = [0.9, 0.88, 0.8]
+    budget = count_tokens(texts[0]) + count_tokens(texts[2]) + 5
+    packed = budget_context(texts, max_tokens=budget, scores=scores, embeddings=embs, packing="knapsack")
+    assert packed == [texts[0], texts[2]]
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = skipped = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except pytest.skip.Exception as e:
+            skipped += 1
+            print(f"⏭️  {fn.__name__}: {e.msg}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed - skipped}/{len(tests)} 通过，{skipped} 跳过")
+    sys.exit(1 if failed else 0)
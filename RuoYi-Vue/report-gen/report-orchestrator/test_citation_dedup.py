@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+引用去重测试
+覆盖完全重复、空白/大小写差异、近重复、不同文献保留以及大批量输入
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.textops import deduplicate_citations
+
+ABSTRACT_A = ("Transformer models rely on self-attention to capture long-range dependencies "
+              "in sequences, enabling parallel training and strong results in machine translation.")
+ABSTRACT_B = ("Graph neural networks aggregate information from neighbouring nodes, which makes "
+              "them well suited to molecular property prediction and recommendation systems.")
+
+
+def test_empty_and_blank():
+    assert deduplicate_citations([]) == []
+    assert deduplicate_citations(["", "   ", ABSTRACT_A]) == [ABSTRACT_A]
+
+
+def test_exact_duplicates():
+    texts = [ABSTRACT_A, ABSTRACT_A, ABSTRACT_A.upper(), "  " + ABSTRACT_A.replace(",", "") + " "]
+    assert deduplicate_citations(texts) == [ABSTRACT_A]
+
+
+def test_near_duplicate_removed():
+    variant = ABSTRACT_A.replace("strong results", "strong performance")
+    assert deduplicate_citations([ABSTRACT_A, variant, ABSTRACT_B]) == [ABSTRACT_A, ABSTRACT_B]
+
+
+def test_distinct_texts_kept():
+    # 字母表几乎相同的不同摘要不应被判为重复
+    assert deduplicate_citations([ABSTRACT_A, ABSTRACT_B]) == [ABSTRACT_A, ABSTRACT_B]
+
+
+def test_threshold():
+    variant = ABSTRACT_A.replace("machine translation", "speech recognition tasks")
+    assert deduplicate_citations([ABSTRACT_A, variant], similarity_threshold=0.5) == [ABSTRACT_A]
+    assert deduplicate_citations([ABSTRACT_A, variant], similarity_threshold=0.95) == [ABSTRACT_A, variant]
+
+
+def test_large_batch():
+    rng = random.Random(0)
+    words = ["model", "data", "graph", "attention", "layer", "training", "loss", "vector",
+             "token", "retrieval", "query", "index", "neural", "sparse", "dense", "score"]
+    base = [" ".join(rng.choice(words) + str(rng.randint(0, 999)) for _ in range(40)) for _ in range(1000)]
+    texts = base + [t + " extra" for t in base[:500]]
+    start = time.time()
+    result = deduplicate_citations(texts)
+    assert result == base
+    assert time.time() - start < 10
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
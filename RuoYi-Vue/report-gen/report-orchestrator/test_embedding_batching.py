@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+句向量批处理测试
+覆盖长度分桶与顺序还原、超长文本的截断 / 滑动窗口策略
+"""
+
+import os
+import re
+import sys
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.embedding_batching import encode_bucketed, length_buckets, pool_windows, token_windows
+from core.vectorstore import Embedding
+
+
+class WordModel:
+    """按空白分词的玩具模型：向量 = [词数, 首词编号, 1]，记录每批输入与分词调用；与真实模型一样超长输入自行截断"""
+    max_seq_length = 6  # 扣除 2 个特殊 token 后每段最多 4 个词
+
+    def __init__(self):
+        self.batches = []
+        self.offset_calls = 0
+
+    def token_offsets(self, text):
+        self.offset_calls += 1
+        return [m.span() for m in re.finditer(r"\S+", text)]
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.batches.append(list(texts))
+        rows = []
+        for t in texts:
+            words = t.split()[:self.max_seq_length - 2]
+            rows.append([len(words), float(words[0][1:]) if words else 0.0, 1.0])
+        return np.array(rows, dtype=np.float32)
+
+
+def make_embedding(long_text):
+    embedding = Embedding("test/word-model", batch_size=2, long_text=long_text)
+    embedding.model = WordModel()
+    embedding.cache = None
+    return embedding
+
+
+def test_length_buckets_group_similar_lengths():
+    lengths = [5, 100, 7, 98, 6, 99]
+    batches = length_buckets(lengths, 2)
+    assert batches == [[1, 5], [3, 2], [4, 0]]
+
+
+def test_encode_bucketed_restores_order():
+    texts = ["a" * n for n in (3, 40, 1, 25, 8)]
+    seen = []
+
+    def fake(batch):
+        seen.append([len(t) for t in batch])
+        return np.array([[len(t)] for t in batch], dtype=np.float32)
+
+    vectors = encode_bucketed(fake, texts, batch_size=2)
+    assert vectors[:, 0].tolist() == [3, 40, 1, 25, 8]
+    assert seen == [[40, 25], [8, 3], [1]]
+
+
+def test_token_windows_overlap():
+    offsets = [(i * 2, i * 2 + 1) for i in range(10)]
+    spans = token_windows(offsets, window=4, overlap=1)
+    assert [n for _, _, n in spans] == [4, 4, 4]
+    assert spans[0][:2] == (0, 7) and spans[-1][1] == 19
+
+
+def test_truncate_policy_leaves_cut_to_model():
+    embedding = make_embedding("truncate")
+    text = " ".join(f"w{i}" for i in range(10))
+    vectors = embedding._run_model(["w1 w2", text])
+    assert vectors[1].tolist() == [4.0, 0.0, 1.0]
+    # 截断交给模型，不为取偏移额外分词，原文整段送入
+    assert embedding.model.offset_calls == 0
+    assert text in [t for batch in embedding.model.batches for t in batch]
+
+
+def test_window_policy_averages_all_windows():
+    embedding = make_embedding("window")
+    text = " ".join(f"w{i}" for i in range(10))
+    vectors = embedding._run_model([text, "w7"])
+    pieces = [t for batch in embedding.model.batches for t in batch]
+    assert any(t.startswith("w0") for t in pieces) and any(t.endswith("w9") for t in pieces)
+    assert embedding.metrics["windowed"] == 1 and embedding.model.offset_calls == 1
+    assert np.isclose(np.linalg.norm(vectors[0]), 1.0)
+    assert vectors[1].tolist() == [1.0, 7.0, 1.0]
+
+
+def test_pool_windows_weights_by_tokens():
+    pooled = pool_windows(np.array([[1.0, 0.0], [0.0, 1.0]]), [3, 1])
+    assert np.allclose(pooled, np.array([3.0, 1.0]) / np.sqrt(10))
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+句向量持久缓存测试
+覆盖 float16 读写、LRU 淘汰、重启后复用，Embedding.encode 的批内去重与缓存命中，
+以及共享模型注册表的预热与就绪状态
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.embedding_cache import EmbeddingCache
+from core.vectorstore import Embedding, embedding_readiness, get_embedding, warm_up_embeddings
+
+
+class CountingModel:
+    """记录实际送入模型的文本，向量由文本长度决定"""
+
+    def __init__(self):
+        self.seen = []
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True):
+        self.seen.extend(texts)
+        return np.array([[len(t), 1.0, 0.5] for t in texts], dtype=np.float32)
+
+
+def test_roundtrip_float16():
+    with tempfile.TemporaryDirectory() as d:
+        cache = EmbeddingCache(os.path.join(d, "emb.db"))
+        vec = np.random.RandomState(0).rand(384).astype(np.float32)
+        cache.put_many({"k": vec})
+        got = cache.get_many(["k", "missing"])
+        assert list(got) == ["k"]
+        assert got["k"].dtype == np.float16 and np.allclose(got["k"], vec, atol=1e-3)
+        cache.close()
+
+
+def test_lru_eviction():
+    with tempfile.TemporaryDirectory() as d:
+        cache = EmbeddingCache(os.path.join(d, "emb.db"), max_items=10)
+        for i in range(10):
+            cache.put_many({f"k{i}": np.full(4, i, dtype=np.float32)})
+        cache.get_many(["k0"])  # 刷新 k0，使其不被淘汰
+        cache.put_many({"k10": np.zeros(4)})
+        assert cache.get_stats()["items"] <= 10
+        assert "k0" in cache.get_many(["k0"])
+        assert "k1" not in cache.get_many(["k1"])
+        cache.close()
+
+
+def test_persistence():
+    with tempfile.TemporaryDirectory() as d:
+        path = os.path.join(d, "emb.db")
+        cache = EmbeddingCache(path)
+        cache.put_many({"a": np.ones(8), "b": np.zeros(8)})
+        cache.close()
+        reopened = EmbeddingCache(path)
+        assert reopened.get_stats()["items"] == 2
+        assert np.array_equal(reopened.get_many(["a"])["a"], np.ones(8, dtype=np.float16))
+        reopened.close()
+
+
+def test_encode_dedups_and_reuses_cache():
+    with tempfile.TemporaryDirectory() as d:
+        cache = EmbeddingCache(os.path.join(d, "emb.db"))
+        embed = Embedding(cache=cache)
+        embed.model = CountingModel()
+        first = embed.encode(["abc", "de", "abc"])
+        assert embed.model.seen == ["abc", "de"]
+        assert first.shape == (3, 3) and first.dtype == np.float32
+        assert np.array_equal(first[0], first[2])
+
+        # 新实例（模拟另一个任务）只编码未见过的文本
+        other = Embedding(cache=cache)
+        other.model = CountingModel()
+        second = other.encode(["de", "fghi", "abc"])
+        assert other.model.seen == ["fghi"]
+        assert np.array_equal(second[0], first[1]) and np.array_equal(second[2], first[0])
+        cache.close()
+
+
+
+def test_shared_registry_and_readiness():
+    name = "test/registry-model"
+    embedding = get_embedding(name)
+    assert get_embedding(name) is embedding
+    assert embedding_readiness()["models"][name]["state"] == "cold"
+    assert not embedding_readiness()["ready"]
+
+    embedding.model = CountingModel()
+    status = warm_up_embeddings([name])
+    assert status["models"][name]["state"] == "ready"
+    assert embedding.model.seen, "预热应真正运行一次模型"
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
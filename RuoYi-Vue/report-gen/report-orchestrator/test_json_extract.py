@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM 响应 JSON 提取测试
+覆盖代码块、前后说明文字、尾随逗号、未转义换行和截断输出
+"""
+
+import os
+import sys
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.jsonops import extract_json
+
+
+def test_plain_json():
+    assert extract_json('{"研究内容": "abc", "参考网址": []}') == {"研究内容": "abc", "参考网址": []}
+
+
+def test_fenced_block_with_prose():
+    text = '好的，结果如下：\n```json\n{"摘要": "x", "关键词": ["a", "b"]}\n```\n以上。'
+    assert extract_json(text) == {"摘要": "x", "关键词": ["a", "b"]}
+
+
+def test_trailing_commas():
+    assert extract_json('{"a": [1, 2, ], "b": {"c": 1,},}') == {"a": [1, 2], "b": {"c": 1}}
+
+
+def test_unescaped_newlines():
+    assert extract_json('{"研究内容": "第一段\n第二段"}') == {"研究内容": "第一段\n第二段"}
+
+
+def test_truncated_string_value():
+    assert extract_json('{"摘要": "完整", "完整文章": "被截断的正') == {"摘要": "完整", "完整文章": "被截断的正"}
+
+
+def test_truncated_after_key():
+    assert extract_json('{"a": 1, "b": ') == {"a": 1}
+    assert extract_json('{"a": 1, "b"') == {"a": 1}
+    assert extract_json('{"a": 1, "bc') == {"a": 1}
+    assert extract_json('{"a": [1, 2, tr') == {"a": [1, 2]}
+
+
+def test_truncated_number_rejected():
+    # 截断的数字无法判断是否完整，不能当作有效值接受
+    assert extract_json('{"a": 12') is None
+    assert extract_json('{"x": "ok", "a": 12') == {"x": "ok"}
+    assert extract_json('{"x": [1, 2, 3') == {"x": [1, 2]}
+    assert extract_json('{"x": "ok", "done": true') == {"x": "ok", "done": True}
+
+
+def test_top_level_array():
+    assert extract_json('结果如下：[{"a": 1}, {"b": 2}] 以上') == [{"a": 1}, {"b": 2}]
+    assert extract_json('```json\n[{"a":1}]\n```') == [{"a": 1}]
+    assert extract_json('```json\n{"a": [1, 2]}\n```') == {"a": [1, 2]}
+    # 正文中的引用标号、链接不是 JSON，后面的对象仍能找到
+    assert extract_json('见文献[1]与[2, 3]，结果 {"a": 1}') == {"a": 1}
+    assert extract_json('参见 [说明](http://x) 和 [see {"a": 1}]') == {"a": 1}
+    assert extract_json('只有引用 [1]') is None
+
+
+def test_skips_stray_braces():
+    text = '公式 $O(n^{2})$ 之后是结果 {"a": 1}'
+    assert extract_json(text) == {"a": 1}
+
+
+def test_markdown_is_not_json():
+    assert extract_json("# 标题\n\n正文 {placeholder} 结束") is None
+    assert extract_json("正文最后一个字符是 {") is None
+
+
+def test_braces_inside_strings():
+    assert extract_json('{"code": "if (x) { y(); }"}') == {"code": "if (x) { y(); }"}
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MCP 客户端批量调用测试
+覆盖 /invoke_batch 分片、404/405 与 400 回退为单次调用、错误占位，以及事件循环切换时旧连接池的关闭
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import httpx
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core import mcp_client
+from core.mcp_client import MCPClient
+
+
+class FakeMCP:
+    """模拟 MCP 服务端：记录请求，按配置返回批量 / 单次结果"""
+
+    def __init__(self, batch_status: int = 200, max_batch: int = 32):
+        self.batch_status = batch_status
+        self.max_batch = max_batch
+        self.batch_sizes = []
+        self.single_calls = []
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        body = json.loads(request.content)
+        if request.url.path == "/invoke_batch":
+            if self.batch_status != 200:
+                return httpx.Response(self.batch_status, json={"detail": "unsupported"})
+            calls = body["calls"]
+            if len(calls) > self.max_batch:
+                return httpx.Response(400, json={"detail": f"too many calls (max {self.max_batch})"})
+            self.batch_sizes.append(len(calls))
+            return httpx.Response(200, json={"count": len(calls), "results": [self._item(c) for c in calls]})
+        self.single_calls.append(body["args"].get("i"))
+        if body["tool"] == "broken":
+            return httpx.Response(500, json={"detail": "boom"})
+        return httpx.Response(200, json={"from_cache": False, "result": {"i": body["args"]["i"]}})
+
+    @staticmethod
+    def _item(call):
+        if call["tool"] == "broken":
+            return {"tool": "broken", "status": 500, "error": "broken failed: boom"}
+        return {"tool": call["tool"], "from_cache": False, "result": {"i": call["args"]["i"]}}
+
+
+def _client(server: FakeMCP) -> MCPClient:
+    return MCPClient("http://mcp", transport=httpx.MockTransport(server.handler))
+
+
+def _calls(n: int, broken=()):
+    return [("broken" if i in broken else "echo", {"i": i}) for i in range(n)]
+
+
+def test_batch_chunks_preserve_order():
+    server = FakeMCP()
+    client = _client(server)
+    out = asyncio.run(client.invoke_many(_calls(70)))
+    assert [r["i"] for r in out] == list(range(70))
+    assert sorted(server.batch_sizes) == [6, 32, 32]
+    assert server.single_calls == []
+
+
+def test_batch_error_placeholders():
+    server = FakeMCP()
+    client = _client(server)
+    out = asyncio.run(client.invoke_many(_calls(5, broken={1, 3})))
+    assert out[0] == {"i": 0} and out[2] == {"i": 2} and out[4] == {"i": 4}
+    assert out[1] == {"error": "broken failed: boom"} and out[3] == {"error": "broken failed: boom"}
+
+
+def test_fallback_when_batch_unsupported():
+    for status in (404, 405):
+        server = FakeMCP(batch_status=status)
+        client = _client(server)
+        out = asyncio.run(client.invoke_many(_calls(4, broken={2})))
+        assert [r.get("i") for r in out] == [0, 1, None, 3]
+        assert "error" in out[2] and out[2]["error"].startswith("broken failed")
+        assert sorted(server.single_calls) == [0, 1, 2, 3]
+        # 不支持的结论被记住，后续直接走单次调用
+        assert client._batch_supported is False
+        server.single_calls.clear()
+        asyncio.run(client.invoke_many(_calls(2)))
+        assert sorted(server.single_calls) == [0, 1]
+
+
+def test_fallback_when_batch_too_large():
+    # 客户端分片上限大于服务端上限：服务端 400，该分片逐项调用，结果不应全部变成错误
+    server = FakeMCP(max_batch=4)
+    client = _client(server)
+    out = asyncio.run(client.invoke_many(_calls(6)))
+    assert [r["i"] for r in out] == list(range(6))
+    assert sorted(server.single_calls) == list(range(6))
+    assert client._batch_supported is True
+
+
+def test_batch_size_setting():
+    server = FakeMCP(max_batch=4)
+    client = _client(server)
+    original = mcp_client.MCP_BATCH_SIZE
+    mcp_client.MCP_BATCH_SIZE = 4
+    try:
+        out = asyncio.run(client.invoke_many(_calls(10)))
+    finally:
+        mcp_client.MCP_BATCH_SIZE = original
+    assert [r["i"] for r in out] == list(range(10))
+    assert sorted(server.batch_sizes) == [2, 4, 4]
+    assert server.single_calls == []
+
+
+def test_stale_client_closed_on_loop_change():
+    client = _client(FakeMCP())
+
+    async def call():
+        await client.invoke("echo", {"i": 1})
+        return client._client
+
+    first = asyncio.run(call())
+    second = asyncio.run(call())
+    assert first is not second
+    assert first.is_closed and not second.is_closed
+    asyncio.run(client.aclose())
+    assert second.is_closed
+
+
+if __name__ == "__main__":
+    import pytest
+
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_") and callable(v)]
+    passed = skipped = 0
+    for t in tests:
+        try:
+            t()
+            print(f"✅ {t.__name__}")
+            passed += 1
+        except pytest.skip.Exception as e:
+            print(f"⏭️  {t.__name__}: {e}")
+            skipped += 1
+        except Exception as e:
+            print(f"❌ {t.__name__}: {e}")
+    print(f"\n{passed}/{len(tests) - skipped} 通过，{skipped} 跳过")
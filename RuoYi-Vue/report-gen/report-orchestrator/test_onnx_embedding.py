@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ONNX 句向量后端测试
+pooling 逻辑直接校验；导出模型存在时（scripts/export_onnx_embedding.py），
+校验 fp32 / int8 向量与 sentence-transformers 在容差内一致
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.onnx_embedding import OnnxEncoder, default_model_dir, mean_pool, onnx_available
+from core.vectorstore import Embedding
+
+MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+TEXTS = [
+    "深度学习在医学影像诊断中的应用研究",
+    "Graph neural networks for molecular property prediction",
+    "Sparse retrieval with BM25 and inverted indexes",
+    "短句",
+    "本文提出一种基于 Transformer 的长文档检索方法，" * 20,
+]
+# 与 PyTorch 输出的最小余弦相似度
+FP32_TOLERANCE = 0.9999
+INT8_TOLERANCE = 0.98
+
+
+def test_mean_pool_ignores_padding():
+    tokens = np.array([[[1.0, 0.0], [3.0, 0.0], [100.0, 100.0]]], dtype=np.float32)
+    mask = np.array([[1, 1, 0]])
+    pooled = mean_pool(tokens, mask, normalize=False)
+    assert np.allclose(pooled, [[2.0, 0.0]])
+    assert np.allclose(np.linalg.norm(mean_pool(tokens, mask), axis=1), 1.0)
+
+
+def test_onnx_backend_requires_exported_model():
+    if os.path.exists(default_model_dir(MODEL_NAME)):
+        pytest.skip("exported ONNX model present; missing-model error path not reachable")
+    try:
+        Embedding(MODEL_NAME, backend="onnx")._ensure_model_loaded()
+    except (RuntimeError, FileNotFoundError):
+        return
+    assert False, "缺少 onnxruntime 或导出模型时应报错"
+
+
+def test_cache_namespace_separates_backends():
+    torch_ns = Embedding(MODEL_NAME, backend="torch").cache_namespace
+    onnx_ns = Embedding(MODEL_NAME, backend="onnx").cache_namespace
+    window_ns = Embedding(MODEL_NAME, backend="torch", long_text="window").cache_namespace
+    assert len({torch_ns, onnx_ns, window_ns}) == 3
+    assert onnx_ns.endswith("onnx-int8") or onnx_ns.endswith("onnx-fp32")
+
+
+def test_matches_sentence_transformers():
+    model_dir = default_model_dir(MODEL_NAME)
+    if not onnx_available():
+        pytest.skip("onnxruntime / tokenizers not installed")
+    if not os.path.exists(model_dir):
+        pytest.skip(f"no exported ONNX model at {model_dir} (run scripts/export_onnx_embedding.py)")
+    SentenceTransformer = pytest.importorskip("sentence_transformers").SentenceTransformer
+    reference = SentenceTransformer(MODEL_NAME).encode(TEXTS, convert_to_numpy=True, normalize_embeddings=True)
+    for quantized, tolerance in ((False, FP32_TOLERANCE), (True, INT8_TOLERANCE)):
+        vectors = OnnxEncoder(model_dir, quantized=quantized).encode(TEXTS, batch_size=2)
+        assert vectors.shape == reference.shape
+        cosine = (vectors * reference).sum(axis=1)
+        assert cosine.min() >= tolerance, f"quantized={quantized} min cosine {cosine.min():.5f}"
+        # 用 ONNX 向量查询已有（PyTorch 构建的）索引，最近邻仍是自身
+        assert np.array_equal(np.argmax(vectors @ reference.T, axis=1), np.arange(len(TEXTS)))
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = skipped = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except pytest.skip.Exception as e:
+            skipped += 1
+            print(f"⏭️  {fn.__name__}: {e.msg}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed - skipped}/{len(tests)} 通过，{skipped} 跳过")
+    sys.exit(1 if failed else 0)
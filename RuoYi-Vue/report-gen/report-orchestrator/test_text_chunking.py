@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分句与文本分块测试
+覆盖中英文分句的保护规则、各分块策略的 max_tokens 约束、内容完整性以及长文本（全文 PDF 规模）
+"""
+
+import os
+import re
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from core.textops import count_tokens, smart_chunk_by_strategy, smart_sentence_split
+
+ZH = "深度学习在自然语言处理中取得了显著进展。模型规模持续增长，训练成本也随之上升！"
+EN = "Transformer models use self-attention over 3.5 billion tokens. See www.example.com for U.S. details. "
+DOC = "\n\n".join((ZH * (i % 5 + 1)) + (EN * (i % 7 + 1)) for i in range(30))
+STRATEGIES = ["sentence", "paragraph", "token", "mixed"]
+
+
+def test_sentence_split_rules():
+    assert smart_sentence_split("第一句。第二句！第三句？") == ["第一句。", "第二句！", "第三句？"]
+    assert smart_sentence_split("Models scale. They work! Next line\nTail") == ["Models scale.", "They work!", "Next line", "Tail"]
+    # 小数、大写缩写、URL 不切分
+    assert smart_sentence_split("Accuracy rose 3.5 points in the U.S. Army trial.") == ["Accuracy rose 3.5 points in the U.S. Army trial."]
+    assert smart_sentence_split("See https://x.org/a.b?q=1 Now. Done") == ["See https://x.org/a.b?q=1 Now.", "Done"]
+    assert smart_sentence_split("") == [] and smart_sentence_split("  \n ") == []
+
+
+def _compact(chunks):
+    return re.sub(r"\s+", "", "".join(chunks))
+
+
+def test_short_text_single_chunk():
+    for strategy in STRATEGIES:
+        assert smart_chunk_by_strategy(ZH + EN, strategy, max_tokens=500) == [(ZH + EN).strip()]
+    assert smart_chunk_by_strategy("", "mixed") == []
+
+
+def test_content_preserved():
+    for strategy in STRATEGIES:
+        chunks = smart_chunk_by_strategy(DOC, strategy, max_tokens=120)
+        assert _compact(chunks) == _compact([DOC]), strategy
+
+
+def test_max_tokens_respected():
+    # token / mixed 策略保证每块不超过预算（句子/段落策略保留超长句子原样）
+    for strategy in ["token", "mixed"]:
+        chunks = smart_chunk_by_strategy(DOC, strategy, max_tokens=60)
+        assert all(count_tokens(c) <= 60 + 2 for c in chunks), strategy
+
+
+def test_paragraph_boundaries():
+    chunks = smart_chunk_by_strategy("第一段。\n\n第二段。", "paragraph", max_tokens=2)
+    assert chunks == ["第一段。", "第二段。"]
+
+
+def test_long_document():
+    text = DOC * 40
+    start = time.time()
+    chunks = smart_chunk_by_strategy(text, "mixed", max_tokens=400)
+    assert _compact(chunks) == _compact([text])
+    assert time.time() - start < 10
+
+
+if __name__ == "__main__":
+    tests = [v for k, v in list(globals().items()) if k.startswith("test_")]
+    failed = 0
+    for fn in tests:
+        try:
+            fn()
+            print(f"✅ {fn.__name__}")
+        except AssertionError as e:
+            failed += 1
+            print(f"❌ {fn.__name__}: {e}")
+    print(f"\n{len(tests) - failed}/{len(tests)} 通过")
+    sys.exit(1 if failed else 0)